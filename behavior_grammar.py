@@ -0,0 +1,127 @@
+"""
+behavior_grammar.py
+
+Grammar of the "Change behavior:" block that ends every SFT target
+(train/data_generator/csv_convert_json.behavior_change):
+
+    Change behavior:
+    - Speed: 3.5 m/s
+    - CPU frequency: 1.00 GHz
+    - GPU frequency: 0.80 GHz
+
+The block is a fixed sequence of literal segments and three bounded
+numeric fields with a fixed number of decimals. The local backend forces
+the literals and constrains each field to the digits that keep it a
+prefix of an in-range value (see local_llm.LocalChatModel.generate_behavior),
+so every answer parses and generation stops as soon as the last field
+is complete.
+"""
+
+from typing import List, Optional, Sequence, Tuple
+
+NUMBER_CHARS = frozenset("0123456789.")
+
+
+class NumberField:
+    """A decimal in [low, high] written with exactly `decimals` decimals."""
+
+    def __init__(self, name: str, low: float, high: float, decimals: int):
+        if low > high:
+            raise ValueError(f"Empty range for {name}: [{low}, {high}]")
+        self.name = name
+        self.low = low
+        self.high = high
+        self.decimals = decimals
+
+        step = 10 ** decimals
+        first, last = round(low * step), round(high * step)
+        self.values = frozenset(f"{i / step:.{decimals}f}" for i in range(first, last + 1))
+        self.prefixes = frozenset(v[:n] for v in self.values for n in range(1, len(v) + 1))
+
+    def accepts(self, text: str) -> bool:
+        """True if `text` is an in-range value or can still be extended to one."""
+        return text in self.prefixes
+
+    def complete(self, text: str) -> bool:
+        # Fixed decimals: a complete value is never the prefix of another one
+        return text in self.values
+
+
+class BehaviorGrammar:
+
+    def __init__(self,
+                 speed: Tuple[float, float] = (0.0, 6.0),
+                 cpu_ghz: Tuple[float, float] = (0.0, 2.5),
+                 gpu_ghz: Tuple[float, float] = (0.0, 1.5)):
+        """Bounds (inclusive) of each field; same units and decimals as behavior_change()."""
+        self.fields = (
+            NumberField("speed_mps", *speed, decimals=1),
+            NumberField("cpu_freq_ghz", *cpu_ghz, decimals=2),
+            NumberField("gpu_freq_ghz", *gpu_ghz, decimals=2),
+        )
+        # literals[i] precedes fields[i]; the last literal closes the block
+        self.literals = (
+            "Change behavior:\n- Speed: ",
+            " m/s\n- CPU frequency: ",
+            " GHz\n- GPU frequency: ",
+            " GHz",
+        )
+
+    @classmethod
+    def from_platform(cls, platform, v_min: float = 0.0) -> "BehaviorGrammar":
+        """Bounds from a vec2lang.PlatformConfig."""
+        return cls(speed=(v_min, platform.max_speed),
+                   cpu_ghz=(platform.cpu_freq_min, platform.cpu_freq_max),
+                   gpu_ghz=(platform.gpu_freq_min, platform.gpu_freq_max))
+
+    def state(self, text: str) -> Optional[Tuple]:
+        """
+        Decoding state after `text` (generated after the first literal):
+        ("number", field, partial), ("literal", remaining), ("done",), or
+        None if `text` left the grammar.
+        """
+        rest = text
+        for i, field in enumerate(self.fields):
+            end = len(rest) - len(rest.lstrip("0123456789."))
+            value, rest = rest[:end], rest[end:]
+            if not field.complete(value):
+                if rest or (value and not field.accepts(value)):
+                    return None
+                return ("number", field, value)
+            literal = self.literals[i + 1]
+            if not rest:
+                return ("literal", literal)
+            if literal.startswith(rest):
+                return ("literal", literal[len(rest):]) if len(rest) < len(literal) else \
+                    (("done",) if i + 1 == len(self.fields) else ("number", self.fields[i + 1], ""))
+            if not rest.startswith(literal):
+                return None
+            rest = rest[len(literal):]
+        return ("done",) if not rest else None
+
+    def render(self, values: Sequence[str]) -> str:
+        parts = []
+        for literal, value in zip(self.literals, values):
+            parts += [literal, value]
+        parts.append(self.literals[-1])
+        return "".join(parts)
+
+
+def number_tokens(tokenizer) -> List[Tuple[int, str]]:
+    """(token id, text) of every vocabulary token made only of digits and '.'."""
+    out = []
+    for token_id in range(len(tokenizer)):
+        text = tokenizer.decode([token_id])
+        if text and set(text) <= NUMBER_CHARS:
+            out.append((token_id, text))
+    return out
+
+
+def literal_tokens(tokenizer, grammar: BehaviorGrammar) -> List[Tuple[int, str]]:
+    """(token id, text) of every vocabulary token that occurs inside one of the literals."""
+    out = []
+    for token_id in range(len(tokenizer)):
+        text = tokenizer.decode([token_id])
+        if text and any(text in literal for literal in grammar.literals[1:]):
+            out.append((token_id, text))
+    return out
@@ -1,25 +1,23 @@
 import time
 from typing import Dict
 from robot_params import BATTERY
+from sensor_reader import SysfsReader, get_shared_reader
 
 class BatteryMonitor:
-    def __init__(self):
+    def __init__(self, reader: SysfsReader = None):
         self.capacity_ah = BATTERY["capacity_ah"]
         self.voltage_path = BATTERY["voltage_path"]
         self.current_path = BATTERY["current_path"]
         self.voltage_scale = BATTERY["voltage_scale"]
         self.current_scale = BATTERY["current_scale"]
 
+        self.reader = reader if reader is not None else get_shared_reader()
+
         self.soc = BATTERY["init_soc"]
         self._last_time = time.time()
 
-    @staticmethod
-    def _read_float(path: str, scale: float):
-        try:
-            with open(path, "r") as f:
-                return float(f.read().strip()) / scale
-        except Exception:
-            return None
+    def _read_float(self, path: str, scale: float):
+        return self.reader.read_float(path, scale)
 
     def sample(self) -> Dict:
         v = self._read_float(self.voltage_path, self.voltage_scale)
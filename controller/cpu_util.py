@@ -0,0 +1,124 @@
+"""
+cpu_util.py
+
+Per-core CPU utilization from /proc/stat without psutil's global state.
+
+CpuStatEngine parses /proc/stat at most once per tick into a reusable
+jiffies array. Every consumer owns a UtilCursor holding its own previous
+snapshot, so utilization is always the delta since *that* consumer last
+read, no matter how many other consumers sample in between.
+"""
+
+import os
+import threading
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+PROC_STAT = "/proc/stat"
+
+# user nice system idle iowait irq softirq steal
+N_FIELDS = 8
+IDLE_COLS = (3, 4)
+
+
+class CpuStatEngine:
+
+    def __init__(self, cpu_count: Optional[int] = None, path: str = PROC_STAT,
+                 min_interval_s: float = 0.005):
+        self.cpu_count = cpu_count or os.cpu_count() or 1
+        self.path = path
+        self.min_interval_s = min_interval_s
+
+        # Row 0 is the aggregate "cpu" line, row k + 1 is "cpuk"
+        self.jiffies = np.zeros((self.cpu_count + 1, N_FIELDS), dtype=np.int64)
+        self.online = np.zeros(self.cpu_count + 1, dtype=bool)
+        self.stamp = 0.0
+
+        self._buf = bytearray(16384)
+        self._view = memoryview(self._buf)
+        self._fd: Optional[int] = None
+        self._lock = threading.Lock()
+
+    # ============================================================
+    # Parsing
+    # ============================================================
+    def _read(self) -> bytes:
+        if self._fd is None:
+            self._fd = os.open(self.path, os.O_RDONLY | getattr(os, "O_CLOEXEC", 0))
+        try:
+            n = os.preadv(self._fd, [self._view], 0)
+        except OSError:
+            os.close(self._fd)
+            self._fd = os.open(self.path, os.O_RDONLY | getattr(os, "O_CLOEXEC", 0))
+            n = os.preadv(self._fd, [self._view], 0)
+        return bytes(self._view[:n])
+
+    def _parse(self, raw: bytes):
+        self.online[:] = False
+        for line in raw.split(b"\n"):
+            if not line.startswith(b"cpu"):
+                # cpu lines are contiguous at the top of /proc/stat
+                break
+            parts = line.split()
+            name = parts[0]
+            idx = 0 if name == b"cpu" else int(name[3:]) + 1
+            if idx > self.cpu_count:
+                continue
+            vals = parts[1:N_FIELDS + 1]
+            self.jiffies[idx, :len(vals)] = [int(v) for v in vals]
+            self.online[idx] = True
+
+    def update(self, force: bool = False) -> float:
+        """Re-parse /proc/stat unless it was parsed within min_interval_s."""
+        with self._lock:
+            now = time.monotonic()
+            if force or now - self.stamp >= self.min_interval_s:
+                self._parse(self._read())
+                self.stamp = now
+            return self.stamp
+
+    def close(self):
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+    def cursor(self) -> "UtilCursor":
+        return UtilCursor(self)
+
+
+class UtilCursor:
+
+    def __init__(self, engine: CpuStatEngine):
+        self.engine = engine
+        engine.update()
+        self._prev = engine.jiffies.copy()
+        self._delta = np.empty_like(self._prev)
+        self._usage = np.zeros(engine.cpu_count + 1, dtype=np.float64)
+
+    def read(self) -> Tuple[np.ndarray, float]:
+        """Per-core usage (%) and aggregate usage (%) since this cursor's last read.
+
+        The per-core array is reused between calls; copy it if it must be kept.
+        Cores that went offline or saw no ticks report 0.
+        """
+        engine = self.engine
+        engine.update()
+
+        np.subtract(engine.jiffies, self._prev, out=self._delta)
+        np.copyto(self._prev, engine.jiffies)
+
+        total = self._delta.sum(axis=1)
+        idle = self._delta[:, IDLE_COLS[0]] + self._delta[:, IDLE_COLS[1]]
+        busy = total - idle
+
+        self._usage.fill(0.0)
+        valid = (total > 0) & engine.online
+        np.divide(busy, total, out=self._usage, where=valid)
+        self._usage *= 100.0
+        np.clip(self._usage, 0.0, 100.0, out=self._usage)
+
+        return self._usage[1:], float(self._usage[0])
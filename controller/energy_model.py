@@ -0,0 +1,274 @@
+"""
+energy_model.py
+
+What-if energy estimates for candidate actions (speed, CPU frequency,
+GPU frequency), so a proposed action can be checked against the best
+alternatives instead of only the current operating point.
+
+    mechanical   MotorMonitor's rolling-resistance model (mass_kg,
+                 rolling_coeff, drivetrain_efficiency), plus grade on slopes
+    compute      linear model fitted on the sys logs:
+                     COMPW ~ p0 + a_c*f_c + b_c*u_c*f_c + a_g*f_g + b_g*u_g*f_g
+                 (f in GHz, u utilization in [0, 1]; coefficients kept >= 0)
+
+For a candidate frequency the current work is assumed to be conserved:
+u' = u * f / f'. A candidate whose projected utilization exceeds
+`util_limit` cannot keep up with the load and is ranked after every one
+that can. Candidates are ranked by energy per metre (J/m), the EPD column
+of the logs: (compute + mechanical power) / speed.
+
+A whole (speed x CPU x GPU) grid is scored with broadcasting in one pass:
+
+    model = EnergyModel.from_config()
+    speeds, cpus, gpus = model.grid(platform)
+    scores = model.score_grid(state, speeds, cpus, gpus)      # arrays shaped (S, C, G)
+    model.shortlist(state, k=5)
+"""
+
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import yaml
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_PATH = os.path.join(BASE_DIR, "config.yaml")
+SYS_LOGS = (os.path.join(BASE_DIR, "..", "train", "data_generator", "csv_data", "pdqn_sys.csv"),)
+
+GRAVITY = 9.81
+
+COMPUTE_FEATURES = ("idle", "cpu_ghz", "cpu_util_ghz", "gpu_ghz", "gpu_util_ghz")
+
+
+def _compute_features(cpu_ghz, cpu_util, gpu_ghz, gpu_util) -> np.ndarray:
+    cpu_ghz, cpu_util, gpu_ghz, gpu_util = np.broadcast_arrays(
+        *(np.asarray(x, dtype=float) for x in (cpu_ghz, cpu_util, gpu_ghz, gpu_util)))
+    return np.stack([np.ones_like(cpu_ghz), cpu_ghz, cpu_util * cpu_ghz, gpu_ghz, gpu_util * gpu_ghz], axis=-1)
+
+
+def _nonnegative_lstsq(X: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Least squares with coefficients >= 0: refit without the most negative one until none is left."""
+    active = list(range(X.shape[1]))
+    coef = np.zeros(X.shape[1])
+    while active:
+        sol = np.linalg.lstsq(X[:, active], y, rcond=None)[0]
+        if (sol >= 0).all():
+            coef[active] = sol
+            break
+        del active[int(np.argmin(sol))]
+    return coef
+
+
+# ============================================================
+# Compute power
+# ============================================================
+
+class ComputePowerModel:
+
+    def __init__(self, coef: Sequence[float], rmse_w: Optional[float] = None):
+        """coef: watts per COMPUTE_FEATURES term"""
+        if len(coef) != len(COMPUTE_FEATURES):
+            raise ValueError(f"expected {len(COMPUTE_FEATURES)} coefficients ({', '.join(COMPUTE_FEATURES)}), got {len(coef)}")
+        self.coef = np.asarray(coef, dtype=float)
+        self.rmse_w = rmse_w
+
+    def __repr__(self):
+        terms = ", ".join(f"{n}={c:.3f}" for n, c in zip(COMPUTE_FEATURES, self.coef))
+        return f"ComputePowerModel({terms} W, rmse={self.rmse_w})"
+
+    @classmethod
+    def fit(cls, sys_paths: Sequence[str] = SYS_LOGS) -> "ComputePowerModel":
+        """Fit on the COMPW (mW), FREQ_L/FREQ_G (kHz), UTIL* and GPU_UTIL (%) columns of sys logs."""
+        import pandas as pd
+
+        frames = [pd.read_csv(p) for p in sys_paths]
+        df = pd.concat(frames, ignore_index=True)
+        df = df[(df.COMPW > 0) & (df.FREQ_L > 0) & (df.FREQ_G > 0)]
+        if df.empty:
+            raise ValueError(f"No usable rows in {list(sys_paths)}")
+
+        cpu_util = df.filter(regex=r"^UTIL\d+$").mean(axis=1).to_numpy() / 100.0
+        gpu_util = df.GPU_UTIL.clip(0, 100).to_numpy() / 100.0
+        X = _compute_features(df.FREQ_L.to_numpy() / 1e6, cpu_util, df.FREQ_G.to_numpy() / 1e6, gpu_util)
+        y = df.COMPW.to_numpy() / 1e3
+        coef = _nonnegative_lstsq(X, y)
+        rmse = float(np.sqrt(np.mean((X @ coef - y) ** 2)))
+        return cls(coef, rmse_w=rmse)
+
+    def power_w(self, cpu_ghz, cpu_util, gpu_ghz, gpu_util) -> np.ndarray:
+        """Compute power (W); arguments broadcast, utilizations in [0, 1]."""
+        p0, a_c, b_c, a_g, b_g = self.coef
+        # Term by term rather than features @ coef: a CPU x GPU grid stays (C, 1) + (1, G)
+        return p0 + cpu_ghz * (a_c + b_c * cpu_util) + gpu_ghz * (a_g + b_g * gpu_util)
+
+
+# ============================================================
+# Energy model
+# ============================================================
+
+class EnergyModel:
+
+    def __init__(self,
+                 mass_kg: float,
+                 rolling_coeff: float,
+                 drivetrain_efficiency: float,
+                 compute: ComputePowerModel,
+                 util_limit: float = 0.9):
+        """
+        mass_kg, rolling_coeff, drivetrain_efficiency: as in MotorMonitor
+        compute:    compute-power model (see ComputePowerModel.fit)
+        util_limit: highest projected utilization (0-1) a candidate may run at
+        """
+        self.mass = mass_kg
+        self.c_rr = rolling_coeff
+        self.eta = drivetrain_efficiency
+        self.compute = compute
+        self.util_limit = util_limit
+
+    @classmethod
+    def from_monitor(cls, monitor, compute: Optional[ComputePowerModel] = None, **kwargs) -> "EnergyModel":
+        """Share the parameters of a running MotorMonitor."""
+        return cls(monitor.mass, monitor.c_rr, monitor.eta, compute or ComputePowerModel.fit(), **kwargs)
+
+    @classmethod
+    def from_config(cls, config_path: str = CONFIG_PATH, sys_paths: Sequence[str] = SYS_LOGS,
+                    **kwargs) -> "EnergyModel":
+        """Motor parameters from the `motor` section of config.yaml, compute model fitted on `sys_paths`."""
+        with open(config_path, "r") as f:
+            motor = yaml.safe_load(f)["motor"]
+        return cls(motor["mass_kg"], motor["rolling_coeff"], motor["drivetrain_efficiency"],
+                   ComputePowerModel.fit(sys_paths), **kwargs)
+
+    # --------------------------------------------------------
+    # Power terms
+    # --------------------------------------------------------
+    def mech_power_w(self, speed, slope_deg=0.0) -> np.ndarray:
+        """Traction power (W); equals MotorMonitor._compute_power on flat ground. No regeneration downhill."""
+        theta = np.radians(slope_deg)
+        force = self.mass * GRAVITY * (self.c_rr * np.cos(theta) + np.sin(theta))
+        return np.maximum(force, 0.0) * np.asarray(speed, dtype=float) / self.eta
+
+    def evaluate(self, state: Dict, speed, cpu_ghz, gpu_ghz) -> Dict[str, np.ndarray]:
+        """
+        Estimates for candidates (arguments broadcast against each other) from
+        a Vec2Lang raw state: cpu_util / gpu_util in %, cpu_freq / gpu_freq in
+        GHz, optional slope in degrees.
+        """
+        speed = np.asarray(speed, dtype=float)
+        cpu_ghz = np.asarray(cpu_ghz, dtype=float)
+        gpu_ghz = np.asarray(gpu_ghz, dtype=float)
+
+        # Same work at another clock: u' = u * f / f'
+        cpu_util = state["cpu_util"] / 100.0 * state["cpu_freq"] / cpu_ghz
+        gpu_util = state["gpu_util"] / 100.0 * state["gpu_freq"] / gpu_ghz
+        compute_w = self.compute.power_w(cpu_ghz, np.minimum(cpu_util, 1.0), gpu_ghz, np.minimum(gpu_util, 1.0))
+        mech_w = self.mech_power_w(speed, state.get("slope", 0.0) or 0.0)
+        total_w = compute_w + mech_w
+        with np.errstate(divide="ignore"):
+            j_per_m = np.where(speed > 0, total_w / speed, np.inf)
+        overload = np.maximum(np.maximum(cpu_util, gpu_util) - self.util_limit, 0.0)
+        return {
+            "mech_w": mech_w,
+            "compute_w": compute_w,
+            "total_w": total_w,
+            "j_per_m": j_per_m,
+            "cpu_util": cpu_util,
+            "gpu_util": gpu_util,
+            "overload": overload,
+            "feasible": overload == 0.0,
+        }
+
+    # --------------------------------------------------------
+    # Candidate grids
+    # --------------------------------------------------------
+    def grid(self, platform=None, v_min: float = 0.5, n_speed: int = 12, n_cpu: int = 12,
+             n_gpu: int = 8) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Evenly spaced candidates within the platform bounds (vec2lang.PlatformConfig)."""
+        if platform is None:
+            from vec2lang import PlatformConfig
+            platform = PlatformConfig(os.path.join(BASE_DIR, "platform.yaml"))
+        return (np.linspace(v_min, platform.max_speed, n_speed),
+                np.linspace(platform.cpu_freq_min, platform.cpu_freq_max, n_cpu),
+                np.linspace(platform.gpu_freq_min, platform.gpu_freq_max, n_gpu))
+
+    def score_grid(self, state: Dict, speeds, cpus, gpus) -> Dict[str, np.ndarray]:
+        """
+        evaluate() over the full (speed x CPU x GPU) product. total_w and j_per_m
+        are (S, C, G); terms independent of an axis keep size 1 there (mech_w is
+        (S, 1, 1), the compute terms (1, C, G)) and broadcast to it.
+        """
+        s, c, g = np.ix_(np.asarray(speeds, dtype=float), np.asarray(cpus, dtype=float),
+                         np.asarray(gpus, dtype=float))
+        return self.evaluate(state, s, c, g)
+
+    def _ranked(self, scores: Dict[str, np.ndarray], k: int) -> np.ndarray:
+        """Flat indices of the k best: feasible ones by J/m, then the least overloaded."""
+        shape = scores["j_per_m"].shape
+        j_per_m = scores["j_per_m"].ravel()
+        feasible = np.broadcast_to(scores["feasible"], shape).ravel()
+        if np.count_nonzero(feasible) >= k:
+            key = np.where(feasible, j_per_m, np.inf)
+            top = np.argpartition(key, k - 1)[:k] if k < key.size else np.arange(key.size)
+            return top[np.argsort(key[top])]
+        # Too few candidates carry the load: full sort on overload, then J/m
+        overload = np.broadcast_to(scores["overload"], shape).ravel()
+        return np.lexsort((j_per_m, overload))[:k]
+
+    def shortlist(self, state: Dict, k: int = 5, grid: Optional[Tuple] = None) -> List[Dict]:
+        """The k best candidates of `grid` (default: self.grid()) for this state."""
+        speeds, cpus, gpus = grid if grid is not None else self.grid()
+        scores = self.score_grid(state, speeds, cpus, gpus)
+        shape = scores["j_per_m"].shape
+        views = {key: np.broadcast_to(scores[key], shape) for key in ("total_w", "j_per_m", "feasible")}
+        out = []
+        for index in self._ranked(scores, k):
+            i, j, l = np.unravel_index(index, shape)
+            out.append(self._candidate(views, (i, j, l), speeds[i], cpus[j], gpus[l]))
+        return out
+
+    @staticmethod
+    def _candidate(scores, index, speed, cpu_ghz, gpu_ghz) -> Dict:
+        return {
+            "speed": float(speed),
+            "cpu_ghz": float(cpu_ghz),
+            "gpu_ghz": float(gpu_ghz),
+            "total_w": float(scores["total_w"][index]),
+            "j_per_m": float(scores["j_per_m"][index]),
+            "feasible": bool(scores["feasible"][index]),
+        }
+
+    # --------------------------------------------------------
+    # Proposed actions
+    # --------------------------------------------------------
+    def check(self, state: Dict, speed: float, cpu_ghz: float, gpu_ghz: float,
+              grid: Optional[Tuple] = None) -> Dict:
+        """
+        Estimate for a proposed action next to the best candidate of `grid`;
+        `excess` is the proposal's extra energy per metre relative to it.
+        """
+        proposal = self.evaluate(state, speed, cpu_ghz, gpu_ghz)
+        estimate = self._candidate(proposal, (), speed, cpu_ghz, gpu_ghz)
+        best = self.shortlist(state, k=1, grid=grid)[0]
+        estimate["excess"] = estimate["j_per_m"] / best["j_per_m"] - 1.0 if best["j_per_m"] > 0 else 0.0
+        return {"proposal": estimate, "best": best}
+
+    def refine(self, state: Dict, speed: float, cpu_ghz: float, gpu_ghz: float,
+               grid: Optional[Tuple] = None) -> Dict:
+        """
+        Keep the proposed speed and pick the grid CPU/GPU frequencies with the
+        lowest J/m that still carry the load; the proposal itself stays a candidate.
+        """
+        _, cpus, gpus = grid if grid is not None else self.grid()
+        cpus = np.unique(np.append(cpus, cpu_ghz))
+        gpus = np.unique(np.append(gpus, gpu_ghz))
+        return self.shortlist(state, k=1, grid=(np.array([float(speed)]), cpus, gpus))[0]
+
+
+def render_shortlist(shortlist: List[Dict]) -> str:
+    """Prompt-ready lines for a shortlist, lowest energy per metre first."""
+    lines = ["Energy-efficient candidates (estimated):"]
+    for c in shortlist:
+        note = "" if c["feasible"] else ", overloaded"
+        lines.append(f"- Speed: {c['speed']:.1f} m/s, CPU: {c['cpu_ghz']:.2f} GHz, GPU: {c['gpu_ghz']:.2f} GHz"
+                     f" -> {c['j_per_m']:.2f} J/m{note}")
+    return "\n".join(lines)
@@ -2,6 +2,10 @@ import os
 import psutil
 from typing import Dict
 import yaml
+from sensor_reader import SysfsReader, get_shared_reader
+from cpu_util import CpuStatEngine, PROC_STAT
+
+CPU_FREQ_PATH = "/sys/devices/system/cpu/cpu{i}/cpufreq/scaling_cur_freq"
 
 
 # ============================================================
@@ -19,35 +23,36 @@ def load_config():
 # ============================================================
 class JetsonMonitor:
 
-    def __init__(self, config):
+    def __init__(self, config, reader: SysfsReader = None):
         self.config = config
         self.jetson = config["jetson"]
+        self.reader = reader if reader is not None else get_shared_reader()
 
         self.cpu_count = psutil.cpu_count()
         self.ina_base = self.jetson["ina_base"]
+        self.cpu_freq_path = self.jetson.get("cpu_freq_path", CPU_FREQ_PATH)
+
+        # Private cursor: usage is the delta since *this* monitor's last sample
+        self.cpu_stat = CpuStatEngine(cpu_count=self.cpu_count, path=self.jetson.get("proc_stat_path", PROC_STAT))
+        self.cpu_cursor = self.cpu_stat.cursor()
 
     # ============================================================
     # Utility
     # ============================================================
-    @staticmethod
-    def _read_float(path: str, scale: float = 1.0):
-        try:
-            with open(path, "r") as f:
-                return float(f.read().strip()) / scale
-        except Exception:
-            return None
+    def _read_float(self, path: str, scale: float = 1.0):
+        return self.reader.read_float(path, scale)
 
     # ============================================================
     # CPU
     # ============================================================
     def get_cpu(self) -> Dict:
 
-        usage = psutil.cpu_percent(interval=None)
+        per_core, usage = self.cpu_cursor.read()
         freqs = []
 
         for i in range(self.cpu_count):
             f = self._read_float(
-                f"/sys/devices/system/cpu/cpu{i}/cpufreq/scaling_cur_freq",
+                self.cpu_freq_path.format(i=i),
                 scale=self.jetson["cpu_freq_scale"],
             )
             if f is not None:
@@ -55,6 +60,7 @@ class JetsonMonitor:
 
         return {
             "usage": usage,
+            "per_core": per_core.tolist(),
             "freq_avg_mhz": sum(freqs) / len(freqs) if freqs else None,
         }
 
@@ -118,30 +124,46 @@ class JetsonMonitor:
         }
 
     # ============================================================
-    # Unified Snapshot
+    # Signal Groups (sample() keys, split by update rate)
     # ============================================================
-    def sample(self) -> Dict:
-
+    def sample_cpu(self) -> Dict:
         cpu = self.get_cpu()
-        gpu = self.get_gpu()
-        mem = self.get_memory()
-        pwr = self.get_power()
-
-        return {
+        data = {
             "cpu_usage": cpu["usage"],
             "cpu_freq_mhz": cpu["freq_avg_mhz"],
+        }
+        for i, u in enumerate(cpu["per_core"]):
+            data[f"cpu_util{i}"] = u
+        return data
 
+    def sample_gpu(self) -> Dict:
+        gpu = self.get_gpu()
+        return {
             "gpu_freq_mhz": gpu["freq_mhz"],
             "gpu_temp_c": gpu["temp_c"],
+        }
 
+    def sample_memory(self) -> Dict:
+        mem = self.get_memory()
+        return {
             "mem_used_mb": mem["used_mb"],
             "mem_percent": mem["percent"],
-
-            "power_total_mw": pwr["power_total_mw"],
-            "power_compute_mw": pwr["power_compute_mw"],
-            "power_soc_mw": pwr["power_soc_mw"],
         }
 
+    def sample_power(self) -> Dict:
+        return self.get_power()
+
+    # ============================================================
+    # Unified Snapshot
+    # ============================================================
+    def sample(self) -> Dict:
+        data = {}
+        data.update(self.sample_cpu())
+        data.update(self.sample_gpu())
+        data.update(self.sample_memory())
+        data.update(self.sample_power())
+        return data
+
 
 # ============================================================
 # Standalone Test
@@ -0,0 +1,111 @@
+"""
+sensor_reader.py
+
+Persistent sysfs reader shared by the monitors.
+
+Each sysfs node is opened once and re-read with os.preadv at offset 0
+into a reused buffer, so a sample costs one syscall per node instead of
+open/read/close. A handle is reopened only when a read on it fails
+(driver rebind, hotplug, hwmon renumbering).
+"""
+
+import os
+import threading
+from typing import Dict, Optional
+
+
+class SysfsReader:
+
+    def __init__(self, buf_size: int = 64):
+        self._fds: Dict[str, int] = {}
+        self._buf = bytearray(buf_size)
+        self._view = memoryview(self._buf)
+        self._lock = threading.Lock()
+
+    # ============================================================
+    # Handle management
+    # ============================================================
+    def _open(self, path: str) -> Optional[int]:
+        try:
+            fd = os.open(path, os.O_RDONLY | getattr(os, "O_CLOEXEC", 0))
+        except OSError:
+            return None
+        self._fds[path] = fd
+        return fd
+
+    def _drop(self, path: str):
+        fd = self._fds.pop(path, None)
+        if fd is not None:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def close(self):
+        with self._lock:
+            for path in list(self._fds):
+                self._drop(path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ============================================================
+    # Reads
+    # ============================================================
+    def _pread(self, path: str) -> Optional[bytes]:
+        fd = self._fds.get(path)
+        if fd is None:
+            fd = self._open(path)
+            if fd is None:
+                return None
+
+        try:
+            n = os.preadv(fd, [self._view], 0)
+        except OSError:
+            # Stale handle: reopen once and retry
+            self._drop(path)
+            fd = self._open(path)
+            if fd is None:
+                return None
+            try:
+                n = os.preadv(fd, [self._view], 0)
+            except OSError:
+                self._drop(path)
+                return None
+
+        return bytes(self._view[:n])
+
+    def read_text(self, path: str) -> Optional[str]:
+        with self._lock:
+            raw = self._pread(path)
+        if raw is None:
+            return None
+        return raw.decode("ascii", errors="ignore").strip()
+
+    def read_float(self, path: str, scale: float = 1.0) -> Optional[float]:
+        with self._lock:
+            raw = self._pread(path)
+        if raw is None:
+            return None
+        try:
+            return float(raw) / scale
+        except ValueError:
+            return None
+
+
+# ============================================================
+# Process-wide shared reader
+# ============================================================
+_shared_reader: Optional[SysfsReader] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_reader() -> SysfsReader:
+    global _shared_reader
+    with _shared_lock:
+        if _shared_reader is None:
+            _shared_reader = SysfsReader()
+        return _shared_reader
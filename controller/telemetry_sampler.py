@@ -0,0 +1,224 @@
+"""
+telemetry_sampler.py
+
+Multi-rate background sampler.
+
+Each signal group (power, cpu, gpu, memory, battery, motor) is polled at
+its own period on one background thread and written into a preallocated
+NumPy structured ring buffer whose columns are the monitor's sample()
+keys plus a timestamp column "t".
+
+The ring is single-writer / lock-free for readers: every row is written
+twice (at i and i + capacity), so any window of up to `capacity` rows is
+one contiguous slice and can be returned as a zero-copy view.
+"""
+
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+# ============================================================
+# Ring Buffer
+# ============================================================
+class TelemetryRing:
+
+    def __init__(self, fields: List[str], capacity: int = 4096):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.fields = list(fields)
+        self.capacity = capacity
+        self.dtype = np.dtype([("t", "f8")] + [(k, "f8") for k in self.fields])
+        self._data = np.full(2 * capacity, np.nan, dtype=self.dtype)
+        # Total rows ever written; only the writer thread advances it
+        self._count = 0
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def __len__(self) -> int:
+        return min(self._count, self.capacity)
+
+    def push(self, t: float, values: Dict):
+        row = (t,) + tuple(
+            np.nan if values.get(k) is None else values[k] for k in self.fields
+        )
+        i = self._count % self.capacity
+        self._data[i] = row
+        self._data[i + self.capacity] = row
+        self._count += 1
+
+    def window(self, n: Optional[int] = None) -> np.ndarray:
+        """Zero-copy view of the last n rows, oldest first.
+
+        The view aliases the ring: rows older than `capacity` pushes are
+        overwritten in place. Compare `count` before and after use, or
+        call snapshot(), if the data must outlive the next writes.
+        """
+        c = self._count
+        n = len(self) if n is None else min(n, c, self.capacity)
+        start = (c - n) % self.capacity
+        return self._data[start:start + n]
+
+    def snapshot(self, n: Optional[int] = None) -> np.ndarray:
+        return self.window(n).copy()
+
+    def latest(self) -> Optional[np.void]:
+        if self._count == 0:
+            return None
+        return self._data[(self._count - 1) % self.capacity]
+
+    def since(self, seq: int) -> Tuple[np.ndarray, int]:
+        """Rows written after sequence number `seq` and the new cursor.
+
+        Lets each consumer keep its own cursor; if it fell behind by more
+        than `capacity` rows, only the newest `capacity` rows are returned.
+        """
+        c = self._count
+        return self.window(c - seq), c
+
+
+# ============================================================
+# Sampler
+# ============================================================
+class SignalGroup:
+
+    def __init__(self, name: str, fn: Callable[[], Dict], period_s: float,
+                 fields: List[str], capacity: int):
+        self.name = name
+        self.fn = fn
+        self.period_s = period_s
+        self.ring = TelemetryRing(fields, capacity)
+        self.errors = 0
+        # Clock time of the last successful poll; the schedule resumes from it
+        self.last_poll: Optional[float] = None
+
+
+class TelemetrySampler:
+
+    def __init__(self, capacity: int = 4096, clock: Callable[[], float] = time.monotonic):
+        self.capacity = capacity
+        self.clock = clock
+        self.groups: Dict[str, SignalGroup] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def add_group(self, name: str, fn: Callable[[], Dict], period_s: float,
+                  fields: Optional[List[str]] = None):
+        if self._thread is not None:
+            raise RuntimeError("Cannot add signal groups while the sampler is running")
+        if period_s <= 0:
+            raise ValueError(f"Sampling period for '{name}' must be positive")
+        first = None
+        if fields is None:
+            # Discover the column set from one synchronous sample. Sampling can
+            # advance monitor state (SOC integration, motor energy), so the
+            # sample is kept as the group's first row and the schedule resumes
+            # one period later instead of polling again
+            first = fn()
+            fields = list(first.keys())
+        group = SignalGroup(name, fn, period_s, fields, self.capacity)
+        if first is not None:
+            group.last_poll = self.clock()
+            group.ring.push(group.last_poll, first)
+        self.groups[name] = group
+
+    # --------------------------------------------------------
+    # Polling
+    # --------------------------------------------------------
+    def poll(self, group: SignalGroup):
+        try:
+            values = group.fn()
+        except Exception:
+            group.errors += 1
+            return
+        group.last_poll = self.clock()
+        group.ring.push(group.last_poll, values)
+
+    def _run(self):
+        now = self.clock()
+        next_due = {name: now if g.last_poll is None else g.last_poll + g.period_s
+                    for name, g in self.groups.items()}
+
+        while not self._stop.is_set():
+            now = self.clock()
+            for name, group in self.groups.items():
+                if now >= next_due[name]:
+                    self.poll(group)
+                    # Skip missed slots instead of bursting to catch up
+                    next_due[name] += group.period_s * max(
+                        1, int((now - next_due[name]) / group.period_s) + 1
+                    )
+            wait = min(next_due.values()) - self.clock()
+            if wait > 0:
+                self._stop.wait(wait)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="telemetry-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # --------------------------------------------------------
+    # Consumers
+    # --------------------------------------------------------
+    def ring(self, group: str) -> TelemetryRing:
+        return self.groups[group].ring
+
+    def window(self, group: str, n: Optional[int] = None) -> np.ndarray:
+        return self.groups[group].ring.window(n)
+
+    def latest(self) -> Dict:
+        """Latest value of every column across all groups (sample()-style dict)."""
+        data = {}
+        for group in self.groups.values():
+            row = group.ring.latest()
+            if row is None:
+                continue
+            for k in group.ring.fields:
+                v = float(row[k])
+                data[k] = None if np.isnan(v) else v
+        return data
+
+
+# ============================================================
+# Default wiring from config.yaml
+# ============================================================
+def build_sampler(config, jetson=None, battery=None, motor=None) -> TelemetrySampler:
+    cfg = config["sampler"]
+    periods = cfg["groups"]
+    sampler = TelemetrySampler(capacity=cfg["ring_capacity"])
+
+    sources = {}
+    if jetson is not None:
+        sources["power"] = jetson.sample_power
+        sources["cpu"] = jetson.sample_cpu
+        sources["gpu"] = jetson.sample_gpu
+        sources["memory"] = jetson.sample_memory
+    if battery is not None:
+        sources["battery"] = battery.sample
+    if motor is not None:
+        sources["motor"] = motor.sample
+
+    for name, fn in sources.items():
+        period = periods.get(name, config["controller"]["sample_period_s"])
+        sampler.add_group(name, fn, period)
+    return sampler
@@ -0,0 +1,105 @@
+"""
+thresholds.py
+
+Frozen threshold tables.
+
+A ThresholdTable holds sorted band edges and the label of each band,
+compiled once from config so that hot paths classify with a single
+bisect (scalar) or np.digitize (arrays) instead of nested dict lookups
+and if/elif ladders. Shared by Vec2Lang and the SFT data generator.
+"""
+
+from bisect import bisect_left, bisect_right
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class ThresholdTable:
+
+    __slots__ = ("name", "edges", "labels", "scale", "by_ratio", "strict", "nan_level",
+                 "_edges_arr", "_labels_arr", "_bisect")
+
+    def __init__(self, name: str, edges: Sequence[float], labels: Sequence[str],
+                 scale: Optional[float] = None, by_ratio: bool = False,
+                 strict: bool = False, nan_level: Optional[int] = None):
+        """
+        name:   signal name, used in error messages
+        edges:  band boundaries, ascending; len(labels) == len(edges) + 1
+        labels: band labels, lowest band first
+        scale:  if set, ratio = round(value / scale, 3); scale <= 0 maps
+                every value to ratio 0. Without a scale the ratio is the value
+        by_ratio: classify the ratio instead of the raw value
+        strict: False -> a value equal to an edge falls in the upper band
+                (x < edge stays below), True -> it stays in the lower band
+                (x > edge moves up)
+        nan_level: band for NaN values; by default NaN lands in the top band
+        """
+        edges = tuple(float(e) for e in edges)
+        if len(labels) != len(edges) + 1:
+            raise ValueError(f"{name}: expected {len(edges) + 1} labels for {len(edges)} edges, got {len(labels)}")
+        if any(a > b for a, b in zip(edges, edges[1:])):
+            raise ValueError(f"{name}: threshold edges must be ascending, got {list(edges)}")
+
+        self.name = name
+        self.edges = edges
+        self.labels = tuple(labels)
+        self.scale = None if scale is None else float(scale)
+        self.by_ratio = by_ratio
+        self.strict = strict
+        self.nan_level = nan_level
+        self._edges_arr = np.array(edges, dtype=float)
+        self._labels_arr = np.array(self.labels)
+        self._bisect = bisect_left if strict else bisect_right
+
+    def __repr__(self):
+        return f"ThresholdTable({self.name!r}, edges={list(self.edges)}, labels={list(self.labels)})"
+
+    # ============================================================
+    # Scalar path
+    # ============================================================
+    def ratio(self, value: float) -> float:
+        if self.scale is None:
+            return value
+        if self.scale <= 0:
+            return 0.0
+        return round(value / self.scale, 3)
+
+    def level(self, value: float) -> int:
+        if self.nan_level is not None and value != value:
+            return self.nan_level
+        return self._bisect(self.edges, self.ratio(value) if self.by_ratio else value)
+
+    def classify(self, value: float) -> Tuple[float, str]:
+        """(ratio, label) of a single value."""
+        return self.ratio(value), self.labels[self.level(value)]
+
+    # ============================================================
+    # Vectorized path
+    # ============================================================
+    def ratio_array(self, values) -> np.ndarray:
+        values = np.asarray(values, dtype=float)
+        if self.scale is None:
+            return values
+        if self.scale <= 0:
+            return np.zeros_like(values)
+        return np.round(values / self.scale, 3)
+
+    def _digitize(self, values: np.ndarray) -> np.ndarray:
+        levels = np.digitize(values, self._edges_arr, right=self.strict)
+        if self.nan_level is not None:
+            levels[np.isnan(values)] = self.nan_level
+        return levels
+
+    def level_array(self, values) -> np.ndarray:
+        values = np.asarray(values, dtype=float)
+        return self._digitize(self.ratio_array(values) if self.by_ratio else values)
+
+    def label_array(self, levels) -> np.ndarray:
+        return self._labels_arr[levels]
+
+    def classify_array(self, values) -> Tuple[np.ndarray, np.ndarray]:
+        """(ratios, levels) of an array of values; labels via label_array(levels)."""
+        values = np.asarray(values, dtype=float)
+        ratios = self.ratio_array(values)
+        return ratios, self._digitize(ratios if self.by_ratio else values)
@@ -11,74 +11,124 @@ Platform-specific bounds are loaded from YAML config.
 from typing import Dict, Any
 import yaml
 
+from thresholds import ThresholdTable
+
+
+# ============================================================
+# Label tables (ordered low -> high)
+# ============================================================
+
+TEMP_LABELS = ("normal", "elevated", "high", "critical")
+SOC_LABELS = ("critical", "low charge", "moderate charge", "high charge")
+UTIL_LABELS = ("under-utilized", "balanced", "high load", "saturated")
+FREQ_LABELS = ("low", "moderate", "high", "maximum")
+SPEED_LABELS = ("conservative", "balanced", "aggressive", "maximum")
+
+RATIO_EDGES = (0.4, 0.7, 0.9)
+
+# Every key the platform YAML must provide
+REQUIRED_KEYS = (
+    ("motion", "speed", "max"),
+    ("cpu", "freq_max"),
+    ("cpu", "freq_min"),
+    ("cpu", "utilization_thresholds", "under_utilized"),
+    ("cpu", "utilization_thresholds", "balanced"),
+    ("cpu", "utilization_thresholds", "high"),
+    ("gpu", "freq_max"),
+    ("gpu", "freq_min"),
+    ("gpu", "utilization_thresholds", "under_utilized"),
+    ("gpu", "utilization_thresholds", "balanced"),
+    ("gpu", "utilization_thresholds", "high"),
+    ("thermal", "limit"),
+    ("thermal", "warning"),
+    ("thermal", "high"),
+    ("thermal", "critical"),
+    ("battery", "soc", "low"),
+    ("battery", "soc", "moderate"),
+    ("battery", "soc", "high"),
+    ("risk_rules", "thermal_cpu_ratio"),
+    ("risk_rules", "low_soc_ratio"),
+    ("risk_rules", "energy_speed_ratio"),
+)
+
 
 # ============================================================
 # Platform Config Loader
 # ============================================================
 
 class PlatformConfig:
+    """
+    Platform bounds, validated and frozen at load time.
+
+    A missing or non-numeric key raises ValueError here rather than a
+    KeyError in the middle of the control loop. The per-signal threshold
+    tables live in `tables` and are shared with convert_batch() and the
+    data generator.
+    """
 
     def __init__(self, yaml_path: str):
         with open(yaml_path, "r") as f:
             self.data = yaml.safe_load(f)
+        self._validate()
+        self._freeze()
+
+    def _validate(self):
+        missing, invalid = [], []
+        for path in REQUIRED_KEYS:
+            node = self.data
+            for key in path:
+                if not isinstance(node, dict) or key not in node:
+                    missing.append(".".join(path))
+                    break
+                node = node[key]
+            else:
+                if isinstance(node, bool) or not isinstance(node, (int, float)):
+                    invalid.append(".".join(path))
+        if missing or invalid:
+            raise ValueError(
+                f"Invalid platform config: missing {missing or 'none'}, non-numeric {invalid or 'none'}"
+            )
+
+    def _freeze(self):
+        d = self.data
+
+        self.max_speed = float(d["motion"]["speed"]["max"])
+        self.cpu_freq_max = float(d["cpu"]["freq_max"])
+        self.cpu_freq_min = float(d["cpu"]["freq_min"])
+        self.gpu_freq_max = float(d["gpu"]["freq_max"])
+        self.gpu_freq_min = float(d["gpu"]["freq_min"])
+        self.cpu_util_thresholds = dict(d["cpu"]["utilization_thresholds"])
+        self.gpu_util_thresholds = dict(d["gpu"]["utilization_thresholds"])
+        self.thermal_cfg = dict(d["thermal"])
+        self.battery_soc_thresholds = dict(d["battery"]["soc"])
+        self.risk_rules = {k: float(v) for k, v in d["risk_rules"].items()}
+
+        thermal = self.thermal_cfg
+        soc = self.battery_soc_thresholds
+        util_edges = lambda t: (t["under_utilized"], t["balanced"], t["high"])
+
+        self.tables: Dict[str, ThresholdTable] = {
+            "temperature": ThresholdTable(
+                "temperature", (thermal["warning"], thermal["high"], thermal["critical"]),
+                TEMP_LABELS, scale=thermal["limit"]),
+            "battery_soc": ThresholdTable(
+                "battery_soc", (soc["low"], soc["moderate"], soc["high"]),
+                SOC_LABELS, scale=100.0, nan_level=0),
+            "cpu_utilization": ThresholdTable(
+                "cpu_utilization", util_edges(self.cpu_util_thresholds), UTIL_LABELS, scale=100.0),
+            "gpu_utilization": ThresholdTable(
+                "gpu_utilization", util_edges(self.gpu_util_thresholds), UTIL_LABELS, scale=100.0),
+            "speed": ThresholdTable(
+                "speed", RATIO_EDGES, SPEED_LABELS, scale=self.max_speed, by_ratio=True),
+            "cpu_frequency": ThresholdTable(
+                "cpu_frequency", RATIO_EDGES, FREQ_LABELS, scale=self.cpu_freq_max, by_ratio=True),
+            "gpu_frequency": ThresholdTable(
+                "gpu_frequency", RATIO_EDGES, FREQ_LABELS, scale=self.gpu_freq_max, by_ratio=True),
+        }
 
-    # ------------------------
-    # Motion
-    # ------------------------
-    @property
-    def max_speed(self):
-        return self.data["motion"]["speed"]["max"]
-
-    # ------------------------
-    # CPU
-    # ------------------------
-    @property
-    def cpu_freq_max(self):
-        return self.data["cpu"]["freq_max"]
-
-    @property
-    def cpu_freq_min(self):
-        return self.data["cpu"]["freq_min"]
-
-    @property
-    def cpu_util_thresholds(self):
-        return self.data["cpu"]["utilization_thresholds"]
-
-    # ------------------------
-    # GPU
-    # ------------------------
-    @property
-    def gpu_freq_max(self):
-        return self.data["gpu"]["freq_max"]
-
-    @property
-    def gpu_freq_min(self):
-        return self.data["gpu"]["freq_min"]
-
-    @property
-    def gpu_util_thresholds(self):
-        return self.data["gpu"]["utilization_thresholds"]
-
-    # ------------------------
-    # Thermal
-    # ------------------------
-    @property
-    def thermal_cfg(self):
-        return self.data["thermal"]
-
-    # ------------------------
-    # Battery
-    # ------------------------
-    @property
-    def battery_soc_thresholds(self):
-        return self.data["battery"]["soc"]
-
-    # ------------------------
-    # Risk
-    # ------------------------
-    @property
-    def risk_rules(self):
-        return self.data["risk_rules"]
+    def classify(self, signal: str, value: float):
+        """(ratio, label) of `value` for one of the signals in `tables`."""
+        return self.tables[signal].classify(value)
 
 
 # ============================================================
@@ -89,6 +139,8 @@ class Vec2Lang:
 
     def __init__(self, config: PlatformConfig):
         self.cfg = config
+        self.tables = config.tables
+        self.rules = config.risk_rules
 
     # --------------------------------------------------------
     # Utilities
@@ -105,18 +157,7 @@ class Vec2Lang:
     # --------------------------------------------------------
 
     def map_temperature(self, T: float):
-        thermal = self.cfg.thermal_cfg
-        ratio = self.normalize(T, thermal["limit"])
-
-        if T < thermal["warning"]:
-            label = "normal"
-        elif T < thermal["high"]:
-            label = "elevated"
-        elif T < thermal["critical"]:
-            label = "high"
-        else:
-            label = "critical"
-
+        ratio, label = self.tables["temperature"].classify(T)
         return {"value": f"{T}°C", "ratio": ratio, "label": label}
 
     # --------------------------------------------------------
@@ -124,54 +165,23 @@ class Vec2Lang:
     # --------------------------------------------------------
 
     def map_soc(self, soc: float):
-        thresholds = self.cfg.battery_soc_thresholds
-        ratio = round(soc / 100.0, 3)
-
-        if soc >= thresholds["high"]:
-            label = "high charge"
-        elif soc >= thresholds["moderate"]:
-            label = "moderate charge"
-        elif soc >= thresholds["low"]:
-            label = "low charge"
-        else:
-            label = "critical"
-
+        ratio, label = self.tables["battery_soc"].classify(soc)
         return {"value": f"{soc}%", "ratio": ratio, "label": label}
 
     # --------------------------------------------------------
     # Utilization
     # --------------------------------------------------------
 
-    def map_util(self, util: float, thresholds: Dict[str, float]):
-        ratio = round(util / 100.0, 3)
-
-        if util < thresholds["under_utilized"]:
-            label = "under-utilized"
-        elif util < thresholds["balanced"]:
-            label = "balanced"
-        elif util < thresholds["high"]:
-            label = "high load"
-        else:
-            label = "saturated"
-
+    def map_util(self, util: float, table: ThresholdTable):
+        ratio, label = table.classify(util)
         return {"value": f"{util}%", "ratio": ratio, "label": label}
 
     # --------------------------------------------------------
     # Frequency
     # --------------------------------------------------------
 
-    def map_freq(self, freq: float, max_freq: float):
-        ratio = self.normalize(freq, max_freq)
-
-        if ratio < 0.4:
-            label = "low"
-        elif ratio < 0.7:
-            label = "moderate"
-        elif ratio < 0.9:
-            label = "high"
-        else:
-            label = "maximum"
-
+    def map_freq(self, freq: float, table: ThresholdTable):
+        ratio, label = table.classify(freq)
         return {"value": f"{freq} GHz", "ratio": ratio, "label": label}
 
     # --------------------------------------------------------
@@ -179,17 +189,7 @@ class Vec2Lang:
     # --------------------------------------------------------
 
     def map_speed(self, speed: float):
-        ratio = self.normalize(speed, self.cfg.max_speed)
-
-        if ratio < 0.4:
-            label = "conservative"
-        elif ratio < 0.7:
-            label = "balanced"
-        elif ratio < 0.9:
-            label = "aggressive"
-        else:
-            label = "maximum"
-
+        ratio, label = self.tables["speed"].classify(speed)
         return {"value": f"{speed} m/s", "ratio": ratio, "label": label}
 
     # --------------------------------------------------------
@@ -197,7 +197,7 @@ class Vec2Lang:
     # --------------------------------------------------------
 
     def assess_risk(self, temp, cpu_freq, soc, speed):
-        rules = self.cfg.risk_rules
+        rules = self.rules
         risks = []
 
         if temp["label"] in ["high", "critical"] and cpu_freq["ratio"] > rules["thermal_cpu_ratio"]:
@@ -216,11 +216,11 @@ class Vec2Lang:
 
         temp = self.map_temperature(state["temperature"])
         soc = self.map_soc(state["soc"])
-        cpu_util = self.map_util(state["cpu_util"], self.cfg.cpu_util_thresholds)
-        gpu_util = self.map_util(state["gpu_util"], self.cfg.gpu_util_thresholds)
+        cpu_util = self.map_util(state["cpu_util"], self.tables["cpu_utilization"])
+        gpu_util = self.map_util(state["gpu_util"], self.tables["gpu_utilization"])
         speed = self.map_speed(state["speed"])
-        cpu_freq = self.map_freq(state["cpu_freq"], self.cfg.cpu_freq_max)
-        gpu_freq = self.map_freq(state["gpu_freq"], self.cfg.gpu_freq_max)
+        cpu_freq = self.map_freq(state["cpu_freq"], self.tables["cpu_frequency"])
+        gpu_freq = self.map_freq(state["gpu_freq"], self.tables["gpu_frequency"])
 
         risks = self.assess_risk(temp, cpu_freq, soc, speed)
 
@@ -242,3 +242,50 @@ class Vec2Lang:
             },
             "assessment": risks
         }
+
+    # --------------------------------------------------------
+    # Batch Conversion
+    # --------------------------------------------------------
+
+    def convert_batch(self, states):
+        """
+        Vectorized convert() over a whole window of states.
+
+        `states` is a DataFrame or a mapping of equal-length columns with the
+        same keys as convert(). Returns a mapping of columns (a DataFrame if a
+        DataFrame was given): <signal>_ratio, <signal>_label (and the integer
+        <signal>_level band index) for every mapped signal, plus one boolean
+        mask per risk from assess_risk().
+        """
+        inputs = {
+            "temperature": states["temperature"],
+            "battery_soc": states["soc"],
+            "cpu_utilization": states["cpu_util"],
+            "gpu_utilization": states["gpu_util"],
+            "speed": states["speed"],
+            "cpu_frequency": states["cpu_freq"],
+            "gpu_frequency": states["gpu_freq"],
+        }
+
+        out = {}
+        ratios, levels = {}, {}
+        for name, values in inputs.items():
+            table = self.tables[name]
+            ratios[name], levels[name] = table.classify_array(values)
+            out[f"{name}_ratio"] = ratios[name]
+            out[f"{name}_level"] = levels[name]
+            out[f"{name}_label"] = table.label_array(levels[name])
+
+        # Same rules as assess_risk(), as masks
+        rules = self.rules
+        out["thermal stress risk"] = (
+            (levels["temperature"] >= 2) & (ratios["cpu_frequency"] > rules["thermal_cpu_ratio"])
+        )
+        out["energy-aggressive behavior"] = (
+            (ratios["battery_soc"] < rules["low_soc_ratio"]) & (ratios["speed"] > rules["energy_speed_ratio"])
+        )
+
+        if hasattr(states, "columns"):
+            import pandas as pd
+            return pd.DataFrame(out, index=states.index)
+        return out
@@ -0,0 +1,111 @@
+"""
+decision_cache.py
+
+Decision cache keyed on the discretized Vec2Lang state.
+
+Consecutive control ticks usually map to the same Vec2Lang labels
+(temperature band, SOC band, utilization bands, speed/frequency class)
+and the same risk list. For such repeated states the previous controller
+parameters are returned directly instead of querying the LLM again.
+
+Entries are evicted least-recently-used beyond `max_entries`, and are
+treated as stale (a miss) once older than `ttl_s`.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+# Sections and fields of Vec2Lang.convert() whose labels form the key
+KEY_FIELDS = (
+    ("environment", "temperature"),
+    ("robot_state", "battery_soc"),
+    ("robot_state", "cpu_utilization"),
+    ("robot_state", "gpu_utilization"),
+    ("configuration", "speed"),
+    ("configuration", "cpu_frequency"),
+    ("configuration", "gpu_frequency"),
+)
+
+
+def state_key(converted: Dict[str, Any]) -> Tuple:
+    """Hashable key of a Vec2Lang.convert() result: terrain, every band label and the risks."""
+    labels = tuple(converted[section][field]["label"] for section, field in KEY_FIELDS)
+    terrain = converted["environment"].get("terrain")
+    return (terrain,) + labels + (tuple(sorted(converted["assessment"])),)
+
+
+class DecisionCache:
+
+    def __init__(self,
+                 max_entries: int = 256,
+                 ttl_s: Optional[float] = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        max_entries: LRU capacity
+        ttl_s:       staleness bound; entries older than this are not reused (None: never stale)
+        """
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, Dict[str, float], Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Dict[str, float]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            stamp, params, _ = entry
+            if self.ttl_s is not None and self.clock() - stamp > self.ttl_s:
+                del self._entries[key]
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(params)
+
+    def put(self, key: Hashable, params: Dict[str, float], record: Any = None):
+        """record: optional id of the journaled decision, returned by record()."""
+        with self._lock:
+            self._entries[key] = (self.clock(), dict(params), record)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evicted += 1
+
+    def record(self, key: Hashable) -> Any:
+        """Record id stored with the entry under `key`, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[2] if entry is not None else None
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        """Drop one entry, or everything (e.g. after a human instruction changes the goal)."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,302 @@
+"""
+decision_journal.py
+
+Incremental decision memory for the decision RAG.
+
+Every state -> decision (-> outcome) record the robot produces while
+running is appended to an append-only JSONL journal and inserted straight
+into an in-memory vector index, so later retrievals can use it without
+rebuilding anything or restarting LLMResourceManagement.
+
+Memory stays bounded: records older than `max_age_s` expire, and beyond
+`max_records` the least-used (then oldest) records are evicted. A use is
+a search() hit or a reuse of the decision through mark_used(), which
+LLMResourceManagement calls when the decision cache serves it again. Compaction
+rewrites both the journal file (dropping evicted records, folding
+outcomes into their record) and the in-memory arrays; it runs as soon as
+evicted rows exceed `compact_ratio` of the rows, and periodically on a
+background thread. Embeddings are stored in the journal (float16,
+base64), so a restart replays the journal without re-embedding.
+
+Journal lines:
+    {"op": "add", "id", "t", "state", "decision", "vec"}
+    {"op": "outcome", "id", "outcome"}
+    {"op": "evict", "id"}
+"""
+
+import base64
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from rag_index import normalize
+
+
+def _pack(vec: np.ndarray) -> str:
+    return base64.b64encode(vec.astype(np.float16).tobytes()).decode("ascii")
+
+
+def _unpack(data: str) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(data), dtype=np.float16).astype(np.float32)
+
+
+class DecisionJournal:
+
+    def __init__(self,
+                 path: str,
+                 embedder,
+                 max_records: int = 5000,
+                 max_age_s: Optional[float] = 6 * 3600.0,
+                 compact_every_s: Optional[float] = 300.0,
+                 compact_ratio: Optional[float] = 0.25,
+                 compact_min_rows: int = 256,
+                 clock: Callable[[], float] = time.time):
+        """
+        path:            journal directory (journal.jsonl inside)
+        embedder:        object with embed(texts) -> (n, dim) array, e.g. rag_index.LocalEmbedder
+        max_records:     live records kept in memory
+        max_age_s:       records older than this are evicted (None: no time limit)
+        compact_every_s: background compaction period (None: no background thread)
+        compact_ratio:   compact as soon as evicted rows exceed this share of all rows
+                         (and number at least compact_min_rows); None: only periodically
+        """
+        os.makedirs(path, exist_ok=True)
+        self.file = os.path.join(path, "journal.jsonl")
+        self.embedder = embedder
+        self.max_records = max_records
+        self.max_age_s = max_age_s
+        self.compact_ratio = compact_ratio
+        self.compact_min_rows = compact_min_rows
+        self.clock = clock
+        self._lock = threading.RLock()
+
+        # Columnar in-memory index; rows are tombstoned by `alive` until compaction
+        self._vecs: Optional[np.ndarray] = None
+        self._alive = np.zeros(0, dtype=bool)
+        self._t = np.zeros(0)
+        self._uses = np.zeros(0, dtype=np.int64)
+        self._records: List[Dict[str, Any]] = []
+        self._row: Dict[int, int] = {}
+        self._n = 0
+        self._dead = 0
+        self._next_id = 0
+
+        self._replay()
+        self._fh = open(self.file, "a")
+        # Evictions due at open time are journaled too, so they need the file handle
+        self._enforce_bounds()
+        self._maybe_compact()
+
+        self._stop = threading.Event()
+        self._thread = None
+        if compact_every_s:
+            self._thread = threading.Thread(target=self._compactor, args=(compact_every_s,),
+                                            name="decision-journal-compactor", daemon=True)
+            self._thread.start()
+
+    # --------------------------------------------------------
+    # In-memory index
+    # --------------------------------------------------------
+    def _insert(self, record: Dict[str, Any], vec: np.ndarray):
+        if self._vecs is None:
+            self._vecs = np.zeros((64, vec.shape[0]), dtype=np.float32)
+            self._alive = np.zeros(64, dtype=bool)
+            self._t = np.zeros(64)
+            self._uses = np.zeros(64, dtype=np.int64)
+        if self._n == len(self._vecs):
+            grow = len(self._vecs)
+            self._vecs = np.concatenate([self._vecs, np.zeros_like(self._vecs[:grow])])
+            self._alive = np.concatenate([self._alive, np.zeros(grow, dtype=bool)])
+            self._t = np.concatenate([self._t, np.zeros(grow)])
+            self._uses = np.concatenate([self._uses, np.zeros(grow, dtype=np.int64)])
+
+        row = self._n
+        self._vecs[row] = vec
+        self._alive[row] = True
+        self._t[row] = record["t"]
+        self._uses[row] = 0
+        self._records.append(record)
+        self._row[record["id"]] = row
+        self._n += 1
+        self._next_id = max(self._next_id, record["id"] + 1)
+
+    def _evict_row(self, row: int, log: bool = True):
+        self._alive[row] = False
+        self._dead += 1
+        rid = self._records[row]["id"]
+        self._row.pop(rid, None)
+        if log:
+            self._write({"op": "evict", "id": rid})
+
+    def _enforce_bounds(self):
+        n = self._n
+        if self.max_age_s is not None:
+            expired = np.nonzero(self._alive[:n] & (self._t[:n] < self.clock() - self.max_age_s))[0]
+            for row in expired:
+                self._evict_row(int(row))
+        live = np.nonzero(self._alive[:n])[0]
+        excess = len(live) - self.max_records
+        if excess > 0:
+            # Least used first, oldest first among equals
+            order = np.lexsort((self._t[live], self._uses[live]))
+            for row in live[order[:excess]]:
+                self._evict_row(int(row))
+
+    def __len__(self):
+        return int(self._alive[:self._n].sum())
+
+    # --------------------------------------------------------
+    # Journal file
+    # --------------------------------------------------------
+    def _write(self, entry: Dict[str, Any]):
+        if getattr(self, "_fh", None) is not None:
+            self._fh.write(json.dumps(entry) + "\n")
+            self._fh.flush()
+
+    def _replay(self):
+        if not os.path.exists(self.file):
+            return
+        with open(self.file) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Torn last line after a crash
+                    continue
+                op = entry["op"]
+                if op == "add":
+                    vec = _unpack(entry.pop("vec"))
+                    entry.pop("op")
+                    entry.setdefault("outcome", None)
+                    self._insert(entry, vec)
+                elif op == "outcome" and entry["id"] in self._row:
+                    self._records[self._row[entry["id"]]]["outcome"] = entry["outcome"]
+                elif op == "evict" and entry["id"] in self._row:
+                    self._evict_row(self._row[entry["id"]], log=False)
+
+    # --------------------------------------------------------
+    # Public API
+    # --------------------------------------------------------
+    def append(self, state: str, decision: Any, outcome: Any = None) -> int:
+        """Record a state -> decision pair; returns its id (for record_outcome)."""
+        vec = normalize(self.embedder.embed([state]))[0]
+        with self._lock:
+            record = {"id": self._next_id, "t": self.clock(), "state": state,
+                      "decision": decision, "outcome": outcome}
+            self._write(dict(op="add", vec=_pack(vec), **record))
+            self._insert(record, vec)
+            self._enforce_bounds()
+            self._maybe_compact()
+            return record["id"]
+
+    def record_outcome(self, record_id: int, outcome: Any) -> bool:
+        with self._lock:
+            row = self._row.get(record_id)
+            if row is None:
+                return False
+            self._records[row]["outcome"] = outcome
+            self._write({"op": "outcome", "id": record_id, "outcome": outcome})
+            return True
+
+    def mark_used(self, record_id: int) -> bool:
+        """Count a reuse of a record's decision; skipped (False) while the journal is busy, never blocks."""
+        if not self._lock.acquire(blocking=False):
+            return False
+        try:
+            row = self._row.get(record_id)
+            if row is None:
+                return False
+            self._uses[row] += 1
+            return True
+        finally:
+            self._lock.release()
+
+    def search(self, query: str, k: int = 4) -> List[Dict[str, Any]]:
+        q = normalize(self.embedder.embed([query]))[0]
+        with self._lock:
+            self._enforce_bounds()
+            self._maybe_compact()
+            live = np.nonzero(self._alive[:self._n])[0]
+            if not len(live):
+                return []
+            scores = self._vecs[live] @ q
+            k = min(k, len(live))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            results = []
+            for i in top:
+                row = int(live[i])
+                self._uses[row] += 1
+                results.append(dict(self._records[row], score=float(scores[i])))
+            return results
+
+    # --------------------------------------------------------
+    # Compaction
+    # --------------------------------------------------------
+    def compact(self):
+        """Rewrite the journal and the in-memory arrays with live records only."""
+        with self._lock:
+            self._enforce_bounds()
+            live = np.nonzero(self._alive[:self._n])[0]
+            tmp = self.file + ".tmp"
+            with open(tmp, "w") as f:
+                for row in live:
+                    record = self._records[row]
+                    f.write(json.dumps(dict(op="add", vec=_pack(self._vecs[row]), **record)) + "\n")
+            self._fh.close()
+            os.replace(tmp, self.file)
+            self._fh = open(self.file, "a")
+
+            n = len(live)
+            cap = max(64, n * 2)
+            vecs = np.zeros((cap, self._vecs.shape[1]), dtype=np.float32) if self._vecs is not None else None
+            if vecs is not None:
+                vecs[:n] = self._vecs[live]
+            self._vecs = vecs
+            self._t = np.concatenate([self._t[live], np.zeros(cap - n)])
+            self._uses = np.concatenate([self._uses[live], np.zeros(cap - n, dtype=np.int64)])
+            self._alive = np.concatenate([np.ones(n, dtype=bool), np.zeros(cap - n, dtype=bool)])
+            self._records = [self._records[row] for row in live]
+            self._row = {r["id"]: i for i, r in enumerate(self._records)}
+            self._n = n
+            self._dead = 0
+
+    def _maybe_compact(self):
+        # Tombstones cost memory and scan time until compacted, with or without the background thread
+        if self.compact_ratio is None or self._dead < self.compact_min_rows:
+            return
+        if self._dead > self.compact_ratio * self._n:
+            try:
+                self.compact()
+            except OSError as e:
+                print(f"[WARN] Decision journal compaction failed: {e}")
+
+    def _compactor(self, period_s: float):
+        while not self._stop.wait(period_s):
+            with self._lock:
+                self._enforce_bounds()
+                if not self._dead:
+                    # Nothing evicted since the last rewrite
+                    continue
+            try:
+                self.compact()
+            except OSError as e:
+                print(f"[WARN] Decision journal compaction failed: {e}")
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        with self._lock:
+            self._fh.close()
+            self._fh = None
+
+    def stats(self) -> Dict[str, int]:
+        return {"live": len(self), "rows": self._n, "evicted": self._dead, "next_id": self._next_id}
@@ -0,0 +1,437 @@
+"""
+benchmarks.py
+
+Micro/macro benchmarks of the monitoring, conversion and decision paths.
+
+    python evaluation/benchmarks.py run                    # print results
+    python evaluation/benchmarks.py run --out evaluation/baseline.json
+    python evaluation/benchmarks.py compare                # vs evaluation/baseline.json
+    python evaluation/benchmarks.py compare --threshold 0.2 --filter vec2lang
+
+Every benchmark is timed per item (one sample, one row, one query, one
+decision): the call is repeated until a round lasts at least --min-time,
+and the median and best over --rounds rounds are kept. `compare` re-runs
+the benchmarks present in the baseline and exits with status 1 if any
+best-round time is slower by more than --threshold (relative), so it can
+gate a commit; the best round is far less sensitive to background load
+than the median.
+
+Everything runs on synthetic inputs (fake sysfs tree, tiled CSV logs,
+random embeddings, stub model), so no robot, GPU or model download is
+needed.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import zlib
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT, os.path.join(ROOT, "controller"), os.path.join(ROOT, "train", "data_generator")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+EVAL_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(EVAL_DIR, "baseline.json")
+DATA_DIR = os.path.join(ROOT, "train", "data_generator", "csv_data")
+PLATFORM_YAML = os.path.join(ROOT, "controller", "platform.yaml")
+
+# name -> setup(workdir) returning (fn, items per call)
+BENCHMARKS: Dict[str, Callable[[str], Tuple[Callable[[], object], int]]] = {}
+
+
+def benchmark(name: str):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+# ============================================================
+# Monitoring
+# ============================================================
+
+def fake_sysfs(root: str, cpu_count: int) -> Dict:
+    """Jetson-like sysfs tree under `root`; returns the matching `jetson` config section."""
+    ina = os.path.join(root, "ina3221")
+    os.makedirs(ina, exist_ok=True)
+    for idx, (mv, ma) in enumerate([(19000, 600), (19000, 250), (19000, 120)], start=1):
+        with open(os.path.join(ina, f"in{idx}_input"), "w") as f:
+            f.write(f"{mv}\n")
+        with open(os.path.join(ina, f"curr{idx}_input"), "w") as f:
+            f.write(f"{ma}\n")
+    for i in range(cpu_count):
+        cpu = os.path.join(root, "cpu", f"cpu{i}")
+        os.makedirs(cpu, exist_ok=True)
+        with open(os.path.join(cpu, "scaling_cur_freq"), "w") as f:
+            f.write("1984000\n")
+    with open(os.path.join(root, "gpu_freq"), "w") as f:
+        f.write("918000000\n")
+    with open(os.path.join(root, "gpu_temp"), "w") as f:
+        f.write("48500\n")
+    with open(os.path.join(root, "stat"), "w") as f:
+        f.write("cpu  " + " ".join(["1000"] * 8) + "\n")
+        for i in range(cpu_count):
+            f.write(f"cpu{i} " + " ".join(["100"] * 8) + "\n")
+    return {
+        "ina_base": ina,
+        "cpu_freq_path": os.path.join(root, "cpu", "cpu{i}", "scaling_cur_freq"),
+        "cpu_freq_scale": 1000.0,
+        "proc_stat_path": os.path.join(root, "stat"),
+        "gpu_freq_path": os.path.join(root, "gpu_freq"),
+        "gpu_freq_scale": 1000000.0,
+        "gpu_temp_path": os.path.join(root, "gpu_temp"),
+        "gpu_temp_scale": 1000.0,
+    }
+
+
+@benchmark("monitor.sample")
+def bench_monitor_sample(workdir):
+    import psutil
+    from onboard_monitor import JetsonMonitor
+    from sensor_reader import SysfsReader
+
+    jetson = fake_sysfs(os.path.join(workdir, "sysfs"), psutil.cpu_count())
+    monitor = JetsonMonitor({"jetson": jetson}, reader=SysfsReader())
+    monitor.cpu_stat.min_interval_s = 0.0
+    return monitor.sample, 1
+
+
+# ============================================================
+# Vec2Lang
+# ============================================================
+
+def random_states(n: int, seed: int = 0) -> Dict[str, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    return {
+        "temperature": rng.uniform(30, 95, n),
+        "soc": rng.uniform(5, 100, n),
+        "cpu_util": rng.uniform(0, 100, n),
+        "gpu_util": rng.uniform(0, 100, n),
+        "speed": rng.uniform(0, 6, n),
+        "cpu_freq": rng.uniform(0.1, 2.2, n),
+        "gpu_freq": rng.uniform(0.3, 1.3, n),
+        "terrain": np.full(n, "flat", dtype=object),
+        "slope": np.zeros(n),
+    }
+
+
+def _vec2lang():
+    from vec2lang import Vec2Lang, PlatformConfig
+    return Vec2Lang(PlatformConfig(PLATFORM_YAML))
+
+
+@benchmark("vec2lang.convert")
+def bench_convert_row(workdir):
+    v = _vec2lang()
+    columns = random_states(256)
+    rows = [{k: col[i] for k, col in columns.items()} for i in range(256)]
+    return lambda: [v.convert(r) for r in rows], len(rows)
+
+
+def _convert_batch(n):
+    def setup(workdir):
+        v = _vec2lang()
+        states = random_states(n)
+        return lambda: v.convert_batch(states), n
+    return setup
+
+
+for _n in (1_000, 100_000):
+    benchmark(f"vec2lang.convert_batch[{_n}]")(_convert_batch(_n))
+
+
+# ============================================================
+# CSV -> SFT conversion
+# ============================================================
+
+def tiled_logs(workdir: str, copies: int) -> Tuple[str, str, int]:
+    """The recorded sys/appls pair repeated `copies` times with increasing ITERATION."""
+    import pandas as pd
+
+    paths = []
+    rows = 0
+    for name in ("pdqn_sys.csv", "pdqn_appls.csv"):
+        df = pd.read_csv(os.path.join(DATA_DIR, name))
+        span = int(df.ITERATION.max()) + 1
+        tiled = pd.concat([df.assign(ITERATION=df.ITERATION + k * span) for k in range(copies)],
+                          ignore_index=True)
+        path = os.path.join(workdir, f"tiled_{copies}_{name}")
+        tiled.to_csv(path, index=False)
+        paths.append(path)
+        rows = max(rows, len(tiled))
+    return paths[0], paths[1], rows
+
+
+@benchmark("csv_convert_json.convert")
+def bench_csv_convert(workdir):
+    from csv_convert_json import convert
+
+    sys_path, appls_path, rows = tiled_logs(workdir, copies=100)
+    out = os.path.join(workdir, "sft.jsonl")
+    return lambda: convert(sys_path, appls_path, out), rows
+
+
+# ============================================================
+# Retrieval
+# ============================================================
+
+class RandomEmbedder:
+    """Deterministic random unit vectors; stands in for the sentence-transformer."""
+
+    model_name = "random"
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def embed(self, texts):
+        out = np.empty((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            out[i] = np.random.default_rng(zlib.crc32(text.encode())).standard_normal(self.dim)
+        return out
+
+
+def _index_search(n: int, nlist: int = 0, dtype: str = "float16", resident: bool = True):
+    def setup(workdir):
+        from rag_index import VectorIndex
+
+        rng = np.random.default_rng(0)
+        vectors = rng.standard_normal((n, 384)).astype(np.float32)
+        texts = [f"doc {i}" for i in range(n)]
+        path = os.path.join(workdir, f"index_{n}_{nlist}_{dtype}")
+        VectorIndex.build(path, texts, RandomEmbedder(), dtype=dtype, nlist=nlist, vectors=vectors)
+        # resident: opt-in float32 copy; streamed: block by block from the mapped rows (the default)
+        index = VectorIndex(path, max_dense_bytes=(256 << 20) if resident else 0).warm()
+        queries = rng.standard_normal((64, 384)).astype(np.float32)
+        return lambda: [index.search_vector(q, k=4) for q in queries], len(queries)
+    return setup
+
+
+benchmark("rag.search[1000]")(_index_search(1_000))
+benchmark("rag.search[50000]")(_index_search(50_000))
+benchmark("rag.search[50000,int8]")(_index_search(50_000, dtype="int8"))
+benchmark("rag.search[50000,ivf64]")(_index_search(50_000, nlist=64))
+benchmark("rag.search[50000,streamed]")(_index_search(50_000, resident=False))
+benchmark("rag.search[50000,int8,streamed]")(_index_search(50_000, dtype="int8", resident=False))
+
+
+@benchmark("decision_journal.search[5000]")
+def bench_journal_search(workdir):
+    from decision_journal import DecisionJournal
+
+    journal = DecisionJournal(os.path.join(workdir, "journal"), RandomEmbedder(), max_records=5000,
+                              max_age_s=None, compact_every_s=None)
+    for i in range(5000):
+        journal.append(f"state {i}", {"v_max": 3.0})
+    queries = [f"state {i}" for i in range(0, 5000, 100)]
+    return lambda: [journal.search(q, k=4) for q in queries], len(queries)
+
+
+# ============================================================
+# Decisions
+# ============================================================
+
+def _converted_states(n: int):
+    v = _vec2lang()
+    columns = random_states(n, seed=1)
+    return [v.convert({k: col[i] for k, col in columns.items()}) for i in range(n)]
+
+
+DEFAULTS = {"weight_mec": 1.0, "weight_com": 1.0, "v_min": 0.5, "v_max": 6.0}
+
+
+def _decide_stub(cached: bool):
+    def setup(workdir):
+        from decision_cache import DecisionCache, state_key
+        from prompt_builder import PromptPrefix, build_messages, render_state, parse_decision
+        from replay import StubChatModel
+
+        states = _converted_states(256)
+        model = StubChatModel()
+        prefix = PromptPrefix()
+        cache = DecisionCache(max_entries=4096, ttl_s=1e9)
+
+        # Same steps as LLMResourceManagement.decide on the remote-backend path
+        def decide(converted):
+            key = state_key(converted)
+            params = cache.get(key)
+            if params is not None:
+                return params
+            messages = build_messages(prefix, render_state(converted))
+            answer = model.invoke([(m["role"], m["content"]) for m in messages]).content
+            params = parse_decision(answer, DEFAULTS)
+            if cached:
+                cache.put(key, params)
+            return params
+
+        return lambda: [decide(c) for c in states], len(states)
+    return setup
+
+
+benchmark("decision.stub_model")(_decide_stub(cached=False))
+benchmark("decision.cache_hit")(_decide_stub(cached=True))
+
+
+@benchmark("decision.hint_rules")
+def bench_hint_rules(workdir):
+    from hint_rules import HintRules
+
+    states = _converted_states(256)
+    rules = HintRules()
+    rng = np.random.default_rng(2)
+    thr = rng.uniform(15, 35, len(states))
+    return lambda: [rules.decide(c, DEFAULTS, DEFAULTS, thr=t, qos_ref=25.0)
+                    for c, t in zip(states, thr)], len(states)
+
+
+# ============================================================
+# Energy model
+# ============================================================
+
+def _energy_states(n: int):
+    columns = random_states(n, seed=3)
+    return [{k: col[i] for k, col in columns.items()} for i in range(n)]
+
+
+@benchmark("energy_model.score_grid[1152]")
+def bench_energy_score_grid(workdir):
+    from energy_model import EnergyModel
+
+    model = EnergyModel.from_config()
+    grid = model.grid()
+    states = _energy_states(64)
+    return lambda: [model.score_grid(s, *grid) for s in states], len(states)
+
+
+@benchmark("energy_model.shortlist[1152]")
+def bench_energy_shortlist(workdir):
+    from energy_model import EnergyModel
+
+    model = EnergyModel.from_config()
+    grid = model.grid()
+    states = _energy_states(64)
+    return lambda: [model.shortlist(s, k=5, grid=grid) for s in states], len(states)
+
+
+# ============================================================
+# Runner
+# ============================================================
+
+def time_per_item(fn: Callable, items: int, rounds: int, min_time: float) -> Dict[str, float]:
+    fn()  # warm-up: imports, caches, page-ins
+    loops = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - t0
+        if elapsed >= min_time:
+            break
+        loops *= 2 if elapsed == 0 else max(2, int(min_time / elapsed) + 1)
+
+    per_item = [elapsed / (loops * items)]
+    for _ in range(rounds - 1):
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        per_item.append((time.perf_counter() - t0) / (loops * items))
+    median = statistics.median(per_item)
+    return {"us_per_item": median * 1e6, "min_us": min(per_item) * 1e6,
+            "items_per_s": 1.0 / median if median else float("inf"), "loops": loops}
+
+
+def run(names: List[str], rounds: int, min_time: float) -> Dict:
+    results = {}
+    workdir = tempfile.mkdtemp(prefix="llmxrs_bench_")
+    try:
+        for name in names:
+            try:
+                fn, items = BENCHMARKS[name](workdir)
+            except ImportError as e:
+                results[name] = {"skipped": f"missing dependency: {e.name}"}
+                print(f"{name:36s} skipped ({e.name} not installed)")
+                continue
+            results[name] = time_per_item(fn, items, rounds, min_time)
+            r = results[name]
+            print(f"{name:36s} {r['us_per_item']:12.3f} us/item {r['items_per_s']:14.1f} items/s")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def machine() -> Dict:
+    return {"platform": platform.platform(), "python": platform.python_version(),
+            "processor": platform.processor() or platform.machine(), "cpu_count": os.cpu_count(),
+            "numpy": np.__version__}
+
+
+def compare(baseline: Dict, current: Dict, threshold: float) -> List[str]:
+    """Names of benchmarks slower than the baseline by more than `threshold`."""
+    slower = []
+    print(f"\n{'benchmark (best us/item)':36s} {'baseline':>12s} {'current':>12s} {'change':>8s}")
+    for name, base in baseline["results"].items():
+        cur = current.get(name)
+        if "min_us" not in base or not cur or "min_us" not in cur:
+            continue
+        change = cur["min_us"] / base["min_us"] - 1.0
+        flag = ""
+        if change > threshold:
+            flag = "  SLOWER"
+            slower.append(name)
+        elif change < -threshold:
+            flag = "  faster"
+        print(f"{name:36s} {base['min_us']:12.3f} {cur['min_us']:12.3f} {change:+8.1%}{flag}")
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks of the monitoring, conversion and decision paths.")
+    parser.add_argument("mode", choices=["run", "compare", "list"])
+    parser.add_argument("--filter", default="", help="only benchmarks whose name contains this")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per round")
+    parser.add_argument("--out", default=None, help="write results (baseline format) to this file")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--threshold", type=float, default=0.20, help="relative slowdown flagged by compare")
+    args = parser.parse_args()
+
+    if args.mode == "list":
+        print("\n".join(BENCHMARKS))
+        return
+
+    names = [n for n in BENCHMARKS if args.filter in n]
+    baseline = None
+    if args.mode == "compare":
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        names = [n for n in names if n in baseline["results"]]
+        if baseline.get("machine") != machine():
+            print("[WARN] Baseline was recorded on a different machine/environment; expect noise.")
+
+    results = run(names, rounds=args.rounds, min_time=args.min_time)
+    report = {"machine": machine(), "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results}
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"[OK] Saved results to {args.out}")
+
+    if baseline is not None:
+        slower = compare(baseline, results, args.threshold)
+        if slower:
+            print(f"\n[FAIL] {len(slower)} benchmark(s) slower than baseline by > {args.threshold:.0%}: "
+                  + ", ".join(slower))
+            sys.exit(1)
+        print("\n[OK] No regressions.")
+
+
+if __name__ == "__main__":
+    main()
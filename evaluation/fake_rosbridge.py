@@ -0,0 +1,221 @@
+"""
+fake_rosbridge.py
+
+In-process stand-in for a rosbridge websocket server, so roslibpy
+clients (LLMResourceManagement, the controller publisher) can run without
+a robot. Implements just enough of RFC 6455 (handshake, masked client
+frames, ping/close) and of the rosbridge v2 protocol:
+
+    advertise / unadvertise / publish / subscribe / unsubscribe
+    call_service  -> empty successful service_response
+
+Every published message is recorded with its arrival time and forwarded
+to subscribers of its topic.
+"""
+
+import base64
+import hashlib
+import json
+import socket
+import struct
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+OP_TEXT, OP_BINARY, OP_CLOSE, OP_PING, OP_PONG = 0x1, 0x2, 0x8, 0x9, 0xA
+
+
+def _recv_exact(sock: socket.socket, n: int) -> bytes:
+    data = b""
+    while len(data) < n:
+        chunk = sock.recv(n - len(data))
+        if not chunk:
+            raise ConnectionError("client closed")
+        data += chunk
+    return data
+
+
+def _frame(opcode: int, payload: bytes) -> bytes:
+    head = bytes([0x80 | opcode])
+    n = len(payload)
+    if n < 126:
+        head += bytes([n])
+    elif n < 1 << 16:
+        head += bytes([126]) + struct.pack("!H", n)
+    else:
+        head += bytes([127]) + struct.pack("!Q", n)
+    return head + payload
+
+
+class _Client:
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.lock = threading.Lock()
+
+    def send(self, message: Dict):
+        with self.lock:
+            self.sock.sendall(_frame(OP_TEXT, json.dumps(message).encode()))
+
+    def read_message(self) -> Optional[Tuple[int, bytes]]:
+        """(opcode, payload) of the next complete message; control frames are returned as is."""
+        payload, opcode = b"", None
+        while True:
+            b0, b1 = _recv_exact(self.sock, 2)
+            fin, op = b0 & 0x80, b0 & 0x0F
+            n = b1 & 0x7F
+            if n == 126:
+                n = struct.unpack("!H", _recv_exact(self.sock, 2))[0]
+            elif n == 127:
+                n = struct.unpack("!Q", _recv_exact(self.sock, 8))[0]
+            mask = _recv_exact(self.sock, 4) if b1 & 0x80 else b"\0\0\0\0"
+            data = bytes(c ^ mask[i % 4] for i, c in enumerate(_recv_exact(self.sock, n)))
+            if op >= OP_CLOSE:
+                return op, data
+            opcode = op if op else opcode
+            payload += data
+            if fin:
+                return opcode, payload
+
+
+class FakeRosbridge:
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        """port=0 picks a free port; read it back from `.port`."""
+        self._server = socket.create_server((host, port))
+        self.host = host
+        self.port = self._server.getsockname()[1]
+
+        self._lock = threading.Condition()
+        self.published: Dict[str, List[Tuple[float, Dict]]] = defaultdict(list)
+        self.advertised: Dict[str, str] = {}
+        self._subscribers: Dict[str, List[_Client]] = defaultdict(list)
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+    # --------------------------------------------------------
+    # Server
+    # --------------------------------------------------------
+    def start(self) -> "FakeRosbridge":
+        self._running = True
+        self._thread = threading.Thread(target=self._accept, name="fake-rosbridge", daemon=True)
+        self._thread.start()
+        return self
+
+    def _accept(self):
+        while self._running:
+            try:
+                sock, _ = self._server.accept()
+            except OSError:
+                break
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            threading.Thread(target=self._serve, args=(sock,), daemon=True).start()
+
+    def _handshake(self, sock: socket.socket) -> bool:
+        request = b""
+        while b"\r\n\r\n" not in request:
+            chunk = sock.recv(4096)
+            if not chunk:
+                return False
+            request += chunk
+        headers = {}
+        for line in request.decode("latin-1").split("\r\n")[1:]:
+            if ":" in line:
+                k, v = line.split(":", 1)
+                headers[k.strip().lower()] = v.strip()
+        key = headers.get("sec-websocket-key")
+        if key is None:
+            return False
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+        sock.sendall((
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n"
+        ).encode())
+        return True
+
+    def _serve(self, sock: socket.socket):
+        client = _Client(sock)
+        try:
+            if not self._handshake(sock):
+                return
+            while self._running:
+                opcode, payload = client.read_message()
+                if opcode == OP_CLOSE:
+                    with client.lock:
+                        sock.sendall(_frame(OP_CLOSE, payload[:2]))
+                    break
+                if opcode == OP_PING:
+                    with client.lock:
+                        sock.sendall(_frame(OP_PONG, payload))
+                    continue
+                if opcode in (OP_TEXT, OP_BINARY):
+                    self._handle(client, json.loads(payload))
+        except (ConnectionError, OSError, ValueError):
+            pass
+        finally:
+            with self._lock:
+                for clients in self._subscribers.values():
+                    if client in clients:
+                        clients.remove(client)
+            sock.close()
+
+    # --------------------------------------------------------
+    # rosbridge protocol
+    # --------------------------------------------------------
+    def _handle(self, client: _Client, message: Dict):
+        op = message.get("op")
+        topic = message.get("topic")
+        if op == "advertise":
+            with self._lock:
+                self.advertised[topic] = message.get("type", "")
+        elif op == "unadvertise":
+            with self._lock:
+                self.advertised.pop(topic, None)
+        elif op == "subscribe":
+            with self._lock:
+                self._subscribers[topic].append(client)
+        elif op == "unsubscribe":
+            with self._lock:
+                if client in self._subscribers[topic]:
+                    self._subscribers[topic].remove(client)
+        elif op == "publish":
+            with self._lock:
+                self.published[topic].append((time.perf_counter(), message.get("msg", {})))
+                subscribers = list(self._subscribers[topic])
+                self._lock.notify_all()
+            for sub in subscribers:
+                sub.send({"op": "publish", "topic": topic, "msg": message.get("msg", {})})
+        elif op == "call_service":
+            client.send({"op": "service_response", "id": message.get("id"),
+                         "service": message.get("service"), "values": {}, "result": True})
+
+    # --------------------------------------------------------
+    # Inspection
+    # --------------------------------------------------------
+    def messages(self, topic: str) -> List[Dict]:
+        with self._lock:
+            return [msg for _, msg in self.published[topic]]
+
+    def count(self) -> int:
+        with self._lock:
+            return sum(len(v) for v in self.published.values())
+
+    def wait_for(self, total: int, timeout: float = 5.0) -> bool:
+        """Block until at least `total` messages were published (over all topics)."""
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            while sum(len(v) for v in self.published.values()) < total:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._lock.wait(remaining)
+        return True
+
+    def close(self):
+        self._running = False
+        self._server.close()
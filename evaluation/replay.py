@@ -0,0 +1,274 @@
+"""
+replay.py
+
+Offline end-to-end replay of recorded runs, without a robot.
+
+Rows of a recorded pdqn_sys.csv / pdqn_appls.csv pair are fed through the
+same path as on the rover:
+
+    Vec2Lang.convert -> RAG retrieval -> LLMResourceManagement.step/decide -> ROS publish
+
+with ROS provided by an in-process FakeRosbridge (parameters go through
+the same ParamPublisher as on the rover), and per-tick latency
+(total and per stage) and ticks/sec are reported. Rows are replayed as
+fast as possible by default (--speed 0), or at a multiple of their
+recorded pace.
+
+    python evaluation/replay.py --model stub
+    python evaluation/replay.py --model custom --model-dir train/outputs/merged --every-tick
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT, os.path.join(ROOT, "controller"), os.path.join(ROOT, "train", "data_generator")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from csv_convert_json import merged_chunks
+from vec2lang import Vec2Lang, PlatformConfig
+from prompt_builder import render_state
+from behavior_grammar import BehaviorGrammar
+from param_publisher import ParamPublisher
+from fake_rosbridge import FakeRosbridge
+
+DATA_DIR = os.path.join(ROOT, "train", "data_generator", "csv_data")
+DEFAULT_PLATFORM = os.path.join(ROOT, "controller", "platform.yaml")
+STAGES = ("convert", "retrieve", "decide", "publish")
+PERCENTILES = (50, 95, 99)
+
+
+# ============================================================
+# Recorded rows -> Vec2Lang states
+# ============================================================
+
+def _optional(value) -> Optional[float]:
+    return None if value is None or np.isnan(value) else float(value)
+
+
+def recorded_states(sys_path: str, appls_path: str, temperature: float = 45.0,
+                    terrain: str = "flat") -> Iterator[Tuple[float, Dict, Optional[float], Optional[float]]]:
+    """
+    (sys UTIME, Vec2Lang state, throughput, QoS reference) per valid merged row.
+
+    The logs carry no temperature or terrain, so both are fixed; CPU
+    utilization is the mean over the UTIL* columns and frequencies are
+    converted from kHz to GHz as in csv_convert_json.
+    """
+    for df in merged_chunks(sys_path, appls_path):
+        df = df[(df.SOC > 0) & (df.SOH > 0)]
+        util = df.filter(regex=r"^UTIL\d+$").mean(axis=1).to_numpy()
+        for i, row in enumerate(df.itertuples(index=False)):
+            state = {
+                "temperature": temperature,
+                "soc": row.SOC * 100.0,
+                "cpu_util": float(util[i]),
+                "gpu_util": float(row.GPU_UTIL),
+                "speed": float(row.SPEED),
+                "cpu_freq": row.FREQ_L / 1e6,
+                "gpu_freq": row.FREQ_G / 1e6,
+                "terrain": terrain,
+                "slope": 0.0,
+            }
+            yield float(row.UTIME_x), state, _optional(row.THR1), _optional(row.REF1)
+
+
+# ============================================================
+# Stub model
+# ============================================================
+
+class StubMessage:
+
+    def __init__(self, content: str):
+        self.content = content
+
+
+class StubChatModel:
+    """
+    Instant stand-in for the decision model: answers with the energy-saving
+    "Change behavior:" block of the SFT data for the state in the prompt,
+    after an optional fixed delay.
+    """
+
+    SPEED = re.compile(r"- Speed: ([\d.]+) m/s")
+    FREQ = re.compile(r"- (CPU|GPU) frequency: ([\d.]+) GHz")
+
+    def __init__(self, delay_s: float = 0.0):
+        self.delay_s = delay_s
+        self.grammar = BehaviorGrammar()
+        self.calls = 0
+
+    def invoke(self, messages):
+        self.calls += 1
+        if self.delay_s:
+            time.sleep(self.delay_s)
+        text = messages[-1][1]
+        speed = float(self.SPEED.search(text).group(1))
+        freqs = dict(self.FREQ.findall(text))
+        values = [f"{max(speed - 1.5, 2.5):.1f}",
+                  f"{min(float(freqs['CPU']), 1.0):.2f}",
+                  f"{min(float(freqs['GPU']), 0.8):.2f}"]
+        return StubMessage(self.grammar.render(values))
+
+    def batch(self, batch):
+        return [self.invoke(messages) for messages in batch]
+
+
+# ============================================================
+# Replay
+# ============================================================
+
+class Replay:
+
+    def __init__(self, manager, vec2lang: Vec2Lang, ros, retrieve_k: int = 4, every_tick: bool = False):
+        self.manager = manager
+        self.vec2lang = vec2lang
+        self.retrieve_k = retrieve_k
+        self.every_tick = every_tick
+        self.publisher = ParamPublisher(lambda: ros)
+
+    def publish(self, params: Dict[str, float]) -> int:
+        """Queue on the publisher; the `publish` stage is the cost seen by the decision loop."""
+        return self.publisher.publish(params)
+
+    def run(self, rows, speed: float = 0.0) -> Dict:
+        manager = self.manager
+        stage_s = {s: [] for s in STAGES}
+        total_s = []
+        first_utime = None
+        queries0 = manager.model_queries
+        wall0 = time.perf_counter()
+
+        for utime, state, thr, qos_ref in rows:
+            if first_utime is None:
+                first_utime = utime
+            if speed > 0:
+                delay = (utime - first_utime) / speed - (time.perf_counter() - wall0)
+                if delay > 0:
+                    time.sleep(delay)
+
+            t0 = time.perf_counter()
+            converted = self.vec2lang.convert(state)
+            t1 = time.perf_counter()
+            if self.retrieve_k:
+                manager.retrieve(render_state(converted), k=self.retrieve_k)
+            t2 = time.perf_counter()
+            if self.every_tick:
+                manager.current_params = manager.decide(converted, thr=thr, qos_ref=qos_ref)
+                params = manager.current_params
+            else:
+                params = manager.step(converted, thr=thr, qos_ref=qos_ref)
+            t3 = time.perf_counter()
+            self.publish(params)
+            t4 = time.perf_counter()
+
+            for stage, dt in zip(STAGES, (t1 - t0, t2 - t1, t3 - t2, t4 - t3)):
+                stage_s[stage].append(dt)
+            total_s.append(t4 - t0)
+            last_utime = utime
+
+        wall = time.perf_counter() - wall0
+        self.publisher.flush()
+        publisher = self.publisher.stats()
+        ticks = len(total_s)
+        if not ticks:
+            raise ValueError("No valid rows to replay")
+        pct = lambda v: {f"p{p}_ms": float(np.percentile(v, p)) * 1e3 for p in PERCENTILES}
+        return {
+            "ticks": ticks,
+            "model_queries": manager.model_queries - queries0,
+            "published": publisher["published"],
+            "publisher": publisher,
+            "wall_s": wall,
+            "ticks_per_s": ticks / wall,
+            "realtime_factor": (last_utime - first_utime) / wall if wall else None,
+            "latency": pct(total_s),
+            "stages": {stage: pct(v) for stage, v in stage_s.items()},
+            "trigger": manager.trigger.stats(),
+            "hint_rules": manager.hint_rules.stats() if manager.hint_rules else None,
+            "decision_cache": manager.decision_cache.stats(),
+        }
+
+
+def build_manager(args, platform: PlatformConfig, ros, journal_dir: str):
+    """journal_dir: where replayed decisions are journaled, never the robot's own rag_cache/journal."""
+    from llm_rs import LLMResourceManagement
+
+    stub = args.model == "stub"
+    manager = LLMResourceManagement(
+        args.openai_token, "training" if stub else args.model, model_dir=args.model_dir,
+        quant=args.quant, ros=ros, platform=platform, min_query_interval_s=args.min_interval,
+        hint_rules=not args.no_rules, journal_dir=journal_dir,
+    )
+    if stub:
+        manager.llm = StubChatModel(delay_s=args.stub_latency_ms / 1e3)
+    return manager
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded runs through the full decision path.")
+    parser.add_argument("--sys", default=os.path.join(DATA_DIR, "pdqn_sys.csv"))
+    parser.add_argument("--appls", default=os.path.join(DATA_DIR, "pdqn_appls.csv"))
+    parser.add_argument("--platform", default=DEFAULT_PLATFORM)
+    parser.add_argument("--model", default="stub", choices=["stub", "gpt-4o", "custom"])
+    parser.add_argument("--model-dir", default=None)
+    parser.add_argument("--quant", default=False)
+    parser.add_argument("--openai-token", default=os.environ.get("OPENAI_API_KEY"))
+    parser.add_argument("--stub-latency-ms", type=float, default=0.0)
+    parser.add_argument("--every-tick", action="store_true", help="decide on every row instead of on triggers")
+    parser.add_argument("--min-interval", type=float, default=0.0, help="trigger min_interval_s")
+    parser.add_argument("--no-rules", action="store_true", help="disable the hint-rule pre-filter")
+    parser.add_argument("--retrieve-k", type=int, default=4, help="0 disables retrieval")
+    parser.add_argument("--speed", type=float, default=0.0, help="x recorded pace; 0 = as fast as possible")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--temperature", type=float, default=45.0)
+    parser.add_argument("--out", default=None, help="write the report as JSON")
+    args = parser.parse_args()
+    args.quant = {"false": False, "true": True}.get(str(args.quant).lower(), args.quant)
+
+    import roslibpy
+
+    bridge = FakeRosbridge().start()
+    ros = roslibpy.Ros(host=bridge.host, port=bridge.port)
+    ros.run()
+    replay = manager = None
+    journal_dir = tempfile.mkdtemp(prefix="replay-journal-")
+    try:
+        platform = PlatformConfig(args.platform)
+        manager = build_manager(args, platform, ros, journal_dir)
+        replay = Replay(manager, Vec2Lang(platform), ros, retrieve_k=args.retrieve_k, every_tick=args.every_tick)
+        base = list(recorded_states(args.sys, args.appls, temperature=args.temperature))
+        span = base[-1][0] - base[0][0] + 1.0 if base else 0.0
+        # Repeats continue the recorded clock, so --speed pacing stays monotonic
+        rows = [(utime + k * span, state, thr, ref) for k in range(args.repeat)
+                for utime, state, thr, ref in base]
+        report = replay.run(rows, speed=args.speed)
+        bridge.wait_for(report["published"])
+        report["bridge_received"] = bridge.count()
+    finally:
+        if replay is not None:
+            replay.publisher.close()
+        if manager is not None and manager.loaded("decision_journal") is not None:
+            manager.decision_journal.close()
+        shutil.rmtree(journal_dir, ignore_errors=True)
+        ros.terminate()
+        bridge.close()
+
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
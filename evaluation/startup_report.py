@@ -0,0 +1,135 @@
+"""
+startup_report.py
+
+Startup latency of LLMResourceManagement per model mode, against
+llm_rs.STARTUP_TARGETS_S.
+
+Each mode runs in a fresh interpreter under `python -X importtime`, so the
+numbers include every module the mode pulls in:
+
+    import_s    `import llm_rs`
+    init_s      LLMResourceManagement(...) with the RAG warm-up off
+    loaded      which of the heavy dependencies ended up in sys.modules
+    top         the slowest top-level imports (cumulative)
+
+    python evaluation/startup_report.py
+    python evaluation/startup_report.py --mode training --mode gpt-4o
+    python evaluation/startup_report.py --mode custom --model-dir train/outputs/merged --out startup.json
+
+Exits with status 1 if a mode misses its target or fails to start.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+HEAVY_MODULES = ("numpy", "pandas", "torch", "transformers", "langchain_openai", "roslibpy",
+                 "sentence_transformers", "rag_index", "decision_journal", "hint_rules", "local_llm")
+
+# Runs in the child interpreter; prints one JSON line
+CHILD = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+t0 = time.perf_counter()
+import llm_rs
+t1 = time.perf_counter()
+result = {{"import_s": t1 - t0}}
+try:
+    llm_rs.LLMResourceManagement({token!r}, {mode!r}, model_dir={model_dir!r}, rag_warmup=False)
+    result["init_s"] = time.perf_counter() - t1
+except Exception as e:
+    result["error"] = repr(e)
+result["loaded"] = [m for m in {heavy!r} if m in sys.modules]
+print(json.dumps(result))
+"""
+
+
+def parse_importtime(stderr: str, top: int = 10) -> List[Dict]:
+    """Slowest top-level imports from `-X importtime` output, by cumulative time."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.split(":", 1)[1].split("|", 2)
+        # Nested imports are indented below their parent; keep only the roots
+        if name.startswith("  "):
+            continue
+        entries.append({"module": name.strip(), "self_ms": int(self_us) / 1e3,
+                        "cumulative_ms": int(cumulative_us) / 1e3})
+    entries.sort(key=lambda e: -e["cumulative_ms"])
+    return entries[:top]
+
+
+def measure(mode: str, model_dir: str = None, token: str = None, top: int = 10) -> Dict:
+    code = CHILD.format(root=ROOT, mode=mode, model_dir=model_dir, token=token or "sk-startup-report",
+                        heavy=HEAVY_MODULES)
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          capture_output=True, text=True, cwd=ROOT)
+    lines = proc.stdout.strip().splitlines()
+    try:
+        result = json.loads(lines[-1])
+    except (IndexError, ValueError):
+        tail = [l for l in proc.stderr.splitlines() if not l.startswith("import time:")]
+        result = {"error": tail[-1] if tail else f"exit status {proc.returncode}"}
+    result["top"] = parse_importtime(proc.stderr, top=top)
+    return result
+
+
+def report(modes: List[str], model_dir: str = None, token: str = None, top: int = 10) -> Dict:
+    from llm_rs import STARTUP_TARGETS_S
+
+    results = {}
+    for mode in modes:
+        result = measure(mode, model_dir=model_dir, token=token, top=top)
+        result["target_s"] = STARTUP_TARGETS_S[mode]
+        if "error" in result:
+            result["status"] = "error"
+        else:
+            result["startup_s"] = result["import_s"] + result["init_s"]
+            result["status"] = "ok" if result["startup_s"] <= result["target_s"] else "slow"
+        results[mode] = result
+    return results
+
+
+def main():
+    from llm_rs import MODEL_OPTIONS
+
+    parser = argparse.ArgumentParser(description="Import-time and startup-latency report per model mode.")
+    parser.add_argument("--mode", action="append", choices=MODEL_OPTIONS,
+                        help="repeatable; default: every mode")
+    parser.add_argument("--model-dir", default=None, help="merged model for the custom mode")
+    parser.add_argument("--openai-token", default=os.environ.get("OPENAI_API_KEY"))
+    parser.add_argument("--top", type=int, default=10, help="slowest top-level imports to list")
+    parser.add_argument("--out", default=None, help="write the report as JSON")
+    args = parser.parse_args()
+
+    results = report(args.mode or MODEL_OPTIONS, model_dir=args.model_dir, token=args.openai_token, top=args.top)
+    for mode, r in results.items():
+        if r["status"] == "error":
+            print(f"{mode:<10} ERROR  {r['error']}")
+        else:
+            print(f"{mode:<10} {r['status'].upper():<5}  {r['startup_s']:7.3f} s  (target {r['target_s']} s; "
+                  f"import {r['import_s']:.3f} s, init {r['init_s']:.3f} s)")
+        print(f"{'':<10} loaded: {', '.join(r['loaded']) or '-'}")
+        for e in r["top"]:
+            print(f"{'':<12}{e['cumulative_ms']:9.1f} ms  {e['module']}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+    failed = [mode for mode, r in results.items() if r["status"] != "ok"]
+    if failed:
+        print(f"\n{len(failed)} mode(s) over target or failing: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""
+fleet_server.py
+
+Ground-station decision server for a fleet of robots.
+
+One LLMResourceManagement (one resident model) answers every robot.
+Robots POST their state over HTTP; states the hint rules or the shared
+decision cache resolve are answered immediately, the rest are queued and
+DecisionBatcher runs them through the model in batches of up to
+`max_batch` (one left-padded generate() on the local backend). The batch
+worker starts the next batch from whatever queued while the previous one
+ran, so the model never idles while requests wait, and each answer is
+routed back to the HTTP request of its robot.
+
+    POST /decide   {"robot_id": "r1", "converted": <Vec2Lang.convert()>,
+                    "thr": 31.0, "qos_ref": 30.0, "current": {...}}
+                   or {"robot_id": "r1", "robot_state": "<rendered state>"}
+               ->  {"robot_id": "r1", "params": {...}, "source": "rules|cache|model|default"}
+    GET  /stats
+
+Run: python fleet_server.py --model custom --port 8806
+"""
+
+import argparse
+import json
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+
+def _percentiles(values) -> Optional[Dict[str, float]]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1e3
+    return {"p50": pick(0.50), "p95": pick(0.95), "max": ordered[-1] * 1e3}
+
+
+class DecisionBatcher:
+
+    def __init__(self, run_batch: Callable[[List[str]], List[str]], max_batch: int = 16,
+                 max_wait_s: float = 0.005):
+        """
+        run_batch:  robot-state texts -> answers, same order
+        max_batch:  requests per model call
+        max_wait_s: how long the first request of an idle batch waits for company
+        """
+        self.run_batch = run_batch
+        self.max_batch = max_batch
+        self.max_wait_s = max_wait_s
+        self._queue: "queue.Queue" = queue.Queue()
+        self._stop = threading.Event()
+
+        self.batches = 0
+        self.requests = 0
+        self.batch_s: deque = deque(maxlen=1000)
+        self.request_s: deque = deque(maxlen=1000)
+
+        self._thread = threading.Thread(target=self._loop, name="decision-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, robot_state: str) -> Future:
+        future: Future = Future()
+        self._queue.put((robot_state, future, time.perf_counter()))
+        return future
+
+    def _collect(self) -> list:
+        try:
+            batch = [self._queue.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+        deadline = time.perf_counter() + self.max_wait_s
+        while len(batch) < self.max_batch:
+            try:
+                # Whatever is already queued joins without waiting
+                batch.append(self._queue.get_nowait())
+                continue
+            except queue.Empty:
+                pass
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while not self._stop.is_set():
+            batch = self._collect()
+            if not batch:
+                continue
+            states = [s for s, _, _ in batch]
+            t0 = time.perf_counter()
+            try:
+                answers = list(self.run_batch(states))
+                if len(answers) != len(batch):
+                    raise RuntimeError(f"run_batch returned {len(answers)} answers for {len(batch)} requests")
+            except Exception as e:
+                # Fail every request of the batch now instead of after its timeout
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            self.batch_s.append(time.perf_counter() - t0)
+            self.batches += 1
+            self.requests += len(batch)
+            done = time.perf_counter()
+            for (_, future, queued), answer in zip(batch, answers):
+                self.request_s.append(done - queued)
+                future.set_result(answer)
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+
+    def stats(self) -> Dict:
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "mean_batch_size": self.requests / self.batches if self.batches else 0.0,
+            "batch_ms": _percentiles(self.batch_s),
+            "request_ms": _percentiles(self.request_s),
+        }
+
+
+class FleetServer:
+
+    def __init__(self, manager, host: str = "0.0.0.0", port: int = 8806, max_batch: int = 16,
+                 max_wait_s: float = 0.005, timeout_s: float = 60.0):
+        """manager: LLMResourceManagement shared by every robot (model, rules, cache, journal)."""
+        self.manager = manager
+        self.timeout_s = timeout_s
+        self.batcher = DecisionBatcher(manager.query_llm_batch, max_batch=max_batch, max_wait_s=max_wait_s)
+        self.sources: Dict[str, int] = {}
+        self.robots: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._thread: Optional[threading.Thread] = None
+
+    # --------------------------------------------------------
+    # Decisions
+    # --------------------------------------------------------
+    def decide(self, request: Dict) -> Dict:
+        manager = self.manager
+        robot_id = str(request.get("robot_id", "unknown"))
+        current = request.get("current") or manager.default_rs_controller_params
+
+        params, source, key = None, "model", None
+        converted = request.get("converted")
+        if converted is not None:
+            params, source, key, robot_state = manager.resolve(converted, thr=request.get("thr"),
+                                                               qos_ref=request.get("qos_ref"), current=current)
+        else:
+            robot_state = request["robot_state"]
+
+        if params is None:
+            answer = self.batcher.submit(robot_state).result(timeout=self.timeout_s)
+            params, record = manager.finish(robot_state, answer, key)
+            source = "model" if record is not None else "default"
+
+        with self._lock:
+            self.sources[source] = self.sources.get(source, 0) + 1
+            self.robots[robot_id] = self.robots.get(robot_id, 0) + 1
+        return {"robot_id": robot_id, "params": params, "source": source}
+
+    def stats(self) -> Dict:
+        manager = self.manager
+        return {
+            "robots": dict(self.robots),
+            "sources": dict(self.sources),
+            "batcher": self.batcher.stats(),
+            "hint_rules": manager.hint_rules.stats() if manager.hint_rules else None,
+            "decision_cache": manager.decision_cache.stats(),
+        }
+
+    # --------------------------------------------------------
+    # HTTP
+    # --------------------------------------------------------
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def _reply(self, code: int, body: Dict):
+                data = json.dumps(body).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path == "/stats":
+                    self._reply(200, server.stats())
+                else:
+                    self._reply(404, {"error": f"unknown path {self.path}"})
+
+            def do_POST(self):
+                if self.path != "/decide":
+                    self._reply(404, {"error": f"unknown path {self.path}"})
+                    return
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                    request = json.loads(self.rfile.read(length))
+                    self._reply(200, server.decide(request))
+                except (ValueError, KeyError) as e:
+                    self._reply(400, {"error": repr(e)})
+                except Exception as e:
+                    self._reply(500, {"error": repr(e)})
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        """Serve in a background thread."""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="fleet-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self.httpd.serve_forever()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.batcher.close()
+
+
+if __name__ == "__main__":
+    from llm_rs import LLMResourceManagement, MODEL_OPTIONS
+
+    parser = argparse.ArgumentParser(description="Batched decision server for a fleet of robots.")
+    parser.add_argument("--model", default="custom", choices=MODEL_OPTIONS)
+    parser.add_argument("--model-dir", default=None)
+    parser.add_argument("--quant", default=False)
+    parser.add_argument("--openai-token", default=None)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8806)
+    parser.add_argument("--max-batch", type=int, default=16)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    quant = {"false": False, "true": True}.get(str(args.quant).lower(), args.quant)
+    manager = LLMResourceManagement(args.openai_token, args.model, model_dir=args.model_dir, quant=quant)
+    server = manager.serve(host=args.host, port=args.port, max_batch=args.max_batch,
+                           max_wait_s=args.max_wait_ms / 1e3)
+    print(f"Serving decisions on http://{args.host}:{args.port}/decide")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.close()
@@ -0,0 +1,144 @@
+"""
+hint_rules.py
+
+Deterministic pre-filter compiled from the crisp hints of
+prompts/rag_memory.txt. It runs before the model is consulted: a state
+that the hints fully determine is answered right away, and only
+ambiguous or conflicting states are left to the LLM.
+
+    hint 3   throughput below the QoS reference      -> prioritize performance
+    hint 4   QoS margin above +10%                   -> reduce performance
+    hint 5   SOC near the safety threshold, or a      -> save energy
+             Vec2Lang risk (hint 11: safety first)
+    hint 6   throughput within 3% of the reference   -> keep the current strategy
+    hint 10  QoS satisfied and SOC safe              -> keep the current strategy
+    hint 1   SOC above 80%: no aggressive saving     -> a +10% margin is left to the model
+    hint 11  safety and a QoS violation at once      -> conflict, left to the model
+
+SOC edges are trigger.SOC_EDGES, read from controller/platform.yaml:
+safety below sft_thresholds.soc_low (the value the data generator uses)
+and hint 1 above battery.soc.high. "save" applies the same reduction as
+the generator's behavior_change().
+
+The rules follow the prompt hints, not the SFT labels. The generator
+labels on the absolute margin thr - qos (appls_pressure) and teaches two
+answers regardless of SOC: keep the configuration below the reference,
+save otherwise. The rules use the relative bands of hints 3, 4 and 6, so
+on [0, +10%) they hold where the fine-tuned model was taught to save, and
+below -3% they restore performance where it was taught to keep. Build the
+manager with hint_rules=False to have the model answer every state.
+"""
+
+import math
+from typing import Dict, List, Optional
+
+from trigger import QOS_EDGES, QOS_LABELS, SOC_EDGES
+
+# SOC bands (%): safety below soc_low, hint 1 above the platform's high SOC
+SOC_SAFETY, SOC_HIGH = SOC_EDGES
+
+# Energy-saving step, as behavior_change() in train/data_generator/csv_convert_json.py
+SAVE_SPEED_STEP = 1.5
+SAVE_SPEED_FLOOR = 2.5
+SAVE_CPU_GHZ = 1.0
+SAVE_GPU_GHZ = 0.8
+
+
+def _number(field: Dict) -> float:
+    """Numeric part of a Vec2Lang value such as '3.5 m/s' or '1.2 GHz'."""
+    return float(str(field["value"]).split()[0])
+
+
+def qos_band(thr: Optional[float], qos_ref: Optional[float]) -> Optional[str]:
+    """QoS margin band of hints 3, 4 and 6, or None without a throughput reading."""
+    if thr is None or not qos_ref or (isinstance(thr, float) and math.isnan(thr)):
+        return None
+    margin = (thr - qos_ref) / qos_ref
+    return QOS_LABELS[sum(margin >= e for e in QOS_EDGES)]
+
+
+class HintRules:
+
+    def __init__(self, platform=None):
+        """
+        platform: optional vec2lang.PlatformConfig; when given, "performance"
+        restores the maximum CPU/GPU frequencies, otherwise it only restores v_max.
+        """
+        self.platform = platform
+
+        self.evaluated = 0
+        self.resolved = 0
+        self.by_rule: Dict[str, int] = {}
+        self.deferred: Dict[str, int] = {}
+
+    # --------------------------------------------------------
+    # Rules
+    # --------------------------------------------------------
+    def classify(self, converted: Dict, thr: Optional[float] = None,
+                 qos_ref: Optional[float] = None):
+        """(action, rule) if the hints determine the decision, else (None, reason)."""
+        soc = converted["robot_state"]["battery_soc"]["ratio"] * 100.0
+        risks: List[str] = converted["assessment"]
+        band = qos_band(thr, qos_ref)
+        safety = soc < SOC_SAFETY or bool(risks)
+
+        if safety and band == "violated":
+            return None, "conflict: safety vs QoS violation"
+        if safety:
+            return "save", "hint 5: SOC safety / risk"
+        if band is None:
+            return None, "no QoS reading"
+        if band == "violated":
+            return "performance", "hint 3: QoS violated"
+        if band == "at reference":
+            return "hold", "hint 6: within 3% of reference"
+        if band == "over-provisioned":
+            if soc > SOC_HIGH:
+                return None, "conflict: QoS margin vs high SOC"
+            return "save", "hint 4: QoS margin above 10%"
+        return "hold", "hint 10: stable"
+
+    def _apply(self, action: str, converted: Dict, current: Dict[str, float],
+               defaults: Dict[str, float]) -> Dict[str, float]:
+        params = dict(current)
+        if action == "hold":
+            return params
+
+        config = converted["configuration"]
+        if action == "save":
+            speed = _number(config["speed"])
+            params["v_max"] = max(speed - SAVE_SPEED_STEP, SAVE_SPEED_FLOOR, params["v_min"])
+            params["cpu_freq_ghz"] = min(_number(config["cpu_frequency"]), SAVE_CPU_GHZ)
+            params["gpu_freq_ghz"] = min(_number(config["gpu_frequency"]), SAVE_GPU_GHZ)
+            return params
+
+        params["v_max"] = defaults["v_max"]
+        if self.platform is not None:
+            params["cpu_freq_ghz"] = self.platform.cpu_freq_max
+            params["gpu_freq_ghz"] = self.platform.gpu_freq_max
+        return params
+
+    def decide(self, converted: Dict, current: Dict[str, float], defaults: Dict[str, float],
+               thr: Optional[float] = None, qos_ref: Optional[float] = None) -> Optional[Dict[str, float]]:
+        """
+        Controller parameters if the hints fully determine them, otherwise
+        None and the caller asks the model.
+        """
+        self.evaluated += 1
+        action, rule = self.classify(converted, thr=thr, qos_ref=qos_ref)
+        if action is None:
+            self.deferred[rule] = self.deferred.get(rule, 0) + 1
+            return None
+        self.resolved += 1
+        self.by_rule[rule] = self.by_rule.get(rule, 0) + 1
+        return self._apply(action, converted, current, defaults)
+
+    def stats(self) -> Dict:
+        return {
+            "evaluated": self.evaluated,
+            "resolved": self.resolved,
+            # Share of the states the rules were asked about (triggered ticks), not of all ticks
+            "resolved_of_evaluated": self.resolved / self.evaluated if self.evaluated else 0.0,
+            "by_rule": dict(self.by_rule),
+            "deferred": dict(self.deferred),
+        }
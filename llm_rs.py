@@ -1,10 +1,37 @@
-import numpy as np
-import roslibpy
-import os, time, ast, re, argparse, math
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+"""
+llm_rs.py
+
+Only the light decision-path modules are imported here; every backend and
+RAG/ROS dependency is imported when the selected mode first needs it:
+
+    training   no model, no RAG; roslibpy on first use of `ros`
+    gpt-4o     langchain_openai at init; RAG/journal warmed in the background
+    custom     torch/transformers at init (local_llm); RAG/journal warmed in the background
+
+STARTUP_TARGETS_S is the startup budget (import + construction) per mode on
+the Jetson; `python evaluation/startup_report.py` measures it together with
+an import-time breakdown.
+"""
+
+import os, time, threading
+from prompt_builder import PromptPrefix, PROMPT_FILES, build_messages, render_state, parse_decision
+from decision_cache import DecisionCache, state_key
+from trigger import TriggerEngine
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RAG_DIR = os.path.join(BASE_DIR, "rag_cache")
+DECISION_MEMORY_DIR = os.path.join(BASE_DIR, "train", "dataset", "sft")
+ROSBRIDGE_PORT = 8805
 
 MODEL_OPTIONS = ['gpt-4o', 'custom', 'training']
 
+# Seconds from `import llm_rs` to a constructed LLMResourceManagement (rag_warmup off)
+STARTUP_TARGETS_S = {
+    'training': 0.3,
+    'gpt-4o': 2.5,
+    'custom': 30.0,   # dominated by loading the merged model weights
+}
+
 class LLMResourceManagement():
     def __init__(self,
                  openai_token,
@@ -12,7 +39,21 @@ class LLMResourceManagement():
                  model_dir=None,
                  quant=False,
                  ros=None,
-                 host_ip='192.168.192.105'):
+                 host_ip='192.168.192.105',
+                 cache_ttl_s=30.0,
+                 cache_size=256,
+                 min_query_interval_s=5.0,
+                 rag_dtype="float16",
+                 decision_ivf_lists=0,
+                 rag_max_dense_mb=0,
+                 journal_max_records=5000,
+                 journal_max_age_s=6 * 3600.0,
+                 journal_compact_every_s=300.0,
+                 journal_dir=None,
+                 hint_rules=None,
+                 platform=None,
+                 constrained_decoding=True,
+                 rag_warmup=None):
         
         # Low-Level controller parameter
         self.default_rs_controller_params = {
@@ -22,21 +63,137 @@ class LLMResourceManagement():
             "v_max": 6.0,
         }
 
-        if ros:
-            self.ros = ros
-        else:
-            self.ros = roslibpy.Ros(host=host_ip, port=8805)
+        # roslibpy is imported and the connection object created on first use
+        self.host_ip = host_ip
+        self._ros = ros
         
+        self.current_params = dict(self.default_rs_controller_params)
+
+        # Query the model only on state changes, not on every sample
+        self.trigger = TriggerEngine(min_interval_s=min_query_interval_s)
+
+        # States the prompt hints fully determine never reach the model
+        # (default: on for the decision modes; training mode skips it and its numpy import)
+        if hint_rules is None:
+            hint_rules = model != 'training'
+        self.hint_rules = None
+        if hint_rules:
+            from hint_rules import HintRules
+            self.hint_rules = HintRules(platform=platform)
+
+        # Repeated discretized states reuse the previous decision
+        self.decision_cache = DecisionCache(max_entries=cache_size, ttl_s=cache_ttl_s)
+
+        # Static system prefix (instruction + hints), shared by every decision prompt
+        self.prompt_prefix = PromptPrefix()
+
         # LLM configuration
         self.openai_token = openai_token
         self.quant = quant
+        self.platform = platform
+        self.constrained_decoding = constrained_decoding
         self.llm, self.custom, self.use_openai = self.init_llm(model=model, model_dir=model_dir, openai_token=openai_token)
+        self.model_queries = 0
+
+        # Local CPU embeddings; indexes are memory-mapped from RAG_DIR.
+        # Everything below is built on first access (see _lazy)
+        self.rag_dtype = rag_dtype
+        self.decision_ivf_lists = decision_ivf_lists
+        # Opt-in: indexes up to this size are also kept as a resident float32 copy
+        self.rag_max_dense_bytes = int(rag_max_dense_mb * (1 << 20))
+        self.journal_dir = journal_dir or os.path.join(RAG_DIR, "journal")
+        self.journal_kwargs = dict(max_records=journal_max_records, max_age_s=journal_max_age_s,
+                                   compact_every_s=journal_compact_every_s)
+        self._lazy_lock = threading.RLock()
+        self._embedder = None
+        self._memory = None
+        self._decision_index = None
+        self._decision_journal = None
+        self._publisher = None
+        self.last_record = None
+
+        # Decision modes load the RAG memories off the startup path, before the first decision
+        if rag_warmup is None:
+            rag_warmup = model != 'training'
+        if rag_warmup:
+            threading.Thread(target=self.warm_rag, name="rag-warmup", daemon=True).start()
+
+    # ============================================================
+    # Lazily loaded dependencies
+    # ============================================================
+    def _lazy(self, attr, build):
+        value = getattr(self, attr)
+        if value is None:
+            with self._lazy_lock:
+                value = getattr(self, attr)
+                if value is None:
+                    value = build()
+                    setattr(self, attr, value)
+        return value
+
+    def loaded(self, name: str):
+        """The lazily loaded component `name` (e.g. "decision_journal") if already built, else None; never builds it."""
+        return getattr(self, "_" + name, None)
+
+    @property
+    def ros(self):
+        def connect():
+            import roslibpy
+            return roslibpy.Ros(host=self.host_ip, port=ROSBRIDGE_PORT)
+        return self._lazy("_ros", connect)
+
+    @ros.setter
+    def ros(self, ros):
+        self._ros = ros
+
+    @property
+    def embedder(self):
+        def build():
+            from rag_index import LocalEmbedder
+            return LocalEmbedder()
+        return self._lazy("_embedder", build)
+
+    @property
+    def base_memory(self):
+        return self._lazy("_memory", lambda: self.load_memory(openai_token=self.openai_token))[0]
+
+    @property
+    def vector_index(self):
+        return self._lazy("_memory", lambda: self.load_memory(openai_token=self.openai_token))[1]
+
+    @property
+    def decision_index(self):
+        return self._lazy("_decision_index", lambda: self.load_decision_mem(openai_api_key=self.openai_token))
+
+    @property
+    def decision_journal(self):
+        def build():
+            # Decisions made while running, searchable right away without a rebuild
+            from decision_journal import DecisionJournal
+            return DecisionJournal(self.journal_dir, self.embedder, **self.journal_kwargs)
+        return self._lazy("_decision_journal", build)
+
+    @property
+    def publisher(self):
+        def build():
+            # Coalesces parameter updates and owns the (re)connection, off the decision loop
+            from param_publisher import ParamPublisher
+            return ParamPublisher(lambda: self.ros)
+        return self._lazy("_publisher", build)
+
+    def publish_params(self, params: dict = None) -> int:
+        """Queue controller parameters (default: current_params) for the low-level controller; never blocks."""
+        return self.publisher.publish(self.current_params if params is None else params)
+
+    def warm_rag(self):
+        """Build/map the RAG indexes and open the journal now instead of on first use."""
+        try:
+            self.vector_index.warm()
+            self.decision_index.warm()
+            self.decision_journal
+        except Exception as e:
+            print(f"[WARN] RAG warm-up failed, will retry on first use: {e!r}")
 
-        # Analysis RAG
-        self.base_memory, self.vector_index = self.load_memory(openai_token=self.openai_token)
-        # Decision RAG
-        self.decision_index = self.load_decision_mem(openai_api_key=self.openai_token)
-    
     def init_llm(self, model: str, model_dir:str, openai_token: str) -> tuple:
         use_openai = False
         custom = False
@@ -45,17 +202,161 @@ class LLMResourceManagement():
         if model not in MODEL_OPTIONS:
             raise ValueError(f"Model {model} not supported. Please use one of {MODEL_OPTIONS}")
         if model == 'gpt-4o':
+            from langchain_openai import ChatOpenAI
             use_openai = True
             llm = ChatOpenAI(model_name="gpt-4o", openai_api_key=openai_token)
         elif model == 'custom':
-            if self.quant:
-                # todo
-                pass   
-            else:
-                # todo
-                pass  
+            # On-board model merged by train/sft_train.create_merged, kept resident and warm
+            from local_llm import LocalChatModel, DEFAULT_MODEL_DIR
+            from behavior_grammar import BehaviorGrammar
+            custom = True
+            # Decode only the bounded "Change behavior:" block, so every answer parses
+            grammar = BehaviorGrammar(speed=(self.default_rs_controller_params["v_min"],
+                                             self.default_rs_controller_params["v_max"]))
+            if self.platform is not None:
+                grammar = BehaviorGrammar.from_platform(self.platform, v_min=self.default_rs_controller_params["v_min"])
+            llm = LocalChatModel(model_dir=model_dir or DEFAULT_MODEL_DIR, quant=self.quant,
+                                 constrained=self.constrained_decoding, grammar=grammar)
         elif model == 'training':
             print("Not setting a model because we are training and using llm_rs just as a vessel to interact with ROS and utils.")
         else:
             raise ValueError(f"Something went wrong with the model selection: {model}")
-        return llm, custom, use_openai
\ No newline at end of file
+        return llm, custom, use_openai
+
+    def query_llm(self, robot_state: str) -> str:
+        """Ask the model for a decision on one robot-state description."""
+        if self.llm is None:
+            raise RuntimeError("No model configured (model='training').")
+        messages = build_messages(self.prompt_prefix, robot_state)
+        self.model_queries += 1
+        if self.custom:
+            return self.llm.invoke(messages).content
+        return self.llm.invoke([(m["role"], m["content"]) for m in messages]).content
+
+    def query_llm_batch(self, robot_states: list) -> list:
+        """Answers for several robot-state descriptions, in one batched forward pass on the local backend."""
+        if self.llm is None:
+            raise RuntimeError("No model configured (model='training').")
+        batch = [build_messages(self.prompt_prefix, s) for s in robot_states]
+        self.model_queries += len(batch)
+        if self.custom:
+            return [r["text"] for r in self.llm.generate_batch(batch)]
+        # Remote backend: concurrent requests through langchain's Runnable.batch
+        answers = self.llm.batch([[(m["role"], m["content"]) for m in messages] for messages in batch])
+        return [a.content for a in answers]
+
+    def apply_rules(self, converted: dict, thr=None, qos_ref=None, current=None):
+        """Controller parameters if the hint rules resolve this state, else None."""
+        if self.hint_rules is None:
+            return None
+        current = self.current_params if current is None else current
+        return self.hint_rules.decide(converted, current, self.default_rs_controller_params,
+                                      thr=thr, qos_ref=qos_ref)
+
+    def resolve(self, converted: dict, thr=None, qos_ref=None, current=None) -> tuple:
+        """
+        Decision for one Vec2Lang.convert() state without the model:
+        (params, source, key, robot_state). source is "rules" or "cache" when
+        params is set; otherwise params is None, source is "model" and
+        robot_state is the prompt to send, with finish() handling the answer.
+        """
+        params = self.apply_rules(converted, thr=thr, qos_ref=qos_ref, current=current)
+        if params is not None:
+            return params, "rules", None, None
+        key = state_key(converted)
+        params = self.decision_cache.get(key)
+        if params is not None:
+            # Reusing a journaled decision counts as a use for the journal's eviction order
+            record, journal = self.decision_cache.record(key), self.loaded("decision_journal")
+            if record is not None and journal is not None:
+                journal.mark_used(record)
+            return params, "cache", key, None
+        return None, "model", key, render_state(converted)
+
+    def finish(self, robot_state: str, answer: str, key=None) -> tuple:
+        """
+        (params, record id) for a model answer. A parsed decision is cached
+        under `key` (if any) and journaled; an unparseable answer falls back
+        to default_rs_controller_params with record id None.
+        """
+        params = parse_decision(answer, self.default_rs_controller_params)
+        if params is None:
+            return dict(self.default_rs_controller_params), None
+        record = self.decision_journal.append(robot_state, params)
+        if key is not None:
+            self.decision_cache.put(key, params, record)
+        return params, record
+
+    def decide(self, converted: dict, thr=None, qos_ref=None) -> dict:
+        """
+        Controller parameters for one Vec2Lang.convert() state.
+
+        Resolved by the hint rules when they determine the decision, then
+        served from the decision cache when the same discretized state was
+        decided recently; otherwise the model is queried. Falls back to
+        default_rs_controller_params if the answer cannot be parsed.
+        """
+        params, _, key, robot_state = self.resolve(converted, thr=thr, qos_ref=qos_ref)
+        if params is not None:
+            return params
+        params, record = self.finish(robot_state, self.query_llm(robot_state), key)
+        if record is not None:
+            self.last_record = record
+        return params
+
+    def record_outcome(self, outcome: dict, record_id=None) -> bool:
+        """Attach an observed outcome (e.g. energy, QoS) to a journaled decision, by default the last one."""
+        record_id = self.last_record if record_id is None else record_id
+        if record_id is None:
+            return False
+        return self.decision_journal.record_outcome(record_id, outcome)
+
+    def step(self, converted: dict, thr=None, qos_ref=None) -> dict:
+        """
+        One control tick: re-decide only if the trigger engine fires,
+        otherwise keep the current controller parameters.
+        """
+        if self.trigger.update(converted, thr=thr, qos_ref=qos_ref):
+            self.current_params = self.decide(converted, thr=thr, qos_ref=qos_ref)
+        return self.current_params
+
+    def pipeline(self, sample_fn, publish_fn=None, sample_period_s=1.0):
+        """Asynchronous sample -> prompt -> inference -> actuation pipeline around this manager."""
+        from pipeline import DecisionPipeline
+        publish_fn = publish_fn or self.publish_params
+        return DecisionPipeline(self, sample_fn, publish_fn, sample_period_s=sample_period_s)
+
+    def serve(self, host="0.0.0.0", port=8806, max_batch=16, max_wait_s=0.005):
+        """HTTP decision server for a fleet of robots, batching their model calls."""
+        from fleet_server import FleetServer
+        return FleetServer(self, host=host, port=port, max_batch=max_batch, max_wait_s=max_wait_s)
+
+    def load_memory(self, openai_token=None):
+        """Analysis RAG over the prompt hints. openai_token is unused: embeddings are local."""
+        from rag_index import open_or_build, load_hint_docs
+        index = open_or_build(os.path.join(RAG_DIR, "analysis"), PROMPT_FILES, load_hint_docs,
+                              embedder=self.embedder, dtype=self.rag_dtype,
+                              max_dense_bytes=self.rag_max_dense_bytes)
+        base_memory = [d["text"] for d in index.docs]
+        return base_memory, index
+
+    def load_decision_mem(self, openai_api_key=None):
+        """Decision RAG over the state -> decision pairs of the SFT dataset."""
+        from rag_index import open_or_build, load_decision_docs
+        sources = sorted(os.path.join(DECISION_MEMORY_DIR, f) for f in os.listdir(DECISION_MEMORY_DIR)
+                         if f.endswith((".json", ".jsonl")))
+        index = open_or_build(os.path.join(RAG_DIR, "decision"), sources, load_decision_docs,
+                              embedder=self.embedder, dtype=self.rag_dtype, nlist=self.decision_ivf_lists,
+                              max_dense_bytes=self.rag_max_dense_bytes)
+        return index
+
+    def retrieve(self, query: str, k: int = 4) -> dict:
+        """Top-k hints and past decisions for a robot-state description."""
+        recent = [{"text": r["state"], "score": r["score"],
+                   "meta": {"decision": r["decision"], "outcome": r["outcome"], "id": r["id"]}}
+                  for r in self.decision_journal.search(query, k=k)]
+        decisions = sorted(self.decision_index.search(query, k=k) + recent, key=lambda d: -d["score"])
+        return {
+            "hints": self.vector_index.search(query, k=k),
+            "decisions": decisions[:k],
+        }
@@ -0,0 +1,388 @@
+"""
+local_llm.py
+
+On-board inference backend for the 'custom' model option of
+LLMResourceManagement.
+
+Loads the merged model written by sft_train.create_merged
+(<out_dir>/merged), keeps it resident and warm, and exposes the same
+`invoke()` interface as langchain's ChatOpenAI, so decisions no longer
+depend on network latency or connectivity.
+
+Quantization:
+    quant=False   full precision (bf16/fp16 on GPU, fp32 on CPU)
+    quant="8bit"  CUDA: bitsandbytes int8; CPU: torch dynamic int8 Linear layers
+    quant="4bit"  CUDA: bitsandbytes nf4 (CPU needs a bitsandbytes build with CPU support)
+    quant=True    "4bit" on CUDA, "8bit" on CPU
+
+With constrained=True, invoke() skips the free-form reasoning and decodes
+only the "Change behavior:" block under behavior_grammar.BehaviorGrammar:
+literals are forced, each numeric field may only take digits that keep it
+within its bounds, and decoding stops once the last field is complete.
+"""
+
+import copy
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import torch
+from transformers import AutoModelForCausalLM, AutoTokenizer
+
+from behavior_grammar import BehaviorGrammar, number_tokens, literal_tokens
+
+DEFAULT_MODEL_DIR = "train/outputs/merged"
+QUANT_OPTIONS = [False, True, "8bit", "4bit"]
+
+# langchain message.type -> chat template role
+ROLE_MAP = {"human": "user", "user": "user", "ai": "assistant", "assistant": "assistant", "system": "system"}
+
+
+class LocalMessage:
+    """Minimal stand-in for langchain's AIMessage (`.content`)."""
+
+    def __init__(self, content: str, response_metadata: Optional[Dict[str, Any]] = None):
+        self.content = content
+        self.response_metadata = response_metadata or {}
+
+    def __repr__(self):
+        return f"LocalMessage(content={self.content!r})"
+
+
+def _ai_message(content: str, metadata: Dict[str, Any]):
+    try:
+        from langchain_core.messages import AIMessage
+    except ImportError:
+        return LocalMessage(content, metadata)
+    return AIMessage(content=content, response_metadata=metadata)
+
+
+def to_chat_messages(prompt) -> List[Dict[str, str]]:
+    """Normalize anything ChatOpenAI.invoke accepts into chat template messages."""
+    if hasattr(prompt, "to_messages"):  # langchain PromptValue
+        prompt = prompt.to_messages()
+    if isinstance(prompt, str):
+        return [{"role": "user", "content": prompt}]
+
+    messages = []
+    for m in prompt:
+        if isinstance(m, dict):
+            messages.append({"role": ROLE_MAP.get(m["role"], m["role"]), "content": m["content"]})
+        elif isinstance(m, (tuple, list)):
+            role, content = m
+            messages.append({"role": ROLE_MAP.get(role, role), "content": content})
+        elif isinstance(m, str):
+            messages.append({"role": "user", "content": m})
+        else:  # langchain BaseMessage
+            messages.append({"role": ROLE_MAP.get(m.type, m.type), "content": m.content})
+    return messages
+
+
+def _cache_length(past) -> int:
+    if past is None:
+        return 0
+    if hasattr(past, "get_seq_length"):
+        return int(past.get_seq_length())
+    return int(past[0][0].shape[2])  # legacy tuple cache
+
+
+class PrefixKVCache:
+    """
+    Attention KV state of the static prompt prefix (the leading system
+    message(s)), computed once and reused by every generate() call.
+
+    The entry is keyed by the prefix text, so it is rebuilt only when the
+    prompt files behind it change (see prompt_builder.PromptPrefix).
+    """
+
+    def __init__(self, model, tokenizer, device: str):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.device = device
+        self._key: Optional[str] = None
+        self._ids: Optional[torch.Tensor] = None
+        self._kv = None
+        self.hits = 0
+        self.misses = 0
+        self.rebuilds = 0
+
+    @staticmethod
+    def split(messages: List[Dict[str, str]]) -> Tuple[List[Dict[str, str]], List[Dict[str, str]]]:
+        n = 0
+        while n < len(messages) and messages[n]["role"] == "system":
+            n += 1
+        return messages[:n], messages[n:]
+
+    @torch.inference_mode()
+    def _build(self, prefix: List[Dict[str, str]], key: str):
+        ids = self.tokenizer.apply_chat_template(prefix, add_generation_prompt=False,
+                                                 return_tensors="pt").to(self.device)
+        out = self.model(input_ids=ids, use_cache=True)
+        self._key, self._ids, self._kv = key, ids, out.past_key_values
+        self.rebuilds += 1
+
+    def lookup(self, messages: List[Dict[str, str]], input_ids: torch.Tensor):
+        """A private copy of the prefix KV if `input_ids` starts with the cached prefix, else None."""
+        prefix, _ = self.split(messages)
+        if not prefix:
+            self.misses += 1
+            return None
+
+        key = hashlib.sha256(repr(prefix).encode()).hexdigest()
+        if key != self._key:
+            self._build(prefix, key)
+
+        n = self._ids.shape[1]
+        if input_ids.shape[1] <= n or not torch.equal(input_ids[:, :n], self._ids):
+            # Template renders the prefix differently in context; fall back to full prefill
+            self.misses += 1
+            return None
+        self.hits += 1
+        # generate() extends the cache in place, so hand out a copy
+        return copy.deepcopy(self._kv)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "rebuilds": self.rebuilds}
+
+
+class LocalChatModel:
+
+    def __init__(self,
+                 model_dir: str = DEFAULT_MODEL_DIR,
+                 quant: Union[bool, str] = False,
+                 device: Optional[str] = None,
+                 max_new_tokens: int = 256,
+                 prefix_cache: bool = True,
+                 warmup: bool = True,
+                 constrained: bool = False,
+                 grammar: Optional[BehaviorGrammar] = None):
+        if quant not in QUANT_OPTIONS:
+            raise ValueError(f"Quantization {quant} not supported. Please use one of {QUANT_OPTIONS}")
+
+        self.model_dir = model_dir
+        self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+        self.quant = quant
+        self.max_new_tokens = max_new_tokens
+        self._lock = threading.Lock()
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        if self.tokenizer.pad_token_id is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        self.model = self._load_model()
+        self.model.eval()
+        self.prefix_cache = PrefixKVCache(self.model, self.tokenizer, self.device) if prefix_cache else None
+
+        self.constrained = constrained
+        self.grammar = grammar or BehaviorGrammar()
+        self._number_tokens: Optional[List[Tuple[int, str]]] = None
+        self._literal_ids: Dict[Tuple[str, ...], List[torch.Tensor]] = {}
+        self._literal_tokens: Dict[Tuple[str, ...], List[Tuple[int, str]]] = {}
+        if constrained:
+            self._number_tokens = number_tokens(self.tokenizer)
+            if not self._number_tokens:
+                raise ValueError(f"Tokenizer of {model_dir} has no digit tokens; constrained decoding unavailable")
+
+        if warmup:
+            self.warmup()
+
+    # ============================================================
+    # Loading
+    # ============================================================
+    def _load_model(self):
+        on_gpu = self.device.startswith("cuda")
+        quant = self.quant
+        if quant is True:
+            quant = "4bit" if on_gpu else "8bit"
+
+        if not quant:
+            dtype = (torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16) if on_gpu else torch.float32
+            return AutoModelForCausalLM.from_pretrained(self.model_dir, torch_dtype=dtype).to(self.device)
+
+        if quant == "8bit" and not on_gpu:
+            # Dynamic int8 quantization of every Linear layer, runs on plain CPU kernels
+            model = AutoModelForCausalLM.from_pretrained(self.model_dir, torch_dtype=torch.float32)
+            return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+        from transformers import BitsAndBytesConfig
+        bnb = BitsAndBytesConfig(
+            load_in_4bit=quant == "4bit",
+            load_in_8bit=quant == "8bit",
+            bnb_4bit_quant_type="nf4",
+            bnb_4bit_compute_dtype=torch.bfloat16 if on_gpu else torch.float32,
+        )
+        return AutoModelForCausalLM.from_pretrained(self.model_dir, quantization_config=bnb,
+                                                    device_map=self.device)
+
+    def warmup(self):
+        """One short generation so the first real decision does not pay kernel/cache setup."""
+        if self.constrained:
+            self.generate_behavior([{"role": "user", "content": "ping"}])
+        else:
+            self.generate([{"role": "user", "content": "ping"}], max_new_tokens=1)
+
+    # ============================================================
+    # Generation
+    # ============================================================
+    def encode(self, messages: List[Dict[str, str]]) -> torch.Tensor:
+        return self.tokenizer.apply_chat_template(
+            messages, add_generation_prompt=True, return_tensors="pt"
+        ).to(self.device)
+
+    @torch.inference_mode()
+    def generate(self, messages: List[Dict[str, str]], max_new_tokens: Optional[int] = None) -> Dict[str, Any]:
+        input_ids = self.encode(messages)
+        with self._lock:
+            past = self.prefix_cache.lookup(messages, input_ids) if self.prefix_cache else None
+            output = self.model.generate(
+                input_ids,
+                attention_mask=torch.ones_like(input_ids),
+                past_key_values=past,
+                max_new_tokens=max_new_tokens or self.max_new_tokens,
+                do_sample=False,
+                pad_token_id=self.tokenizer.pad_token_id,
+            )
+        new_tokens = output[0, input_ids.shape[1]:]
+        return {
+            "text": self.tokenizer.decode(new_tokens, skip_special_tokens=True),
+            "prompt_tokens": int(input_ids.shape[1]),
+            "completion_tokens": int(new_tokens.shape[0]),
+        }
+
+    def _literals(self, grammar: BehaviorGrammar) -> List[torch.Tensor]:
+        ids = self._literal_ids.get(grammar.literals)
+        if ids is None:
+            ids = [self.tokenizer(lit, add_special_tokens=False, return_tensors="pt").input_ids.to(self.device)
+                   for lit in grammar.literals]
+            self._literal_ids[grammar.literals] = ids
+        return ids
+
+    @torch.inference_mode()
+    def generate_behavior(self, messages: List[Dict[str, str]],
+                          grammar: Optional[BehaviorGrammar] = None) -> Dict[str, Any]:
+        """
+        Decode only the "Change behavior:" block, constrained by `grammar`.
+
+        Greedy over the allowed digit tokens of each field; the literal
+        segments between fields are fed in one forward pass each and never
+        sampled, so completion_tokens counts the digit tokens only.
+        """
+        if self._number_tokens is None:
+            self._number_tokens = number_tokens(self.tokenizer)
+        grammar = grammar or self.grammar
+        literals = self._literals(grammar)
+        prompt_ids = self.encode(messages)
+
+        values = []
+        steps = 0
+        with self._lock:
+            past = self.prefix_cache.lookup(messages, prompt_ids) if self.prefix_cache else None
+            pending = torch.cat([prompt_ids, literals[0]], dim=1)[:, _cache_length(past):]
+            for i, field in enumerate(grammar.fields):
+                text = ""
+                while not field.complete(text):
+                    out = self.model(input_ids=pending, past_key_values=past, use_cache=True)
+                    past = out.past_key_values
+                    allowed = [(tid, tok) for tid, tok in self._number_tokens if field.accepts(text + tok)]
+                    ids = torch.tensor([tid for tid, _ in allowed], device=self.device)
+                    best = int(torch.argmax(out.logits[0, -1, ids]))
+                    text += allowed[best][1]
+                    pending = ids[best].view(1, 1)
+                    steps += 1
+                values.append(text)
+                if i + 1 < len(grammar.fields):
+                    pending = torch.cat([pending, literals[i + 1]], dim=1)
+
+        return {
+            "text": grammar.render(values),
+            "prompt_tokens": int(prompt_ids.shape[1]),
+            "completion_tokens": steps,
+        }
+
+    def _allowed_fn(self, grammar: BehaviorGrammar, prompt_len: int):
+        """prefix_allowed_tokens_fn for generate(): the grammar applied per row, memoized on the row text."""
+        if self._number_tokens is None:
+            self._number_tokens = number_tokens(self.tokenizer)
+        literal_toks = self._literal_tokens.get(grammar.literals)
+        if literal_toks is None:
+            literal_toks = self._literal_tokens[grammar.literals] = literal_tokens(self.tokenizer, grammar)
+        eos = [self.tokenizer.eos_token_id]
+        memo: Dict[str, List[int]] = {}
+
+        def allowed(batch_id: int, input_ids: torch.Tensor) -> List[int]:
+            text = self.tokenizer.decode(input_ids[prompt_len:], skip_special_tokens=True)
+            ids = memo.get(text)
+            if ids is None:
+                state = grammar.state(text)
+                if state is None or state[0] == "done":
+                    ids = eos
+                elif state[0] == "literal":
+                    ids = [tid for tid, tok in literal_toks if state[1].startswith(tok)]
+                else:
+                    _, field, partial = state
+                    ids = [tid for tid, tok in self._number_tokens if field.accepts(partial + tok)]
+                memo[text] = ids or eos
+            return memo[text]
+
+        return allowed
+
+    @torch.inference_mode()
+    def generate_batch(self, batch: List[List[Dict[str, str]]], constrained: Optional[bool] = None,
+                       grammar: Optional[BehaviorGrammar] = None,
+                       max_new_tokens: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        One left-padded generate() over several conversations (e.g. one per robot).
+
+        Constrained rows start after the first literal of the grammar and are
+        restricted token by token through prefix_allowed_tokens_fn; each row
+        ends with EOS once its block is complete.
+        """
+        constrained = self.constrained if constrained is None else constrained
+        grammar = grammar or self.grammar
+        prompts = [self.tokenizer.apply_chat_template(m, add_generation_prompt=True, tokenize=False)
+                   for m in batch]
+        head = grammar.literals[0] if constrained else ""
+        # Left padding for this call only; the tokenizer is shared with the single-request path
+        padding_side, self.tokenizer.padding_side = self.tokenizer.padding_side, "left"
+        try:
+            enc = self.tokenizer([p + head for p in prompts], return_tensors="pt", padding=True,
+                                 add_special_tokens=False).to(self.device)
+        finally:
+            self.tokenizer.padding_side = padding_side
+        prompt_len = enc.input_ids.shape[1]
+
+        with self._lock:
+            output = self.model.generate(
+                **enc,
+                max_new_tokens=max_new_tokens or self.max_new_tokens,
+                do_sample=False,
+                pad_token_id=self.tokenizer.pad_token_id,
+                prefix_allowed_tokens_fn=self._allowed_fn(grammar, prompt_len) if constrained else None,
+            )
+
+        results = []
+        for row in range(len(batch)):
+            new_tokens = output[row, prompt_len:]
+            new_tokens = new_tokens[new_tokens != self.tokenizer.pad_token_id]
+            text = self.tokenizer.decode(new_tokens, skip_special_tokens=True)
+            results.append({
+                "text": head + text,
+                "prompt_tokens": int(enc.attention_mask[row].sum()),
+                "completion_tokens": int(new_tokens.shape[0]),
+            })
+        return results
+
+    def invoke(self, prompt, **kwargs):
+        """Same call shape as ChatOpenAI.invoke: returns a message with `.content`."""
+        messages = to_chat_messages(prompt)
+        if kwargs.get("constrained", self.constrained):
+            result = self.generate_behavior(messages, grammar=kwargs.get("grammar"))
+        else:
+            result = self.generate(messages, max_new_tokens=kwargs.get("max_new_tokens"))
+        metadata = {
+            "model_name": self.model_dir,
+            "token_usage": {
+                "prompt_tokens": result["prompt_tokens"],
+                "completion_tokens": result["completion_tokens"],
+            },
+        }
+        return _ai_message(result["text"].strip(), metadata)
@@ -0,0 +1,231 @@
+"""
+param_publisher.py
+
+Non-blocking publisher for the low-level controller parameters
+(weight_mec, weight_com, v_min, v_max) and the CPU/GPU frequency targets
+(cpu_freq_ghz, gpu_freq_ghz), one std_msgs/Float64 topic each. Only the
+keys present in an update are sent; the frequencies appear once the model
+or the hint rules set them.
+
+publish() never touches the network: it records the latest value per
+topic and returns. A single worker thread owns the rosbridge connection
+and sends whatever is pending:
+
+  - coalescing: several updates to a topic before the worker gets to it
+    are sent once, with the newest value
+  - unchanged values (within `tolerance` of the last value sent) are skipped
+  - link loss: the worker reconnects with exponential backoff while the
+    decision loop keeps running; after a reconnect the last values are
+    sent again, since messages just before the drop may have been lost
+
+The backlog during link loss is the latest value per topic, so it is
+bounded by the number of topics. Topics are only published while the link
+is up, which keeps roslibpy's own (unbounded) send-on-ready queue empty.
+"""
+
+import random
+import threading
+from typing import Any, Callable, Dict, Optional
+
+PARAM_TOPICS = {name: f"/{name}" for name in ("weight_mec", "weight_com", "v_min", "v_max",
+                                               "cpu_freq_ghz", "gpu_freq_ghz")}
+MSG_TYPE = "std_msgs/Float64"
+
+
+class ParamPublisher:
+
+    def __init__(self,
+                 ros_factory: Callable[[], Any],
+                 topics: Dict[str, str] = PARAM_TOPICS,
+                 tolerance: float = 1e-6,
+                 connect_timeout_s: float = 2.0,
+                 backoff_min_s: float = 0.5,
+                 backoff_max_s: float = 30.0,
+                 republish_on_reconnect: bool = True):
+        """
+        ros_factory:      returns the roslibpy.Ros to publish on; called on the worker thread
+        topics:           parameter name -> topic name
+        tolerance:        changes up to this are not published
+        connect_timeout_s: wait per connection attempt
+        backoff_*:        delay between failed attempts, doubled per failure (with jitter)
+        """
+        self.ros_factory = ros_factory
+        self.topics = dict(topics)
+        self.tolerance = tolerance
+        self.connect_timeout_s = connect_timeout_s
+        self.backoff_min_s = backoff_min_s
+        self.backoff_max_s = backoff_max_s
+        self.republish_on_reconnect = republish_on_reconnect
+
+        self._ros = None
+        self._topics: Dict[str, Any] = {}
+        self._pending: Dict[str, float] = {}
+        self._sent: Dict[str, float] = {}
+        self._in_flight = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self._was_connected = False
+
+        self.queued = 0
+        self.published = 0
+        self.skipped = 0
+        self.coalesced = 0
+        self.reconnects = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+
+        self._thread = threading.Thread(target=self._run, name="param-publisher", daemon=True)
+        self._thread.start()
+
+    # --------------------------------------------------------
+    # Decision-loop side
+    # --------------------------------------------------------
+    def publish(self, params: Dict[str, float]) -> int:
+        """Queue the parameters that changed; returns how many topics will be sent. Never blocks on ROS."""
+        queued = 0
+        with self._cond:
+            for name in self.topics:
+                if name not in params:
+                    continue
+                value = float(params[name])
+                sent = self._sent.get(name)
+                unchanged = sent is not None and abs(value - sent) <= self.tolerance
+                if name in self._pending:
+                    # Superseded before it went out
+                    self.coalesced += 1
+                    if unchanged:
+                        del self._pending[name]
+                        continue
+                elif unchanged:
+                    self.skipped += 1
+                    continue
+                self._pending[name] = value
+                queued += 1
+            if queued:
+                self.queued += queued
+                self._cond.notify_all()
+        return queued
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Block until nothing is pending (or `timeout`); False if updates are still queued."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._idle() or self._closed, timeout=timeout)
+            return self._idle()
+
+    def _idle(self) -> bool:
+        return not self._pending and not self._in_flight
+
+    @property
+    def connected(self) -> bool:
+        return self._link_up()
+
+    # --------------------------------------------------------
+    # Worker
+    # --------------------------------------------------------
+    def _link_up(self) -> bool:
+        try:
+            return self._ros is not None and bool(self._ros.is_connected)
+        except Exception:
+            return False
+
+    def _connect(self):
+        if self._ros is None:
+            self._ros = self.ros_factory()
+        if not self._ros.is_connected:
+            # Raises when the bridge does not answer in time; roslibpy keeps retrying in the background
+            self._ros.run(timeout=self.connect_timeout_s)
+
+    def _topic(self, name: str):
+        import roslibpy
+
+        topic = self._topics.get(name)
+        if topic is None:
+            topic = roslibpy.Topic(self._ros, self.topics[name], MSG_TYPE)
+            topic.advertise()
+            self._topics[name] = topic
+        return topic
+
+    def _wait(self, seconds: float):
+        with self._cond:
+            self._cond.wait_for(lambda: self._closed, timeout=seconds)
+
+    def _run(self):
+        import roslibpy
+
+        delay = self.backoff_min_s
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._closed)
+                if self._closed:
+                    return
+
+            if not self._link_up():
+                try:
+                    self._connect()
+                except Exception as e:
+                    self.failures += 1
+                    self.last_error = repr(e)
+                    self._wait(delay * random.uniform(0.8, 1.2))
+                    delay = min(delay * 2, self.backoff_max_s)
+                    continue
+                delay = self.backoff_min_s
+                if self._was_connected:
+                    self.reconnects += 1
+                    if self.republish_on_reconnect:
+                        with self._cond:
+                            for name, value in self._sent.items():
+                                self._pending.setdefault(name, value)
+                self._was_connected = True
+
+            with self._cond:
+                batch, self._pending = self._pending, {}
+                self._in_flight = len(batch)
+                previous = {name: self._sent.get(name) for name in batch}
+                # Marked as sent up front so a repeat of an in-flight value is skipped
+                self._sent.update(batch)
+
+            done = set()
+            try:
+                for name, value in batch.items():
+                    self._topic(name).publish(roslibpy.Message({"data": value}))
+                    done.add(name)
+            except Exception as e:
+                self.failures += 1
+                self.last_error = repr(e)
+            with self._cond:
+                for name, value in batch.items():
+                    if name in done:
+                        continue
+                    # Not sent: roll back, and retry it unless a newer value is already queued
+                    if previous[name] is None:
+                        self._sent.pop(name, None)
+                    else:
+                        self._sent[name] = previous[name]
+                    self._pending.setdefault(name, value)
+                self.published += len(done)
+                self._in_flight = 0
+                self._cond.notify_all()
+            if len(done) < len(batch):
+                self._wait(delay)
+
+    def close(self, timeout: float = 1.0):
+        """Stop the worker; pending updates are dropped. The ROS connection is left to its owner."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            backlog = len(self._pending)
+        return {
+            "connected": self._link_up(),
+            "backlog": backlog,
+            "queued": self.queued,
+            "published": self.published,
+            "skipped": self.skipped,
+            "coalesced": self.coalesced,
+            "reconnects": self.reconnects,
+            "failures": self.failures,
+            "last_error": self.last_error,
+        }
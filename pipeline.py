@@ -0,0 +1,232 @@
+"""
+pipeline.py
+
+Asynchronous decision pipeline decoupled from the control loop.
+
+    sample -> prompt -> inference -> actuation
+
+Each stage is an asyncio task joined to the next by a bounded queue that
+keeps only the newest item, so a slow stage never backs up the ones
+before it. Blocking work (sysfs reads, model calls, ROS publishing) runs
+in worker threads. While an inference is in flight the low-level
+controller keeps running on the last published parameters, and an
+inference superseded by a newer state is cancelled and its answer
+discarded. States resolved by the hint rules or the decision cache skip
+inference entirely. Per-stage latencies are kept for export via stats().
+"""
+
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple
+
+STAGES = ("sample", "prompt", "inference", "actuation")
+
+
+def _put_latest(queue: asyncio.Queue, item):
+    """Enqueue, dropping the oldest item if the queue is full."""
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(item)
+
+
+class StageLatency:
+
+    def __init__(self, window: int = 1000):
+        self.samples: Dict[str, deque] = {s: deque(maxlen=window) for s in STAGES}
+
+    def record(self, stage: str, seconds: float):
+        self.samples[stage].append(seconds)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        out = {}
+        for stage, values in self.samples.items():
+            if not values:
+                continue
+            ordered = sorted(values)
+            pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+            out[stage] = {
+                "count": len(ordered),
+                "p50_ms": pick(0.50) * 1e3,
+                "p95_ms": pick(0.95) * 1e3,
+                "max_ms": ordered[-1] * 1e3,
+            }
+        return out
+
+
+class DecisionPipeline:
+
+    def __init__(self,
+                 manager,
+                 sample_fn: Callable[[], Tuple[Dict, Optional[float], Optional[float]]],
+                 publish_fn: Callable[[Dict[str, float]], None],
+                 sample_period_s: float = 1.0,
+                 queue_size: int = 1):
+        """
+        manager:    LLMResourceManagement (trigger, decision cache, model)
+        sample_fn:  blocking; returns (Vec2Lang.convert() state, throughput, QoS reference)
+        publish_fn: sends controller parameters to the low-level controller
+                    (LLMResourceManagement.publish_params queues them without blocking)
+        """
+        self.manager = manager
+        self.sample_fn = sample_fn
+        self.publish_fn = publish_fn
+        self.sample_period_s = sample_period_s
+        self.queue_size = queue_size
+
+        self.latency = StageLatency()
+        self.superseded = 0
+        self.rule_hits = 0
+        self.cache_hits = 0
+        self.published = 0
+
+        # One worker per blocking stage, so a slow model call never starves sampling
+        self._pools = {
+            stage: ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"decision-{stage}")
+            for stage in ("sample", "inference", "actuation")
+        }
+        # Parsing an answer also caches and journals it; the journal embeds the state,
+        # which may load the embedder or wait for the RAG warm-up, so it stays off the loop
+        self._pools["finish"] = ThreadPoolExecutor(max_workers=1, thread_name_prefix="decision-finish")
+        self._stop: Optional[asyncio.Event] = None
+
+    # --------------------------------------------------------
+    # Stages
+    # --------------------------------------------------------
+    async def _sampler(self, out: asyncio.Queue):
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while not self._stop.is_set():
+            t0 = time.perf_counter()
+            sample = await loop.run_in_executor(self._pools["sample"], self.sample_fn)
+            self.latency.record("sample", time.perf_counter() - t0)
+            _put_latest(out, sample)
+
+            next_tick += self.sample_period_s
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+
+    async def _prompter(self, inp: asyncio.Queue, infer: asyncio.Queue, act: asyncio.Queue):
+        manager = self.manager
+        while True:
+            converted, thr, qos_ref = await inp.get()
+            t0 = time.perf_counter()
+            if not manager.trigger.update(converted, thr=thr, qos_ref=qos_ref):
+                continue
+            params, source, key, robot_state = manager.resolve(converted, thr=thr, qos_ref=qos_ref)
+            if source == "rules":
+                self.rule_hits += 1
+            elif source == "cache":
+                self.cache_hits += 1
+            if params is not None:
+                _put_latest(act, params)
+            else:
+                _put_latest(infer, (key, robot_state))
+            self.latency.record("prompt", time.perf_counter() - t0)
+
+    async def _inference(self, inp: asyncio.Queue, act: asyncio.Queue):
+        manager = self.manager
+        request = await inp.get()
+
+        while True:
+            key, robot_state = request
+            t0 = time.perf_counter()
+            call = self._pools["inference"].submit(manager.query_llm, robot_state)
+            task = asyncio.wrap_future(call)
+            newer = asyncio.ensure_future(inp.get())
+            done, _ = await asyncio.wait({task, newer}, return_when=asyncio.FIRST_COMPLETED)
+
+            if newer in done:
+                # A newer state arrived: never actuate this answer. A call that already
+                # started cannot be interrupted, so its answer is still cached for its state.
+                if not call.cancel():
+                    call.add_done_callback(
+                        lambda c, r=request: self._pools["finish"].submit(self._cache_answer, *r, c))
+                task.cancel()
+                self.superseded += 1
+                request = newer.result()
+                continue
+
+            newer.cancel()
+            self.latency.record("inference", time.perf_counter() - t0)
+            if task.exception() is not None:
+                print(f"[WARN] Inference failed, keeping current parameters: {task.exception()!r}")
+                request = await inp.get()
+                continue
+            params = await asyncio.get_running_loop().run_in_executor(
+                self._pools["finish"], self._cache_answer, key, robot_state, call, True)
+            _put_latest(act, params)
+            request = await inp.get()
+
+    def _cache_answer(self, key, robot_state, call, actuated=False) -> Optional[Dict[str, float]]:
+        if call.cancelled() or call.exception() is not None:
+            return None
+        params, record = self.manager.finish(robot_state, call.result(), key)
+        if actuated and record is not None:
+            self.manager.last_record = record
+        return params
+
+    async def _actuator(self, inp: asyncio.Queue):
+        loop = asyncio.get_running_loop()
+        while True:
+            params = await inp.get()
+            t0 = time.perf_counter()
+            await loop.run_in_executor(self._pools["actuation"], self.publish_fn, params)
+            self.manager.current_params = params
+            self.published += 1
+            self.latency.record("actuation", time.perf_counter() - t0)
+
+    # --------------------------------------------------------
+    # Run
+    # --------------------------------------------------------
+    async def run(self, duration_s: Optional[float] = None):
+        self._stop = asyncio.Event()
+        states = asyncio.Queue(self.queue_size)
+        requests = asyncio.Queue(self.queue_size)
+        params = asyncio.Queue(self.queue_size)
+
+        # Start the low-level controller on the current parameters right away
+        await asyncio.get_running_loop().run_in_executor(self._pools["actuation"], self.publish_fn,
+                                                         dict(self.manager.current_params))
+
+        workers = [
+            asyncio.ensure_future(self._prompter(states, requests, params)),
+            asyncio.ensure_future(self._inference(requests, params)),
+            asyncio.ensure_future(self._actuator(params)),
+        ]
+        sampler = asyncio.ensure_future(self._sampler(states))
+        try:
+            if duration_s is None:
+                await sampler
+            else:
+                await asyncio.wait_for(asyncio.shield(sampler), duration_s)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self._stop.set()
+            for task in workers + [sampler]:
+                task.cancel()
+            await asyncio.gather(*workers, sampler, return_exceptions=True)
+
+    def stop(self):
+        if self._stop is not None:
+            self._stop.set()
+
+    def close(self):
+        for pool in self._pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict:
+        # Only components that already exist: the lazy ones are not built just to report on them
+        journal = self.manager.loaded("decision_journal")
+        return {
+            "latency": self.latency.summary(),
+            "superseded": self.superseded,
+            "rule_hits": self.rule_hits,
+            "cache_hits": self.cache_hits,
+            "published": self.published,
+            "trigger": self.manager.trigger.stats(),
+            "hint_rules": self.manager.hint_rules.stats() if self.manager.hint_rules else None,
+            "decision_cache": self.manager.decision_cache.stats(),
+            "decision_journal": journal.stats() if journal is not None else None,
+        }
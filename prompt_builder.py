@@ -0,0 +1,155 @@
+"""
+prompt_builder.py
+
+Decision prompt layout shared by every backend.
+
+Every decision prompt starts with the same static prefix (the advisor
+instruction used for the SFT data plus the hints in prompts/rag_memory.txt)
+as a system message; only the trailing robot-state message changes. Keeping
+the prefix byte-identical across calls is what lets the local backend reuse
+its KV cache (see local_llm.PrefixKVCache).
+"""
+
+import ast
+import os
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Must match HUMAN_MSG in train/data_generator/csv_convert_json.py
+ADVISOR_INSTRUCTION = (
+    "You are an energy-efficiency advisor.\n"
+    "Your task is to minimize energy consumption while satisfying application QoS."
+)
+
+PROMPT_FILES = (os.path.join(BASE_DIR, "prompts", "rag_memory.txt"),)
+
+
+class PromptPrefix:
+    """Static system prefix, re-read only when one of its prompt files changes."""
+
+    def __init__(self, files: Sequence[str] = PROMPT_FILES, instruction: str = ADVISOR_INSTRUCTION):
+        self.files = tuple(files)
+        self.instruction = instruction
+        self._stamp: Optional[Tuple] = None
+        self._text = ""
+        self.version = 0
+
+    def _fingerprint(self) -> Tuple:
+        stamp = []
+        for path in self.files:
+            try:
+                st = os.stat(path)
+                stamp.append((path, st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                stamp.append((path, None, None))
+        return tuple(stamp)
+
+    def refresh(self) -> bool:
+        """Reload the prompt files if they changed; True if the prefix text changed."""
+        stamp = self._fingerprint()
+        if stamp == self._stamp:
+            return False
+        self._stamp = stamp
+
+        parts = [self.instruction]
+        for path in self.files:
+            if os.path.exists(path):
+                with open(path, "r") as f:
+                    parts.append(f.read().strip())
+        text = "\n\n".join(parts)
+        changed = text != self._text
+        if changed:
+            self._text = text
+            self.version += 1
+        return changed
+
+    @property
+    def text(self) -> str:
+        self.refresh()
+        return self._text
+
+    def messages(self) -> List[Dict[str, str]]:
+        return [{"role": "system", "content": self.text}]
+
+
+def build_messages(prefix: PromptPrefix, robot_state: str) -> List[Dict[str, str]]:
+    """Static prefix first, then the per-tick robot state."""
+    return prefix.messages() + [{"role": "user", "content": robot_state}]
+
+
+# ============================================================
+# Robot state (Vec2Lang.convert output) -> prompt text
+# ============================================================
+
+STATE_LINES = (
+    ("Temperature", "environment", "temperature"),
+    ("Battery SOC", "robot_state", "battery_soc"),
+    ("CPU utilization", "robot_state", "cpu_utilization"),
+    ("GPU utilization", "robot_state", "gpu_utilization"),
+    ("Speed", "configuration", "speed"),
+    ("CPU frequency", "configuration", "cpu_frequency"),
+    ("GPU frequency", "configuration", "gpu_frequency"),
+)
+
+
+def render_state(converted: Dict[str, Any]) -> str:
+    env = converted["environment"]
+    lines = ["Robot state:", f"- Terrain: {env['terrain']}, slope: {env['slope']}"]
+    for name, section, field in STATE_LINES:
+        d = converted[section][field]
+        lines.append(f"- {name}: {d['value']} ({d['label']})")
+    risks = converted["assessment"]
+    lines.append(f"- Risks: {', '.join(risks) if risks else 'none'}")
+    return "\n".join(lines)
+
+
+# ============================================================
+# Model answer -> controller parameters
+# ============================================================
+
+BEHAVIOR_PATTERNS = {
+    "speed_mps": re.compile(r"-\s*Speed:\s*([-+]?\d*\.?\d+)\s*m/s"),
+    "cpu_freq_ghz": re.compile(r"-\s*CPU frequency:\s*([-+]?\d*\.?\d+)\s*GHz"),
+    "gpu_freq_ghz": re.compile(r"-\s*GPU frequency:\s*([-+]?\d*\.?\d+)\s*GHz"),
+}
+DICT_PATTERN = re.compile(r"\{[^{}]*\}")
+
+
+def parse_decision(text: str, defaults: Dict[str, float]) -> Optional[Dict[str, float]]:
+    """
+    Controller parameters from a model answer, or None if nothing usable.
+
+    Accepts either a dict literal with controller keys (e.g. {'v_max': 3.0})
+    or the "Change behavior:" block of the SFT targets, whose speed becomes
+    v_max and whose frequencies are passed through as cpu/gpu_freq_ghz.
+    """
+    params = dict(defaults)
+    found = False
+
+    for literal in DICT_PATTERN.findall(text):
+        try:
+            value = ast.literal_eval(literal)
+        except (ValueError, SyntaxError):
+            continue
+        if isinstance(value, dict):
+            for k, v in value.items():
+                if k in defaults and isinstance(v, (int, float)):
+                    params[k] = float(v)
+                    found = True
+
+    behavior = {}
+    for key, pattern in BEHAVIOR_PATTERNS.items():
+        m = pattern.search(text)
+        if m:
+            behavior[key] = float(m.group(1))
+    if "speed_mps" in behavior:
+        params["v_max"] = max(behavior["speed_mps"], params["v_min"])
+        found = True
+    for key in ("cpu_freq_ghz", "gpu_freq_ghz"):
+        if key in behavior:
+            params[key] = behavior[key]
+            found = True
+
+    return params if found else None
@@ -0,0 +1,310 @@
+"""
+rag_index.py
+
+Local, on-disk vector index for the analysis and decision RAG memories.
+
+Documents are embedded once with a local CPU sentence-embedding model,
+L2-normalized and stored as float16 (or int8) rows in a .npy file that is
+memory-mapped at startup. Search is exact top-k, scoring the mapped rows
+block by block through a reused float32 buffer (or, opt-in via
+max_dense_bytes, one matmul over a resident float32 copy); large decision
+histories can switch to an IVF layout (k-means lists, only `nprobe` lists
+scored per query). Rebuilds write new files and rename them into place,
+so indexes already mapped by a running process keep their old rows.
+
+On-disk layout of an index directory:
+    index.json     dtype, dim, embedding model, source fingerprint, IVF params
+    vectors.npy    (n, dim) float16 or int8, rows grouped by IVF list
+    docs.jsonl     one {"text": ..., "meta": ...} per row, same order
+    centroids.npy  (nlist, dim) float32            (IVF only)
+    offsets.npy    (nlist + 1,) row offsets per list (IVF only)
+"""
+
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+DEFAULT_EMBED_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+DTYPES = ("float16", "int8")
+INT8_SCALE = 127.0
+# Rows converted to float32 per step when scoring from the mapped rows
+# (1.5 MiB at 384-d, so the conversion buffer stays in cache)
+SCORE_BLOCK = 1 << 10
+
+
+# ============================================================
+# Embedding
+# ============================================================
+
+class LocalEmbedder:
+    """CPU sentence embedder, loaded on first use so index startup stays an mmap."""
+
+    def __init__(self, model_name: str = DEFAULT_EMBED_MODEL, device: str = "cpu"):
+        self.model_name = model_name
+        self.device = device
+        self._model = None
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer
+            self._model = SentenceTransformer(self.model_name, device=self.device)
+        vecs = self._model.encode(list(texts), batch_size=64, convert_to_numpy=True,
+                                  normalize_embeddings=True)
+        return np.asarray(vecs, dtype=np.float32)
+
+
+def normalize(vecs: np.ndarray) -> np.ndarray:
+    vecs = np.asarray(vecs, dtype=np.float32)
+    norms = np.linalg.norm(vecs, axis=-1, keepdims=True)
+    return vecs / np.maximum(norms, 1e-12)
+
+
+def _encode(vecs: np.ndarray, dtype: str) -> np.ndarray:
+    if dtype == "float16":
+        return vecs.astype(np.float16)
+    return np.clip(np.rint(vecs * INT8_SCALE), -127, 127).astype(np.int8)
+
+
+def _save_npy(path: str, array: np.ndarray):
+    """np.save through a temp file and rename: a live np.memmap of `path` keeps the old file."""
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp, path)
+
+
+def _kmeans(vecs: np.ndarray, k: int, iters: int = 20, seed: int = 0) -> np.ndarray:
+    """Spherical k-means centroids of normalized vectors."""
+    rng = np.random.default_rng(seed)
+    centroids = vecs[rng.choice(len(vecs), size=k, replace=False)].copy()
+    for _ in range(iters):
+        assign = np.argmax(vecs @ centroids.T, axis=1)
+        for c in range(k):
+            members = vecs[assign == c]
+            if len(members):
+                centroids[c] = members.sum(axis=0)
+        centroids = normalize(centroids)
+    return centroids
+
+
+# ============================================================
+# Index
+# ============================================================
+
+class VectorIndex:
+
+    def __init__(self, path: str, embedder: Optional[LocalEmbedder] = None, max_dense_bytes: int = 0):
+        """
+        Open an index built by VectorIndex.build(); vectors are memory-mapped, not read.
+
+        embedder:        query embedder (default: a LocalEmbedder for the index's model, on first search)
+        max_dense_bytes: opt-in; keep a resident float32 copy (4 bytes per value, twice
+                         the float16 rows) when it fits in this many bytes. 0: never
+        """
+        self.path = path
+        self.max_dense_bytes = max_dense_bytes
+        with open(os.path.join(path, "index.json")) as f:
+            self.info: Dict[str, Any] = json.load(f)
+        self.vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+        self.scale = INT8_SCALE if self.info["dtype"] == "int8" else 1.0
+        self.centroids = self.offsets = None
+        if self.info.get("nlist"):
+            self.centroids = np.load(os.path.join(path, "centroids.npy"))
+            self.offsets = np.load(os.path.join(path, "offsets.npy"))
+        self._docs: Optional[List[Dict[str, Any]]] = None
+        self._embedder = embedder
+        self._dense: Optional[np.ndarray] = None
+        self._dense_lock = threading.Lock()
+        # Per-thread float32 conversion buffer for block scoring
+        self._local = threading.local()
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+    @property
+    def docs(self) -> List[Dict[str, Any]]:
+        if self._docs is None:
+            with open(os.path.join(self.path, "docs.jsonl")) as f:
+                self._docs = [json.loads(line) for line in f]
+        return self._docs
+
+    @property
+    def dense(self) -> Optional[np.ndarray]:
+        """Resident float32 (scaled) copy of the vectors, or None if it exceeds max_dense_bytes."""
+        if self._dense is None and 0 < self.vectors.size * 4 <= self.max_dense_bytes:
+            with self._dense_lock:
+                if self._dense is None:
+                    dense = np.asarray(self.vectors, dtype=np.float32)
+                    if self.scale != 1.0:
+                        dense /= self.scale
+                    self._dense = dense
+        return self._dense
+
+    def warm(self) -> "VectorIndex":
+        """Build the resident float32 copy (if enabled) now rather than on the first query."""
+        self.dense
+        return self
+
+    @property
+    def embedder(self) -> LocalEmbedder:
+        if self._embedder is None:
+            self._embedder = LocalEmbedder(self.info["model"])
+        return self._embedder
+
+    # --------------------------------------------------------
+    # Build
+    # --------------------------------------------------------
+    @classmethod
+    def build(cls, path: str, texts: Sequence[str], embedder: LocalEmbedder,
+              metas: Optional[Sequence[Any]] = None, dtype: str = "float16",
+              nlist: int = 0, fingerprint: Any = None,
+              vectors: Optional[np.ndarray] = None) -> "VectorIndex":
+        """
+        Embed `texts` and write the index to `path`.
+
+        nlist > 0 builds an IVF layout with that many k-means lists (use for
+        histories of tens of thousands of rows or more). `vectors` can be
+        passed to skip embedding (they are normalized here).
+        """
+        if dtype not in DTYPES:
+            raise ValueError(f"dtype {dtype} not supported. Please use one of {DTYPES}")
+        os.makedirs(path, exist_ok=True)
+        marker = os.path.join(path, "index.json")
+        if os.path.exists(marker):
+            os.remove(marker)
+        metas = list(metas) if metas is not None else [None] * len(texts)
+        vecs = normalize(embedder.embed(texts) if vectors is None else vectors)
+
+        order = np.arange(len(vecs))
+        nlist = min(nlist, len(vecs))
+        if nlist:
+            centroids = _kmeans(vecs, nlist)
+            assign = np.argmax(vecs @ centroids.T, axis=1)
+            order = np.argsort(assign, kind="stable")
+            offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=nlist))])
+            _save_npy(os.path.join(path, "centroids.npy"), centroids.astype(np.float32))
+            _save_npy(os.path.join(path, "offsets.npy"), offsets.astype(np.int64))
+
+        _save_npy(os.path.join(path, "vectors.npy"), _encode(vecs[order], dtype))
+        docs = os.path.join(path, "docs.jsonl")
+        with open(docs + ".tmp", "w") as f:
+            for i in order:
+                f.write(json.dumps({"text": texts[i], "meta": metas[i]}) + "\n")
+        os.replace(docs + ".tmp", docs)
+        # index.json last: its presence marks a complete index
+        with open(marker, "w") as f:
+            json.dump({"dtype": dtype, "dim": int(vecs.shape[1]), "count": int(len(vecs)),
+                       "model": embedder.model_name, "nlist": int(nlist),
+                       "fingerprint": fingerprint}, f, indent=2)
+        return cls(path, embedder=embedder)
+
+    # --------------------------------------------------------
+    # Search
+    # --------------------------------------------------------
+    def _score(self, start: int, stop: int, q: np.ndarray, out: np.ndarray):
+        """Scores of rows [start, stop) into `out`."""
+        dense = self.dense
+        if dense is not None:
+            np.dot(dense[start:stop], q, out=out)
+            return
+        # Convert SCORE_BLOCK rows at a time into a reused float32 buffer
+        block = getattr(self._local, "block", None)
+        if block is None:
+            block = self._local.block = np.empty((SCORE_BLOCK, self.vectors.shape[1]), dtype=np.float32)
+        for s in range(start, stop, SCORE_BLOCK):
+            e = min(s + SCORE_BLOCK, stop)
+            rows = block[:e - s]
+            rows[...] = self.vectors[s:e]
+            np.dot(rows, q, out=out[s - start:e - start])
+        if self.scale != 1.0:
+            out /= self.scale
+
+    def search_vector(self, q: np.ndarray, k: int = 4, nprobe: int = 4) -> List[Tuple[int, float]]:
+        """(row, cosine score) of the top-k rows for a query embedding."""
+        q = normalize(q).reshape(-1)
+        if self.centroids is None:
+            candidates = None
+            scores = np.empty(len(self), dtype=np.float32)
+            self._score(0, len(self), q, scores)
+        else:
+            lists = np.argsort(-(self.centroids @ q))[:nprobe]
+            spans = [(int(self.offsets[c]), int(self.offsets[c + 1])) for c in lists]
+            # IVF lists are contiguous row ranges: score them as slices, no gather
+            candidates = np.concatenate([np.arange(a, b) for a, b in spans])
+            scores = np.empty(len(candidates), dtype=np.float32)
+            pos = 0
+            for a, b in spans:
+                if b > a:
+                    self._score(a, b, q, scores[pos:pos + b - a])
+                pos += b - a
+
+        k = min(k, len(scores))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(i if candidates is None else candidates[i]), float(scores[i])) for i in top]
+
+    def search(self, query: str, k: int = 4, nprobe: int = 4) -> List[Dict[str, Any]]:
+        q = self.embedder.embed([query])[0]
+        docs = self.docs
+        return [dict(docs[row], score=score) for row, score in self.search_vector(q, k=k, nprobe=nprobe)]
+
+
+# ============================================================
+# Memory sources
+# ============================================================
+
+def file_fingerprint(paths: Sequence[str]) -> List:
+    stamp = []
+    for path in paths:
+        st = os.stat(path)
+        stamp.append([os.path.abspath(path), st.st_size, st.st_mtime_ns])
+    return stamp
+
+
+def open_or_build(path: str, sources: Sequence[str], load_docs, embedder: Optional[LocalEmbedder] = None,
+                  dtype: str = "float16", nlist: int = 0, max_dense_bytes: int = 0) -> VectorIndex:
+    """
+    mmap the index at `path` if it was built from the current `sources`
+    (by size/mtime), otherwise rebuild it. load_docs(sources) -> (texts, metas).
+    """
+    fingerprint = file_fingerprint(sources)
+    if os.path.exists(os.path.join(path, "index.json")):
+        index = VectorIndex(path, embedder=embedder, max_dense_bytes=max_dense_bytes)
+        if index.info.get("fingerprint") == fingerprint:
+            return index
+    texts, metas = load_docs(sources)
+    embedder = embedder or LocalEmbedder()
+    VectorIndex.build(path, texts, embedder, metas=metas,
+                      dtype=dtype, nlist=nlist, fingerprint=fingerprint)
+    return VectorIndex(path, embedder=embedder, max_dense_bytes=max_dense_bytes)
+
+
+def load_hint_docs(sources: Sequence[str]):
+    """One document per '# Hint N:' block of the prompt files."""
+    texts = []
+    for path in sources:
+        with open(path) as f:
+            blocks = f.read().split("# ")
+        texts += ["# " + b.strip() for b in blocks if b.strip()]
+    return texts, [None] * len(texts)
+
+
+def load_decision_docs(sources: Sequence[str]):
+    """Robot state -> decision pairs of the SFT conversations (JSON array or JSONL)."""
+    texts, metas = [], []
+    for path in sources:
+        with open(path) as f:
+            if path.endswith(".jsonl"):
+                samples = [json.loads(line) for line in f if line.strip()]
+            else:
+                samples = json.load(f)
+        for sample in samples:
+            turns = {t["from"]: t["value"] for t in sample["conversations"]}
+            texts.append(turns.get("robot", ""))
+            metas.append({"decision": turns.get("gpt", "")})
+    return texts, metas
@@ -0,0 +1,32 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT, os.path.join(ROOT, "controller"), os.path.join(ROOT, "train", "data_generator")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+PLATFORM_YAML = os.path.join(ROOT, "controller", "platform.yaml")
+CSV_DIR = os.path.join(ROOT, "train", "data_generator", "csv_data")
+
+
+@pytest.fixture(scope="session")
+def platform():
+    from vec2lang import PlatformConfig
+    return PlatformConfig(PLATFORM_YAML)
+
+
+@pytest.fixture(scope="session")
+def vec2lang(platform):
+    from vec2lang import Vec2Lang
+    return Vec2Lang(platform)
+
+
+def robot_state(**overrides):
+    """One raw Vec2Lang.convert() input; calm by default (no risks)."""
+    state = dict(temperature=40.0, soc=60.0, cpu_util=50.0, gpu_util=50.0, speed=4.0,
+                 cpu_freq=1.5, gpu_freq=0.9, terrain="flat", slope=0.0)
+    state.update(overrides)
+    return state
@@ -0,0 +1,68 @@
+import pytest
+
+from behavior_grammar import BehaviorGrammar
+
+
+def body(text):
+    """What the model generates after the forced first literal."""
+    head = "Change behavior:\n- Speed: "
+    assert text.startswith(head)
+    return text[len(head):]
+
+
+@pytest.mark.parametrize("speed, cpu_f, gpu_f, pressure", [
+    (0.5, 499200, 216750, "high"),
+    (5.0, 2_201_600, 1_300_500, "low"),
+    (3.2, 1_510_400, 624_750, "moderate"),
+])
+def test_accepts_generator_targets(speed, cpu_f, gpu_f, pressure):
+    from csv_convert_json import behavior_change
+
+    grammar = BehaviorGrammar(speed=(0.0, 6.0), cpu_ghz=(0.0, 2.5), gpu_ghz=(0.0, 1.5))
+    text = "Change behavior:\n" + behavior_change(speed, cpu_f, gpu_f, pressure)
+    assert grammar.state(body(text)) == ("done",)
+
+
+def test_render_round_trip():
+    grammar = BehaviorGrammar()
+    text = grammar.render(["3.5", "1.00", "0.80"])
+    assert text == "Change behavior:\n- Speed: 3.5 m/s\n- CPU frequency: 1.00 GHz\n- GPU frequency: 0.80 GHz"
+    assert grammar.state(body(text)) == ("done",)
+
+
+def test_prefixes_stay_in_grammar():
+    grammar = BehaviorGrammar()
+    text = body(grammar.render(["3.5", "1.00", "0.80"]))
+    for n in range(len(text)):
+        state = grammar.state(text[:n])
+        assert state is not None and state[0] in ("number", "literal"), repr(text[:n])
+
+
+def test_states_along_the_block():
+    grammar = BehaviorGrammar()
+    kind, field, partial = grammar.state("3.")
+    assert (kind, field.name, partial) == ("number", "speed_mps", "3.")
+    assert grammar.state("3.5") == ("literal", " m/s\n- CPU frequency: ")
+    assert grammar.state("3.5 m/s\n- CPU") == ("literal", " frequency: ")
+    kind, field, partial = grammar.state("3.5 m/s\n- CPU frequency: ")
+    assert (kind, field.name, partial) == ("number", "cpu_freq_ghz", "")
+
+
+@pytest.mark.parametrize("text", [
+    "6.5",                                          # speed above the bound
+    "3.55",                                         # too many decimals
+    "3.5 km/h",                                     # wrong literal
+    "3.5 m/s\n- CPU frequency: 1.0 GHz",            # too few decimals
+    "3.5 m/s\n- CPU frequency: 1.00 GHz\n- GPU frequency: 0.80 GHz!",  # trailing text
+])
+def test_rejects_out_of_grammar(text):
+    assert BehaviorGrammar().state(text) is None
+
+
+def test_platform_bounds(platform):
+    grammar = BehaviorGrammar.from_platform(platform, v_min=0.5)
+    assert grammar.state("0.4") is None
+    assert grammar.state(f"{platform.max_speed:.1f}")[0] == "literal"
+    cpu_max = f"{platform.cpu_freq_max:.2f}"
+    assert grammar.state(f"3.0 m/s\n- CPU frequency: {cpu_max}")[0] == "literal"
+    assert grammar.state(f"3.0 m/s\n- CPU frequency: {platform.cpu_freq_max + 0.01:.2f}") is None
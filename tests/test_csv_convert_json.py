@@ -0,0 +1,67 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from conftest import CSV_DIR
+
+SYS_CSV = os.path.join(CSV_DIR, "pdqn_sys.csv")
+APPLS_CSV = os.path.join(CSV_DIR, "pdqn_appls.csv")
+
+
+def whole_file_merge(sys_path, appls_path):
+    from csv_convert_json import KEY
+    return pd.read_csv(sys_path).merge(pd.read_csv(appls_path), on=KEY)
+
+
+@pytest.mark.parametrize("chunksize", [1, 7, 64, 50_000])
+def test_merged_chunks_match_whole_file_merge(chunksize):
+    from csv_convert_json import merged_chunks
+
+    chunks = list(merged_chunks(SYS_CSV, APPLS_CSV, chunksize=chunksize))
+    merged = pd.concat(chunks, ignore_index=True)
+    expected = whole_file_merge(SYS_CSV, APPLS_CSV)
+    pd.testing.assert_frame_equal(merged, expected, check_dtype=False)
+
+
+def test_merged_chunks_duplicate_keys_across_chunks(tmp_path):
+    from csv_convert_json import merged_chunks
+
+    # Key 2 spans a sys chunk boundary and has two appls rows
+    pd.DataFrame({"ITERATION": [0, 1, 2, 2, 3], "A": range(5)}).to_csv(tmp_path / "sys.csv", index=False)
+    pd.DataFrame({"ITERATION": [1, 2, 2, 4], "B": range(4)}).to_csv(tmp_path / "appls.csv", index=False)
+    sys_path, appls_path = str(tmp_path / "sys.csv"), str(tmp_path / "appls.csv")
+
+    merged = pd.concat(merged_chunks(sys_path, appls_path, chunksize=3), ignore_index=True)
+    expected = whole_file_merge(sys_path, appls_path)
+    # Row order inside one duplicated key is up to pandas; compare the row sets
+    order = ["ITERATION", "A", "B"]
+    pd.testing.assert_frame_equal(merged.sort_values(order, ignore_index=True),
+                                  expected.sort_values(order, ignore_index=True), check_dtype=False)
+
+
+def test_merged_chunks_rejects_unsorted_keys(tmp_path):
+    from csv_convert_json import merged_chunks
+
+    pd.DataFrame({"ITERATION": [0, 2, 1], "A": range(3)}).to_csv(tmp_path / "sys.csv", index=False)
+    pd.DataFrame({"ITERATION": [0, 1, 2], "B": range(3)}).to_csv(tmp_path / "appls.csv", index=False)
+    with pytest.raises(ValueError):
+        list(merged_chunks(str(tmp_path / "sys.csv"), str(tmp_path / "appls.csv"), chunksize=2))
+
+
+@pytest.mark.parametrize("suffix", [".json", ".jsonl"])
+def test_convert_output_independent_of_chunksize(tmp_path, suffix):
+    from csv_convert_json import convert
+
+    outputs = []
+    for chunksize in (5, 50_000):
+        out = str(tmp_path / f"out_{chunksize}{suffix}")
+        convert(SYS_CSV, APPLS_CSV, out, chunksize=chunksize)
+        with open(out) as f:
+            outputs.append(f.read())
+    assert outputs[0] == outputs[1]
+
+    if suffix == ".json":
+        samples = json.loads(outputs[0])
+        assert samples and [t["from"] for t in samples[0]["conversations"]] == ["robot", "human", "gpt"]
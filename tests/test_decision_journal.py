@@ -0,0 +1,141 @@
+import json
+import zlib
+
+import numpy as np
+import pytest
+
+from decision_journal import DecisionJournal
+
+
+class HashEmbedder:
+    """Deterministic stand-in for LocalEmbedder: same text, same vector."""
+
+    def embed(self, texts):
+        return np.array([np.random.default_rng(zlib.crc32(t.encode())).standard_normal(32)
+                         for t in texts], dtype=np.float32)
+
+
+class FakeClock:
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def open_journal(tmp_path, clock):
+    opened = []
+
+    def _open(**kw):
+        kw.setdefault("compact_every_s", None)
+        kw.setdefault("compact_ratio", None)
+        journal = DecisionJournal(str(tmp_path), HashEmbedder(), clock=clock, **kw)
+        opened.append(journal)
+        return journal
+
+    yield _open
+    for journal in opened:
+        if journal._fh is not None:
+            journal.close()
+
+
+def snapshot(journal):
+    return sorted((r["id"], r["state"], json.dumps(r["decision"]), json.dumps(r["outcome"]))
+                  for r in journal._records if r["id"] in journal._row)
+
+
+def test_search_finds_appended_record(open_journal):
+    journal = open_journal()
+    for i in range(10):
+        journal.append(f"state {i}", {"v_max": float(i)})
+    hit = journal.search("state 7", k=1)[0]
+    assert hit["decision"] == {"v_max": 7.0}
+    assert hit["score"] == pytest.approx(1.0, abs=1e-2)
+
+
+def test_max_records_evicts_least_used_then_oldest(open_journal, clock):
+    journal = open_journal(max_records=5)
+    ids = []
+    for i in range(5):
+        clock.now += 1
+        ids.append(journal.append(f"state {i}", {"v_max": float(i)}))
+    assert journal.mark_used(ids[0])
+    clock.now += 1
+    journal.append("state 5", {"v_max": 5.0})
+    live = {r["state"] for r in journal._records if r["id"] in journal._row}
+    # state 1 is the oldest record never used; the used state 0 survives
+    assert live == {"state 0", "state 2", "state 3", "state 4", "state 5"}
+    assert journal.stats() == {"live": 5, "rows": 6, "evicted": 1, "next_id": 6}
+
+
+def test_replay_restores_records_and_outcomes(open_journal):
+    journal = open_journal(max_records=20)
+    ids = [journal.append(f"state {i}", {"v_max": float(i)}) for i in range(30)]
+    assert journal.record_outcome(ids[-1], {"energy_j": 12.5})
+    assert not journal.record_outcome(ids[0], {"energy_j": 1.0})  # already evicted
+    before, stats = snapshot(journal), journal.stats()
+    journal.close()
+
+    reopened = open_journal(max_records=20)
+    assert snapshot(reopened) == before
+    assert reopened.stats() == stats
+    assert reopened.search("state 29", k=1)[0]["outcome"] == {"energy_j": 12.5}
+    # Ids continue after the replayed ones
+    assert reopened.append("state 30", {"v_max": 30.0}) == 30
+
+
+def test_compact_round_trip(open_journal, tmp_path):
+    journal = open_journal(max_records=20)
+    ids = [journal.append(f"state {i}", {"v_max": float(i)}) for i in range(30)]
+    journal.record_outcome(ids[-1], {"energy_j": 12.5})
+    before = snapshot(journal)
+
+    journal.compact()
+    assert snapshot(journal) == before
+    assert journal.stats() == {"live": 20, "rows": 20, "evicted": 0, "next_id": 30}
+    with open(tmp_path / "journal.jsonl") as f:
+        lines = [json.loads(line) for line in f]
+    # Outcomes are folded into their record, evicted records are gone
+    assert [e["op"] for e in lines] == ["add"] * 20
+    journal.close()
+
+    reopened = open_journal(max_records=20)
+    assert snapshot(reopened) == before
+    assert reopened.search("state 29", k=1)[0]["outcome"] == {"energy_j": 12.5}
+
+
+def test_ratio_compaction_bounds_rows(open_journal):
+    journal = open_journal(max_records=10, compact_ratio=0.25, compact_min_rows=8)
+    for i in range(200):
+        journal.append(f"state {i}", {"v_max": float(i)})
+        stats = journal.stats()
+        assert stats["live"] <= 10
+        assert stats["evicted"] < max(8, 0.25 * stats["rows"]) + 1
+        assert stats["rows"] <= 20
+
+
+def test_open_time_expiry_is_journaled(open_journal, clock, tmp_path):
+    journal = open_journal(max_age_s=100.0)
+    journal.append("old", {"v_max": 1.0})
+    clock.now += 60
+    journal.append("new", {"v_max": 2.0})
+    journal.close()
+
+    clock.now += 60
+    reopened = open_journal(max_age_s=100.0)
+    assert [r["state"] for r in reopened.search("old", k=5)] == ["new"]
+    reopened.close()
+    with open(tmp_path / "journal.jsonl") as f:
+        ops = [json.loads(line)["op"] for line in f]
+    assert ops == ["add", "add", "evict"]
+
+    # Without a time limit the eviction replays, it is not recomputed
+    replayed = open_journal(max_age_s=None)
+    assert len(replayed) == 1
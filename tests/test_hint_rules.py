@@ -0,0 +1,92 @@
+"""
+HintRules against the SFT labels of train/data_generator.
+
+The rules and the generator disagree on purpose in two QoS bands (see the
+hint_rules docstring); these tests pin the states where both must give
+the same answer.
+"""
+
+import pytest
+
+from conftest import robot_state
+from hint_rules import SOC_SAFETY, HintRules
+
+DEFAULTS = {"weight_mec": 1.0, "weight_com": 1.0, "v_min": 0.5, "v_max": 6.0}
+QOS_REF = 100.0
+
+CONFIGS = [
+    # speed (m/s), cpu (GHz), gpu (GHz)
+    (5.0, 2.0, 0.9),
+    (3.5, 1.2, 1.1),
+    (2.0, 0.8, 0.6),
+    (6.0, 1.0, 0.8),
+]
+
+
+def generator_target(speed, cpu_ghz, gpu_ghz, thr, qos):
+    """Parameters the fine-tuned model was taught to answer for this state."""
+    from csv_convert_json import behavior_change, requirement_pressure
+    from prompt_builder import parse_decision
+
+    pressure = requirement_pressure(thr, qos)
+    text = "Change behavior:\n" + behavior_change(speed, cpu_ghz * 1e6, gpu_ghz * 1e6, pressure)
+    return parse_decision(text, DEFAULTS)
+
+
+def current_params(speed, cpu_ghz, gpu_ghz):
+    return dict(DEFAULTS, v_max=speed, cpu_freq_ghz=cpu_ghz, gpu_freq_ghz=gpu_ghz)
+
+
+def test_soc_safety_edge_matches_generator():
+    from config import THRESHOLDS
+
+    assert SOC_SAFETY == THRESHOLDS["soc_low"] * 100.0
+
+
+@pytest.mark.parametrize("speed, cpu, gpu", CONFIGS)
+@pytest.mark.parametrize("margin", [0.11, 0.25, 1.0])
+def test_over_provisioned_save_matches_generator(vec2lang, platform, speed, cpu, gpu, margin):
+    converted = vec2lang.convert(robot_state(speed=speed, cpu_freq=cpu, gpu_freq=gpu))
+    assert converted["assessment"] == []
+    thr = QOS_REF * (1 + margin)
+
+    rules = HintRules(platform)
+    assert rules.classify(converted, thr=thr, qos_ref=QOS_REF)[0] == "save"
+    params = rules.decide(converted, current_params(speed, cpu, gpu), DEFAULTS, thr=thr, qos_ref=QOS_REF)
+    target = generator_target(speed, cpu, gpu, thr, QOS_REF)
+    for key in ("v_max", "cpu_freq_ghz", "gpu_freq_ghz"):
+        assert params[key] == pytest.approx(target[key]), key
+
+
+@pytest.mark.parametrize("speed, cpu, gpu", CONFIGS)
+@pytest.mark.parametrize("margin", [-0.029, -0.01, -0.001])
+def test_slightly_below_reference_keeps_configuration(vec2lang, platform, speed, cpu, gpu, margin):
+    converted = vec2lang.convert(robot_state(speed=speed, cpu_freq=cpu, gpu_freq=gpu))
+    thr = QOS_REF * (1 + margin)
+    current = current_params(speed, cpu, gpu)
+
+    rules = HintRules(platform)
+    assert rules.classify(converted, thr=thr, qos_ref=QOS_REF)[0] == "hold"
+    assert rules.decide(converted, current, DEFAULTS, thr=thr, qos_ref=QOS_REF) == current
+    target = generator_target(speed, cpu, gpu, thr, QOS_REF)
+    for key in ("v_max", "cpu_freq_ghz", "gpu_freq_ghz"):
+        assert current[key] == pytest.approx(target[key]), key
+
+
+def test_low_soc_saves_like_generator(vec2lang, platform):
+    speed, cpu, gpu = CONFIGS[0]
+    converted = vec2lang.convert(robot_state(soc=SOC_SAFETY - 5, speed=speed, cpu_freq=cpu, gpu_freq=gpu))
+    thr = QOS_REF * 1.05
+
+    params = HintRules(platform).decide(converted, current_params(speed, cpu, gpu), DEFAULTS,
+                                        thr=thr, qos_ref=QOS_REF)
+    target = generator_target(speed, cpu, gpu, thr, QOS_REF)
+    for key in ("v_max", "cpu_freq_ghz", "gpu_freq_ghz"):
+        assert params[key] == pytest.approx(target[key]), key
+
+
+def test_defers_without_qos_reading(vec2lang):
+    rules = HintRules()
+    assert rules.decide(vec2lang.convert(robot_state()), dict(DEFAULTS), DEFAULTS) is None
+    assert rules.stats()["deferred"] == {"no QoS reading": 1}
+    assert rules.stats()["resolved_of_evaluated"] == 0.0
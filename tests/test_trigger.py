@@ -0,0 +1,119 @@
+import copy
+
+import pytest
+
+from conftest import robot_state
+from trigger import QOS_EDGES, SOC_EDGES, HysteresisBand, TriggerEngine
+
+RISK = "thermal stress risk"
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def calm(vec2lang):
+    return vec2lang.convert(robot_state())
+
+
+def with_risk(converted, *risks):
+    converted = copy.deepcopy(converted)
+    converted["assessment"] = list(risks)
+    return converted
+
+
+def tick(engine, clock, converted, dt=1.0, **kw):
+    clock.now += dt
+    return engine.update(converted, **kw)
+
+
+def test_band_jitter_does_not_refire():
+    band = HysteresisBand(QOS_EDGES, margin=0.01)
+    assert band.update(0.0) is False
+    assert band.level == 1
+    # +-0.5% around the +3% edge stays inside the hysteresis window
+    assert [band.update(v) for v in (0.035, 0.025, 0.036, 0.024, 0.03)] == [False] * 5
+    assert band.update(0.045) is True and band.level == 2
+    assert [band.update(v) for v in (0.025, 0.035, 0.021)] == [False] * 3
+    assert band.update(0.019) is True and band.level == 1
+
+
+def test_band_multi_edge_jump_lands_in_final_band():
+    band = HysteresisBand(QOS_EDGES, margin=0.01)
+    band.update(-0.10)
+    assert band.level == 0
+    assert band.update(0.50) is True and band.level == 3
+    assert band.update(-0.50) is True and band.level == 0
+
+
+def test_initial_state_fires_once(clock, calm):
+    engine = TriggerEngine(clock=clock)
+    assert tick(engine, clock, calm) == ["initial state"]
+    assert all(tick(engine, clock, calm) == [] for _ in range(20))
+
+
+def test_soc_jitter_around_edge_fires_once(vec2lang, clock):
+    engine = TriggerEngine(min_interval_s=0.0, clock=clock)
+    safety = SOC_EDGES[0]
+    soc_reasons = []
+    for soc in [safety + 5, safety + 1, safety - 1, safety + 1, safety - 1, safety - 3, safety - 1, safety + 1]:
+        reasons = tick(engine, clock, vec2lang.convert(robot_state(soc=soc)))
+        soc_reasons += [r for r in reasons if r.startswith("SOC band")]
+    assert soc_reasons == ["SOC band: safety"]
+
+
+def test_min_interval_keeps_trigger_pending(clock, calm):
+    engine = TriggerEngine(min_interval_s=5.0, clock=clock)
+    tick(engine, clock, calm, thr=100.0, qos_ref=100.0)
+
+    # QoS drops into "violated" 1 s after the last query: suppressed, not lost
+    assert tick(engine, clock, calm, thr=80.0, qos_ref=100.0) == []
+    assert tick(engine, clock, calm, thr=80.0, qos_ref=100.0) == []
+    clock.now += 2.0
+    assert tick(engine, clock, calm, thr=80.0, qos_ref=100.0) == ["QoS margin: violated"]
+    assert tick(engine, clock, calm, thr=80.0, qos_ref=100.0) == []
+
+
+def test_new_risk_bypasses_min_interval(clock, calm):
+    engine = TriggerEngine(min_interval_s=5.0, urgent_min_interval_s=1.0, clock=clock)
+    tick(engine, clock, calm)
+    assert tick(engine, clock, with_risk(calm, RISK), dt=0.5) == []
+    assert tick(engine, clock, with_risk(calm, RISK), dt=0.5) == [f"new risk: {RISK}"]
+
+
+def test_flapping_risk_fires_once_per_interval(clock, calm):
+    engine = TriggerEngine(min_interval_s=5.0, risk_clear_ticks=1, clock=clock)
+    tick(engine, clock, calm)
+    fired = []
+    # Risk toggles every tick for 4 s; only its first appearance is urgent
+    for i in range(8):
+        converted = with_risk(calm, RISK) if i % 2 == 0 else calm
+        fired.append(tick(engine, clock, converted, dt=0.5))
+    assert [f for f in fired if f] == [[f"new risk: {RISK}"]]
+
+    # The returning risk waited as an ordinary trigger for min_interval_s
+    clock.now += 5.0
+    assert tick(engine, clock, with_risk(calm, RISK)) == [f"new risk: {RISK}"]
+
+
+def test_risk_hold_and_clear_ticks(clock, calm):
+    engine = TriggerEngine(min_interval_s=0.0, urgent_min_interval_s=0.0,
+                           risk_hold_ticks=2, risk_clear_ticks=3, clock=clock)
+    tick(engine, clock, calm)
+    assert tick(engine, clock, with_risk(calm, RISK)) == []
+    assert tick(engine, clock, with_risk(calm, RISK)) == [f"new risk: {RISK}"]
+    # Two calm ticks do not clear it, so its return is not new
+    tick(engine, clock, calm)
+    tick(engine, clock, calm)
+    assert tick(engine, clock, with_risk(calm, RISK)) == []
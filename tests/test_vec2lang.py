@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+from conftest import robot_state
+
+SIGNALS = (
+    ("environment", "temperature"),
+    ("robot_state", "battery_soc"),
+    ("robot_state", "cpu_utilization"),
+    ("robot_state", "gpu_utilization"),
+    ("configuration", "speed"),
+    ("configuration", "cpu_frequency"),
+    ("configuration", "gpu_frequency"),
+)
+RISKS = ("thermal stress risk", "energy-aggressive behavior")
+
+
+def random_states(n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "temperature": rng.uniform(0, 110, n),
+        "soc": rng.uniform(0, 100, n),
+        "cpu_util": rng.uniform(0, 100, n),
+        "gpu_util": rng.uniform(0, 100, n),
+        "speed": rng.uniform(0, 7, n),
+        "cpu_freq": rng.uniform(0.1, 2.2, n),
+        "gpu_freq": rng.uniform(0.3, 1.3, n),
+    })
+
+
+def test_convert_batch_matches_convert(vec2lang):
+    states = random_states()
+    batch = vec2lang.convert_batch(states)
+    for i, row in states.iterrows():
+        scalar = vec2lang.convert(robot_state(**row.to_dict()))
+        for section, name in SIGNALS:
+            assert batch[f"{name}_label"].iloc[i] == scalar[section][name]["label"], (i, name)
+            assert batch[f"{name}_ratio"].iloc[i] == scalar[section][name]["ratio"], (i, name)
+        assert [r for r in RISKS if batch[r].iloc[i]] == scalar["assessment"], i
+
+
+def test_convert_batch_on_edges(vec2lang):
+    # Values exactly on the platform thresholds are where scalar and vector code diverge first
+    edges = [0, 20, 30, 50, 60, 75, 80, 85, 90, 100]
+    states = pd.DataFrame({
+        "temperature": edges, "soc": edges, "cpu_util": edges, "gpu_util": edges,
+        "speed": [e / 100 * 6.0 for e in edges],
+        "cpu_freq": [e / 100 * 2.2 for e in edges],
+        "gpu_freq": [e / 100 * 1.3 for e in edges],
+    }, dtype=float)
+    batch = vec2lang.convert_batch(states)
+    for i, row in states.iterrows():
+        scalar = vec2lang.convert(robot_state(**row.to_dict()))
+        for section, name in SIGNALS:
+            assert batch[f"{name}_label"].iloc[i] == scalar[section][name]["label"], (i, name)
+
+
+def test_convert_batch_accepts_columns(vec2lang):
+    states = random_states(20, seed=1)
+    frame = vec2lang.convert_batch(states)
+    columns = vec2lang.convert_batch({k: states[k].to_numpy() for k in states.columns})
+    for key, values in columns.items():
+        assert list(values) == list(frame[key])
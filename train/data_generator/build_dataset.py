@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Fleet dataset builder.
+
+Discovers every sys/appls log pair under a directory, converts the pairs in
+a process pool with csv_convert_json, and caches each output shard under a
+hash of (input bytes, THRESHOLDS, GENERATOR_VERSION) so unchanged logs are
+skipped on the next run. Writes a manifest.json listing the shards, which
+sft_train.py can consume via `training.dataset_manifest`.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from config import DATA_DIR, THRESHOLDS, GENERATOR_VERSION
+from csv_convert_json import convert
+
+MANIFEST = "manifest.json"
+HASH_BLOCK = 1 << 20
+
+# ============================================================
+# Discovery
+# ============================================================
+
+def discover_pairs(logs_dir):
+    """(sys_path, appls_path) for every *sys*.csv with a sibling *appls*.csv."""
+    pairs = []
+    for root, _, files in os.walk(logs_dir):
+        for name in sorted(files):
+            if not name.endswith(".csv") or "sys" not in name:
+                continue
+            appls = name.replace("sys", "appls", 1)
+            if appls in files:
+                pairs.append((os.path.join(root, name), os.path.join(root, appls)))
+            else:
+                print(f"[WARN] No appls log for {os.path.join(root, name)}, skipping")
+    return sorted(pairs)
+
+# ============================================================
+# Cache key
+# ============================================================
+
+def shard_key(sys_path, appls_path):
+    h = hashlib.sha256()
+    h.update(GENERATOR_VERSION.encode())
+    h.update(json.dumps(THRESHOLDS, sort_keys=True).encode())
+    for path in (sys_path, appls_path):
+        h.update(b"\0")
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(HASH_BLOCK), b""):
+                h.update(block)
+    return h.hexdigest()[:32]
+
+# ============================================================
+# Worker
+# ============================================================
+
+def build_shard(sys_path, appls_path, shards_dir, force=False):
+    key = shard_key(sys_path, appls_path)
+    shard = os.path.join(shards_dir, f"{key}.jsonl")
+    meta = shard + ".meta.json"
+
+    if not force and os.path.exists(shard) and os.path.exists(meta):
+        with open(meta) as f:
+            info = json.load(f)
+        info["cached"] = True
+        return info
+
+    tmp = shard + f".tmp{os.getpid()}"
+    n = convert(sys_path, appls_path, tmp)
+    os.replace(tmp, shard)
+
+    info = {"key": key, "shard": os.path.basename(shard), "samples": n,
+            "sys": os.path.abspath(sys_path), "appls": os.path.abspath(appls_path)}
+    with open(meta, "w") as f:
+        json.dump(info, f, indent=2)
+    info["cached"] = False
+    return info
+
+# ============================================================
+# Build
+# ============================================================
+
+def build(logs_dir, shards_dir, workers=None, force=False, prune=False):
+    os.makedirs(shards_dir, exist_ok=True)
+    pairs = discover_pairs(logs_dir)
+    if not pairs:
+        raise FileNotFoundError(f"No sys/appls log pairs found under {logs_dir}")
+
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(build_shard, s, a, shards_dir, force): (s, a) for s, a in pairs}
+        for fut in as_completed(futures):
+            s, a = futures[fut]
+            info = fut.result()
+            results[(s, a)] = info
+            state = "cached" if info["cached"] else "built"
+            print(f"[{state}] {s} -> {info['shard']} ({info['samples']} samples)")
+
+    shards = []
+    for pair in pairs:
+        info = dict(results[pair])
+        info.pop("cached")
+        shards.append(info)
+
+    manifest = {
+        "generator_version": GENERATOR_VERSION,
+        "thresholds": THRESHOLDS,
+        "total_samples": sum(s["samples"] for s in shards),
+        "shards": shards,
+    }
+    with open(os.path.join(shards_dir, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    if prune:
+        keep = {s["shard"] for s in shards}
+        keep |= {s + ".meta.json" for s in keep}
+        for name in os.listdir(shards_dir):
+            if name != MANIFEST and name not in keep:
+                os.remove(os.path.join(shards_dir, name))
+
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build cached SFT shards from every log pair under a directory.")
+    parser.add_argument("--logs", type=str, default=DATA_DIR["logs_dir"], help="Directory searched for log pairs")
+    parser.add_argument("--out", type=str, default=DATA_DIR["shards_dir"], help="Shard and manifest directory")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--force", action="store_true", help="Rebuild shards even if cached")
+    parser.add_argument("--prune", action="store_true", help="Delete shards no longer in the manifest")
+    args = parser.parse_args()
+
+    manifest = build(args.logs, args.out, workers=args.workers, force=args.force, prune=args.prune)
+    print(f"[OK] {len(manifest['shards'])} shards, {manifest['total_samples']} samples -> "
+          f"{os.path.join(args.out, MANIFEST)}")
@@ -1,18 +1,40 @@
+import os
+import sys
+
+import yaml
+
+CONTROLLER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "controller")
+
+# Frozen threshold tables are shared with the on-board Vec2Lang
+sys.path.insert(0, CONTROLLER_DIR)
+from thresholds import ThresholdTable
+
 # ----------------------------
 # Config
 # ----------------------------
 DATA_DIR = {
     "sys_dir": "./csv_data/pdqn_sys.csv",
     "appls_dir": "./csv_data/pdqn_appls.csv",
-    "out_dir": "./../dataset/sft/sft_energy.json"
+    "out_dir": "./../dataset/sft/sft_energy.json",
+    "logs_dir": "./csv_data",                   # searched recursively for *sys*.csv / *appls*.csv pairs
+    "shards_dir": "./../dataset/shards"         # cached shards + manifest.json
 }
 
-# thresholds (adjust once, fixed forever)
-THRESHOLDS = {
-    "gpu_high": 80,           # GPU utilization (%) above which compute pressure is high
-    "cpu_high": 70,           # CPU utilization (%) above which compute pressure is high
-    "speed_high": 4.0,        # Speed (m/s) above which mechanical load is high
-    "soc_low": 0.3,           # SOC below which energy becomes critical
-    "soh_degraded": 0.85,     # SOH below which battery is considered degraded
-    "appls_pressure": 5       # thr - qos margin defining requirement pressure
+# Bump whenever csv_convert_json changes its output, so cached shards are rebuilt
+GENERATOR_VERSION = "2"
+
+# thresholds (adjust once, fixed forever); kept in platform.yaml so hint_rules reads the same values
+with open(os.path.join(CONTROLLER_DIR, "platform.yaml"), "r") as f:
+    THRESHOLDS = yaml.safe_load(f)["sft_thresholds"]
+
+# Compiled once from THRESHOLDS; "strict" tables only move up when the value
+# is strictly above the edge, matching the ">" comparisons of the generator
+THRESHOLD_TABLES = {
+    # thr - qos margin: < 0 (or missing) -> high, < appls_pressure -> moderate, else low
+    "requirement_pressure": ThresholdTable(
+        "requirement_pressure", (0, THRESHOLDS["appls_pressure"]), ("high", "moderate", "low"),
+        nan_level=0),
+    "speed": ThresholdTable("speed", (THRESHOLDS["speed_high"],), ("normal", "high"), strict=True),
+    "gpu_util": ThresholdTable("gpu_util", (THRESHOLDS["gpu_high"],), ("normal", "high"), strict=True),
+    "cpu_util": ThresholdTable("cpu_util", (THRESHOLDS["cpu_high"],), ("normal", "high"), strict=True),
 }
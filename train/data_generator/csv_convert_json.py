@@ -1,37 +1,35 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import pandas as pd
+import argparse
 import json
-from config import DATA_DIR, THRESHOLDS
+import numpy as np
+import pandas as pd
+from config import DATA_DIR, THRESHOLD_TABLES
 
-# ============================================================
-# Load logs
-# ============================================================
+KEY = "ITERATION"
+CHUNKSIZE = 50_000
 
-sys_df = pd.read_csv(DATA_DIR["sys_dir"])
-app_df = pd.read_csv(DATA_DIR["appls_dir"])
-out_dir = DATA_DIR["out_dir"]
+HUMAN_MSG = (
+    "You are an energy-efficiency advisor.\n"
+    "Your task is to minimize energy consumption while satisfying application QoS."
+)
 
-# Merge on common timestep key
-df = sys_df.merge(app_df, on="ITERATION")
+# ============================================================
+# Scalar rendering (one row)
+# ============================================================
 
 def requirement_pressure(thr, qos):
-    margin = thr - qos
-    if margin >= THRESHOLDS["appls_pressure"]:
-        return "low"
-    elif margin >= 0:
-        return "moderate"
-    else:
-        return "high"
+    _, label = THRESHOLD_TABLES["requirement_pressure"].classify(thr - qos)
+    return label
 
 def reasoning_text(speed, gpu, pressure):
     parts = []
 
-    if speed > THRESHOLDS["speed_high"]:
+    if THRESHOLD_TABLES["speed"].level(speed):
         parts.append("a high driving speed increases mechanical power consumption")
 
-    if gpu > THRESHOLDS["gpu_high"]:
+    if THRESHOLD_TABLES["gpu_util"].level(gpu):
         parts.append("high GPU utilization increases computational power consumption")
 
     if parts:
@@ -71,69 +69,187 @@ def behavior_change(speed, cpu_f, gpu_f, pressure):
     )
 
 # ============================================================
-# Convert to conversation-style JSON (single array)
+# Vectorized rendering (whole merged chunk)
 # ============================================================
 
-all_samples = []
-with open(out_dir, "w") as f:
-    for _, r in df.iterrows():
+def _fmt(spec, values):
+    return np.char.mod(spec, np.asarray(values, dtype=float)).astype(object)
+
+def render_chunk(df):
+    """Render every valid row of a merged sys/appls chunk.
+
+    Returns (robot_msgs, gpt_msgs) as object arrays; the output is identical
+    to the per-row requirement_pressure/reasoning_text/behavior_change path.
+    """
+    df = df[~((df.SOC <= 0) | (df.SOH <= 0))]
+    if df.empty:
+        empty = np.array([], dtype=object)
+        return empty, empty
+
+    speed = df.SPEED.to_numpy(dtype=float)
+    gpu = df.GPU_UTIL.to_numpy(dtype=float)
+    cpu_ghz = df.FREQ_L.to_numpy(dtype=float) / 1e6
+    gpu_ghz = df.FREQ_G.to_numpy(dtype=float) / 1e6
+
+    pressure_table = THRESHOLD_TABLES["requirement_pressure"]
+    pressure_level = pressure_table.level_array(df.THR1.to_numpy(dtype=float) - df.REF1.to_numpy(dtype=float))
+    pressure = pressure_table.label_array(pressure_level).astype(object)
+    high = pressure == "high"
+
+    robot = (
+        "Robot state:\n- Speed: " + _fmt("%.1f", speed)
+        + " m/s\n- CPU utilization: " + _fmt("%.0f", df.UTIL0) + "%"
+        + "\n- GPU utilization: " + _fmt("%.0f", gpu) + "%"
+        + "\n- Application requirement pressure: " + pressure
+        + "\n- Battery SOC: " + _fmt("%.0f", df.SOC.to_numpy(dtype=float) * 100) + "%"
+        + "\n- Battery SOH: " + _fmt("%.0f", df.SOH.to_numpy(dtype=float) * 100) + "%"
+    )
+
+    speed_high = THRESHOLD_TABLES["speed"].level_array(speed) > 0
+    gpu_high = THRESHOLD_TABLES["gpu_util"].level_array(gpu) > 0
+    speed_part = "a high driving speed increases mechanical power consumption"
+    gpu_part = "high GPU utilization increases computational power consumption"
+    prefix = np.select(
+        [speed_high & gpu_high, speed_high, gpu_high],
+        [f"The robot is operating at {speed_part} and {gpu_part}. ",
+         f"The robot is operating at {speed_part}. ",
+         f"The robot is operating at {gpu_part}. "],
+        default="The robot is operating under moderate mechanical and computational load. ",
+    ).astype(object)
+    suffix = np.where(
+        high,
+        "Given the high application requirement pressure, "
+        "resource adjustments should be conservative to avoid QoS violations.",
+        "Given the " + pressure + " application requirement pressure and medium task urgency, "
+        "energy-efficient adjustments can be applied without violating QoS constraints.",
+    )
+
+    behavior = (
+        "- Speed: " + _fmt("%.1f", np.where(high, speed, np.maximum(speed - 1.5, 2.5)))
+        + " m/s\n- CPU frequency: " + _fmt("%.2f", np.where(high, cpu_ghz, np.minimum(cpu_ghz, 1.0)))
+        + " GHz\n- GPU frequency: " + _fmt("%.2f", np.where(high, gpu_ghz, np.minimum(gpu_ghz, 0.8)))
+        + " GHz"
+    )
 
-        if r.SOC <= 0 or r.SOH <= 0:
+    gpt = "Reasoning:\n" + prefix + suffix + "\n\nChange behavior:\n" + behavior
+    return robot, gpt
+
+# ============================================================
+# Streaming merge-join of the two logs
+# ============================================================
+
+def _check_sorted(keys, last, path):
+    if len(keys) and ((last is not None and keys[0] < last) or np.any(np.diff(keys) < 0)):
+        raise ValueError(f"{path} is not sorted by {KEY}; streaming merge-join requires ascending keys")
+
+def merged_chunks(sys_path, appls_path, chunksize=CHUNKSIZE):
+    """Inner join of both logs on the sorted ITERATION key, one chunk at a time.
+
+    Only the current sys chunk and the not-yet-matched tail of the appls log
+    are held in memory.
+    """
+    app_iter = pd.read_csv(appls_path, chunksize=chunksize)
+    app_buf = None
+    app_done = False
+    app_last = sys_last = None
+
+    for sys_chunk in pd.read_csv(sys_path, chunksize=chunksize):
+        keys = sys_chunk[KEY].to_numpy()
+        _check_sorted(keys, sys_last, sys_path)
+        if not len(keys):
             continue
+        sys_last = keys[-1]
 
-        pressure = requirement_pressure(r.THR1, r.REF1)
-
-        # ----------------------------
-        # robot: objective state
-        # ----------------------------
-        robot_msg = (
-            "Robot state:\n"
-            f"- Speed: {r.SPEED:.1f} m/s\n"
-            f"- CPU utilization: {r.UTIL0:.0f}%\n"
-            f"- GPU utilization: {r.GPU_UTIL:.0f}%\n"
-            f"- Application requirement pressure: {pressure}\n"
-            f"- Battery SOC: {r.SOC * 100:.0f}%\n"
-            f"- Battery SOH: {r.SOH * 100:.0f}%"
-        )
+        # Pull appls rows until they reach past the end of this sys chunk
+        while not app_done and (app_buf is None or app_buf.empty or app_buf[KEY].iloc[-1] <= sys_last):
+            try:
+                chunk = next(app_iter)
+            except StopIteration:
+                app_done = True
+                break
+            _check_sorted(chunk[KEY].to_numpy(), app_last, appls_path)
+            if len(chunk):
+                app_last = chunk[KEY].iloc[-1]
+            app_buf = chunk if app_buf is None else pd.concat([app_buf, chunk], ignore_index=True)
 
-        # ----------------------------
-        # human: task instruction
-        # ----------------------------
-        human_msg = (
-            "You are an energy-efficiency advisor.\n"
-            "Your task is to minimize energy consumption while satisfying application QoS."
-        )
+        if app_buf is None:
+            break
 
-        # ----------------------------
-        # gpt: reasoning + action
-        # ----------------------------
-        gpt_msg = (
-            "Reasoning:\n"
-            f"{reasoning_text(r.SPEED, r.GPU_UTIL, pressure)}\n\n"
-            "Change behavior:\n"
-            f"{behavior_change(r.SPEED, r.FREQ_L, r.FREQ_G, pressure)}"
-        )
+        yield sys_chunk.merge(app_buf[app_buf[KEY] <= sys_last], on=KEY)
+
+        # Keys equal to sys_last may still match rows of the next sys chunk
+        app_buf = app_buf[app_buf[KEY] >= sys_last]
+
+# ============================================================
+# Incremental writers
+# ============================================================
 
-        sample = {
-            "conversations": [
-                {
-                    "from": "robot", 
-                    "value": robot_msg
-                },
-                {
-                    "from": "human", 
-                    "value": human_msg
-                },
-                {
-                    "from": "gpt",   
-                    "value": gpt_msg
-                },
-            ]
-        }
-
-        all_samples.append(sample)
-
-with open(out_dir, "w") as f:
-    json.dump(all_samples, f, indent=2)
-
-print(f"[OK] Saved {len(all_samples)} samples to {out_dir}")
+def _sample(robot_msg, gpt_msg):
+    return {
+        "conversations": [
+            {
+                "from": "robot",
+                "value": robot_msg
+            },
+            {
+                "from": "human",
+                "value": HUMAN_MSG
+            },
+            {
+                "from": "gpt",
+                "value": gpt_msg
+            },
+        ]
+    }
+
+class JsonArrayWriter:
+    """Streams the same bytes as json.dump(samples, f, indent=2)."""
+
+    def __init__(self, f):
+        self.f = f
+        self.count = 0
+
+    def write(self, sample):
+        text = json.dumps(sample, indent=2).replace("\n", "\n  ")
+        self.f.write(("[\n  " if self.count == 0 else ",\n  ") + text)
+        self.count += 1
+
+    def close(self):
+        self.f.write("[]" if self.count == 0 else "\n]")
+
+class JsonlWriter:
+
+    def __init__(self, f):
+        self.f = f
+        self.count = 0
+
+    def write(self, sample):
+        self.f.write(json.dumps(sample) + "\n")
+        self.count += 1
+
+    def close(self):
+        pass
+
+def convert(sys_path, appls_path, out_path, chunksize=CHUNKSIZE):
+    """Convert one sys/appls log pair; JSONL if out_path ends in .jsonl, else a JSON array."""
+    with open(out_path, "w") as f:
+        writer = JsonlWriter(f) if out_path.endswith(".jsonl") else JsonArrayWriter(f)
+        for merged in merged_chunks(sys_path, appls_path, chunksize=chunksize):
+            robot_msgs, gpt_msgs = render_chunk(merged)
+            for robot_msg, gpt_msg in zip(robot_msgs, gpt_msgs):
+                writer.write(_sample(robot_msg, gpt_msg))
+        writer.close()
+    return writer.count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert pdqn sys/appls logs into SFT conversations.")
+    parser.add_argument("--sys", type=str, default=DATA_DIR["sys_dir"], help="Path to the pdqn_sys CSV log")
+    parser.add_argument("--appls", type=str, default=DATA_DIR["appls_dir"], help="Path to the pdqn_appls CSV log")
+    parser.add_argument("--out", type=str, default=DATA_DIR["out_dir"],
+                        help="Output path (.jsonl for one sample per line, otherwise a JSON array)")
+    parser.add_argument("--chunksize", type=int, default=CHUNKSIZE, help="Rows read per CSV chunk")
+    args = parser.parse_args()
+
+    n = convert(args.sys, args.appls, args.out, chunksize=args.chunksize)
+    print(f"[OK] Saved {n} samples to {args.out}")
@@ -0,0 +1,87 @@
+"""
+Sharded SFT dataset loading with a per-shard Arrow cache.
+
+Every JSON/JSONL shard is converted to Arrow once and stored under
+`<cache_dir>/<sha256 of the shard>`; later runs memory-map it with
+load_from_disk. Checksums are remembered in `<cache_dir>/index.json`
+together with the shard's (size, mtime), so an unchanged shard is neither
+re-hashed nor re-parsed and startup cost only grows with changed shards.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from typing import Dict, List
+
+INDEX = "index.json"
+HASH_BLOCK = 1 << 20
+
+
+def _load_index(cache_dir: str) -> Dict[str, Dict]:
+    path = os.path.join(cache_dir, INDEX)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save_index(cache_dir: str, index: Dict[str, Dict]):
+    tmp = os.path.join(cache_dir, INDEX + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(index, f, indent=2)
+    os.replace(tmp, os.path.join(cache_dir, INDEX))
+
+
+def shard_checksum(path: str, index: Dict[str, Dict]) -> str:
+    """sha256 of a shard, re-hashed only when its size or mtime changed."""
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    stamp = [st.st_size, st.st_mtime_ns]
+    entry = index.get(path)
+    if entry and entry["stat"] == stamp:
+        return entry["sha256"]
+
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b""):
+            h.update(block)
+    index[path] = {"stat": stamp, "sha256": h.hexdigest()}
+    return index[path]["sha256"]
+
+
+def load_sharded_dataset(files: List[str], cache_dir: str, streaming: bool = False):
+    """One training split over all shards, memory-mapped from the Arrow cache.
+
+    With streaming=True the shards are read lazily as an IterableDataset and
+    no cache is written.
+    """
+    from datasets import concatenate_datasets, load_dataset, load_from_disk
+
+    files = sorted(files)
+    if not files:
+        raise FileNotFoundError("No dataset shards found")
+    if streaming:
+        return load_dataset("json", data_files=files, split="train", streaming=True)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    index = _load_index(cache_dir)
+    parts = []
+
+    for fname in files:
+        arrow_dir = os.path.join(cache_dir, shard_checksum(fname, index))
+        if not os.path.exists(os.path.join(arrow_dir, "dataset_info.json")):
+            print(f"Caching: {fname}")
+            with tempfile.TemporaryDirectory(dir=cache_dir) as tmp:
+                ds = load_dataset("json", data_files=fname, split="train", cache_dir=tmp)
+                staging = arrow_dir + ".tmp"
+                shutil.rmtree(staging, ignore_errors=True)
+                ds.save_to_disk(staging)
+                del ds
+            shutil.rmtree(arrow_dir, ignore_errors=True)
+            os.replace(staging, arrow_dir)
+        parts.append(load_from_disk(arrow_dir))
+
+    _save_index(cache_dir, index)
+    return parts[0] if len(parts) == 1 else concatenate_datasets(parts)
@@ -0,0 +1,90 @@
+"""
+Sequence packing and throughput reporting for SFT.
+
+Robot-state/advice pairs are far shorter than max_seq_length, so padded
+batches are mostly padding. Two complementary fixes, both configurable in
+the `trainer` section of sft_train.yaml:
+
+- packing: concatenate the samples of a batch into one row without padding
+  (transformers' DataCollatorWithFlattening). position_ids restart at 0 for
+  every sample, which flash_attention_2 uses as sequence boundaries. sdpa and
+  eager attention ignore them and would let packed conversations attend to
+  each other, so packing is only used when packing_supported(model).
+- group_by_length: length-bucketed sampler, so padded batches hold samples
+  of similar length. It has no effect on flattened batches.
+
+CountingCollator + ThroughputCallback log the achieved tokens/sec and the
+padding ratio next to the loss.
+"""
+
+import time
+
+from transformers import (DataCollatorForLanguageModeling, DataCollatorForSeq2Seq,
+                          DataCollatorWithFlattening, TrainerCallback)
+
+
+class CountingCollator:
+    """Wraps a data collator and counts real vs. padded tokens of every batch."""
+
+    def __init__(self, collator):
+        self.collator = collator
+        self.real_tokens = 0
+        self.total_tokens = 0
+
+    def __call__(self, features):
+        batch = self.collator(features)
+        input_ids = batch["input_ids"]
+        self.total_tokens += input_ids.numel()
+        if "attention_mask" in batch:
+            self.real_tokens += int(batch["attention_mask"].sum())
+        else:
+            # Flattened batches carry no padding
+            self.real_tokens += input_ids.numel()
+        return batch
+
+    def reset(self):
+        self.real_tokens = 0
+        self.total_tokens = 0
+
+
+PACKING_ATTENTION = "flash_attention_2"
+
+
+def packing_supported(model) -> bool:
+    """Packed samples stay separate only under flash_attention_2, which reads the restarting position_ids."""
+    return getattr(model.config, "_attn_implementation", None) == PACKING_ATTENTION
+
+
+def build_collator(tokenizer, packing: bool, has_labels: bool = False) -> CountingCollator:
+    """has_labels: the dataset already carries (prompt-masked) labels, which must be kept."""
+    if packing:
+        collator = DataCollatorWithFlattening()
+    elif has_labels:
+        collator = DataCollatorForSeq2Seq(tokenizer=tokenizer, padding=True, label_pad_token_id=-100)
+    else:
+        collator = DataCollatorForLanguageModeling(tokenizer=tokenizer, mlm=False)
+    return CountingCollator(collator)
+
+
+class ThroughputCallback(TrainerCallback):
+    """Adds tokens_per_sec and padding_ratio (since the previous log) to the trainer logs."""
+
+    def __init__(self, counter: CountingCollator):
+        self.counter = counter
+        self._t0 = None
+
+    def on_train_begin(self, args, state, control, **kwargs):
+        self.counter.reset()
+        self._t0 = time.perf_counter()
+
+    def on_log(self, args, state, control, logs=None, **kwargs):
+        if logs is None or self._t0 is None:
+            return
+        now = time.perf_counter()
+        elapsed = now - self._t0
+        total = self.counter.total_tokens
+        if elapsed > 0 and total > 0:
+            logs["tokens_per_sec"] = round(self.counter.real_tokens / elapsed, 1)
+            logs["padding_ratio"] = round(1.0 - self.counter.real_tokens / total, 4)
+        self.counter.reset()
+        self._t0 = now
@@ -0,0 +1,89 @@
+"""
+Pre-tokenized SFT dataset cache.
+
+Applies the chat template and tokenizes every conversation once, across
+all cores, storing `input_ids` and `labels` (prompt tokens masked with
+-100) as a memory-mapped Arrow dataset. The cache key covers the
+tokenizer, the chat template, max_seq_length and the fingerprint of the
+source dataset, so hyperparameter sweeps over the same data reuse it and
+skip tokenization entirely.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from typing import Callable, List, Tuple
+
+IGNORE_INDEX = -100
+# Bump when tokenize_conversations changes its output
+PRETOKENIZE_VERSION = "3"
+
+
+def cache_key(tokenizer, chat_template: str, dataset_fingerprint: str, max_seq_length: int) -> str:
+    h = hashlib.sha256()
+    for part in (
+        PRETOKENIZE_VERSION,
+        tokenizer.name_or_path,
+        type(tokenizer).__name__,
+        str(len(tokenizer)),
+        chat_template,
+        tokenizer.chat_template or "",
+        json.dumps(tokenizer.special_tokens_map, sort_keys=True),
+        str(max_seq_length),
+        dataset_fingerprint,
+    ):
+        h.update(part.encode())
+        h.update(b"\0")
+    return h.hexdigest()[:32]
+
+
+def tokenize_conversations(examples, tokenizer, to_messages: Callable[[list], Tuple[List, List]],
+                           max_seq_length: int):
+    input_ids, labels = [], []
+    for conversation in examples["conversations"]:
+        prompt, answer = to_messages(conversation)
+        prompt_ids = tokenizer.apply_chat_template(prompt, tokenize=True, add_generation_prompt=True)
+        full_ids = tokenizer.apply_chat_template(prompt + answer, tokenize=True, add_generation_prompt=False)
+
+        # The answer is trained on; the prompt (a prefix of the full sequence) is masked
+        n_prompt = len(prompt_ids) if full_ids[:len(prompt_ids)] == prompt_ids else 0
+        full_ids = full_ids[:max_seq_length]
+        input_ids.append(full_ids)
+        labels.append([IGNORE_INDEX] * min(n_prompt, len(full_ids)) + full_ids[n_prompt:])
+    return {"input_ids": input_ids, "labels": labels}
+
+
+def pretokenize(dataset, tokenizer, chat_template: str, to_messages: Callable[[list], Tuple[List, List]],
+                max_seq_length: int, cache_dir: str, num_proc: int = None):
+    """Tokenized copy of `dataset`, loaded memory-mapped from `cache_dir` when already built."""
+    from datasets import load_from_disk
+
+    key = cache_key(tokenizer, chat_template, dataset._fingerprint, max_seq_length)
+    path = os.path.join(cache_dir, key)
+    if os.path.exists(os.path.join(path, "dataset_info.json")):
+        print(f"Using pre-tokenized cache: {path}")
+        return load_from_disk(path)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    tokenized = dataset.map(
+        tokenize_conversations,
+        batched=True,
+        num_proc=num_proc or os.cpu_count(),
+        remove_columns=dataset.column_names,
+        fn_kwargs={"tokenizer": tokenizer, "to_messages": to_messages, "max_seq_length": max_seq_length},
+        desc="Tokenizing",
+    )
+    staging = path + ".tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    tokenized.save_to_disk(staging)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(staging, path)
+    print(f"Saved pre-tokenized cache: {path}")
+    print(f"Trained span of sample 0:\n{label_span(tokenized[0], tokenizer)}")
+    return load_from_disk(path)
+
+
+def label_span(example, tokenizer) -> str:
+    """Decoded tokens of one tokenized example that are trained on (labels != -100)."""
+    return tokenizer.decode([t for t in example["labels"] if t != IGNORE_INDEX])
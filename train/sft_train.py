@@ -5,13 +5,20 @@ from trl import SFTTrainer
 from transformers import TrainingArguments
 from unsloth import is_bfloat16_supported
 from unsloth.chat_templates import get_chat_template
-from datasets import load_dataset
 from peft.peft_model import PeftModelForCausalLM
 from transformers.models.llama.tokenization_llama_fast import LlamaTokenizerFast
 from dotenv import load_dotenv, find_dotenv
-import os, json
+from dataset_cache import load_sharded_dataset
+from packing import build_collator, packing_supported, ThroughputCallback
+from pretokenize import pretokenize
+from functools import partial, lru_cache
+import os, sys, json
 from typing import Any, Dict
 
+# The decision prompt layout is shared with the on-board inference path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from prompt_builder import PromptPrefix
+
 load_dotenv(find_dotenv())
 
 HUGGINGFACEHUB_API_TOKEN = os.getenv("HUGGINGFACEHUB_API_TOKEN")
@@ -40,10 +47,53 @@ def chat_mapping(chat_template="phi-3"):
     else:
         raise ValueError(f"Chat template {chat_template} not recognized. Please use 'phi-3' or 'qwen-2.5'.")
 
+@lru_cache(maxsize=None)
+def system_text(instruction):
+    """Inference system prefix for this instruction: the instruction plus the prompts/rag_memory.txt hints."""
+    return PromptPrefix(instruction=instruction).text
+
+def conversation_messages(conversation, chat_template="phi-3"):
+    """
+    (prompt messages, answer messages) of one dataset conversation.
+
+    Conversations are [robot, human, gpt] turns: the robot state, the advisor
+    instruction and the "Change behavior:" answer. The system text is the
+    one prompt_builder.build_messages sends at inference (instruction plus
+    hints); phi-3 has no system role, so there it shares one human turn with
+    the robot state. Only the gpt turn is the answer.
+
+    The robot state is NOT rendered like at inference: the recorded logs
+    have no temperature, terrain or Vec2Lang risks, so the data generator
+    writes speed / utilization / pressure / SOC / SOH lines, while
+    prompt_builder.render_state writes the labelled Vec2Lang levels.
+    """
+    turns = {turn["from"]: turn["value"] for turn in conversation}
+    system, robot_state = system_text(turns["human"]), turns["robot"]
+    if chat_template == "qwen-2.5":
+        input_sample = [{"role": "system", "content": system}] + \
+            preprocess(text=robot_state, chat_template=chat_template, answer=False)
+    else:
+        input_sample = preprocess(text=f"{system}\n\n{robot_state}", chat_template=chat_template, answer=False)
+    output_sample = preprocess(text=turns["gpt"], chat_template=chat_template, answer=True)
+    return input_sample, output_sample
+
 def load_config(config_path):
     with open(config_path, "r") as f:
         return yaml.safe_load(f)
 
+def dataset_files(cfg: Dict[str, Dict[str, Any]]) -> list:
+    """Dataset shards: the ones listed in `dataset_manifest` if set, else every JSON file in `dataset_dir`."""
+    manifest_path = cfg["training"].get("dataset_manifest")
+    if manifest_path:
+        manifest_path = os.path.join(os.getcwd(), manifest_path)
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        shard_dir = os.path.dirname(manifest_path)
+        return [os.path.join(shard_dir, s["shard"]) for s in manifest["shards"]]
+
+    dataset_dir = os.path.join(os.getcwd(), cfg["training"]["dataset_dir"])
+    return [os.path.join(dataset_dir, f) for f in os.listdir(dataset_dir) if f.endswith(('.json', '.jsonl'))]
+
 def train(cfg: Dict[str, Dict[str, Any]]):
     out_dir: str = cfg["training"]["out_dir"]
     chat_template: str = cfg["training"]["chat_template"]
@@ -81,38 +131,40 @@ def train(cfg: Dict[str, Dict[str, Any]]):
     )
 
     ####################################CUSTOM DATA####################################
+    to_messages = partial(conversation_messages, chat_template=chat_template)
+
     def formatting_prompts_custom_func(examples):
         convos = []
-        for i in range(len(examples["conversations"])):
-            input_text = examples["conversations"][i][0]["value"]
-            output_text = examples["conversations"][i][1]["value"]
-            input_sample = preprocess(text=input_text, chat_template=chat_template, answer=False)
-            output_sample = preprocess(text=output_text, chat_template=chat_template, answer=True)
-            sample = input_sample + output_sample
-            convos.append(sample)
+        for conversation in examples["conversations"]:
+            input_sample, output_sample = to_messages(conversation)
+            convos.append(input_sample + output_sample)
         texts = [tokenizer.apply_chat_template(convo, tokenize=False, add_generation_prompt=False) for convo in convos]
         return { "text" : texts, }
 
-    # Create a combined json file from all json files in the dataset folder
-    dataset_dir = os.path.join(os.getcwd(), cfg["training"]["dataset_dir"])
-    all_json_files = [os.path.join(dataset_dir, f) for f in os.listdir(dataset_dir) if f.endswith('.json')]
-    # Initialize an empty list to hold all conversations
-    all_conversations = []
-    # Read and combine all JSON files
-    for fname in all_json_files:
-        print(f"Reading: {fname}")
-        with open(fname) as infile:
-            data = json.load(infile)
-            all_conversations.extend(data)
-    # Write the combined data to a new JSON file
-    combined_json_path = os.path.join(dataset_dir, 'combined/full_data.json')
-    with open(combined_json_path, 'w') as outfile:
-        json.dump(all_conversations, outfile, indent=4)
-
-    custom_dataset = load_dataset('json', data_files=combined_json_path, split='train')
-    dataset = custom_dataset.map(formatting_prompts_custom_func, batched=True)
+    # Load the shards directly, memory-mapped from the per-shard Arrow cache
+    cache_dir = os.path.join(os.getcwd(), cfg["training"]["dataset_cache_dir"])
+    custom_dataset = load_sharded_dataset(dataset_files(cfg), cache_dir=cache_dir,
+                                          streaming=cfg["training"]["dataset_streaming"])
+
+    # Pre-tokenized (prompt-masked) cache, reused across runs; needs a materialized dataset
+    pretokenized = cfg["training"]["pretokenize"] and not cfg["training"]["dataset_streaming"]
+    if pretokenized:
+        dataset = pretokenize(custom_dataset, tokenizer, chat_template, to_messages,
+                              max_seq_length=cfg["model"]["max_seq_length"],
+                              cache_dir=os.path.join(os.getcwd(), cfg["training"]["tokenized_cache_dir"]))
+        dataset_kwargs = {"skip_prepare_dataset": True}
+    else:
+        dataset = custom_dataset.map(formatting_prompts_custom_func, batched=True)
+        dataset_kwargs = {}
     ####################################TRAINING####################################
     if cfg["training"]["train_bool"]:
+        # Padding-free packing keeps per-sample boundaries via position_ids, which only flash_attention_2 honours
+        packing = cfg["trainer"]["packing"]
+        if packing and not packing_supported(model):
+            print(f"[WARN] packing needs flash_attention_2, model uses "
+                  f"{getattr(model.config, '_attn_implementation', None)}; falling back to padded batches")
+            packing = False
+        collator = build_collator(tokenizer, packing=packing, has_labels=pretokenized)
         trainer = SFTTrainer(
             model=model,
             tokenizer=tokenizer,
@@ -120,7 +172,10 @@ def train(cfg: Dict[str, Dict[str, Any]]):
             dataset_text_field="text",
             max_seq_length=cfg["model"]["max_seq_length"],
             dataset_num_proc=2,
-            packing=False, # Can make training 5x faster for short sequences.
+            dataset_kwargs=dataset_kwargs,
+            packing=False, # Packing is done by the collator, which keeps sample boundaries
+            data_collator=collator,
+            callbacks=[ThroughputCallback(collator)],
             args=TrainingArguments(
                 per_device_train_batch_size=cfg["trainer"]["per_device_train_batch_size"],
                 gradient_accumulation_steps=cfg["trainer"]["gradient_accumulation_steps"],
@@ -133,6 +188,7 @@ def train(cfg: Dict[str, Dict[str, Any]]):
                 optim=cfg["trainer"]["optim"],
                 weight_decay=cfg["trainer"]["weight_decay"],
                 lr_scheduler_type=cfg["trainer"]["lr_scheduler_type"],
+                group_by_length=cfg["trainer"]["group_by_length"] and not packing,  # No-op on flattened batches
                 seed=seed,
                 output_dir=out_dir,
             ),
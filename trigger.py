@@ -0,0 +1,219 @@
+"""
+trigger.py
+
+Event-triggered LLM invocation.
+
+The controller samples every controller.sample_period_s, but the model is
+only worth consulting when the state actually changes (rag_memory hints 6
+and 10: fluctuations within 3% are negligible, a stable system keeps its
+strategy). TriggerEngine watches the converted telemetry stream and fires
+on:
+
+- label transitions of any Vec2Lang band, once held for `label_hold_ticks`
+- a risk from assess_risk() that was not active, once held for
+  `risk_hold_ticks` (it stays active until absent for `risk_clear_ticks`)
+- the QoS margin (thr - ref) / ref crossing the -3% / +3% / +10% bands
+- the battery SOC crossing the safety / high-charge thresholds
+
+Numeric bands use hysteresis so noise around an edge does not re-fire,
+and every trigger except a new risk honours `min_interval_s` between
+queries; suppressed triggers stay pending until the interval has passed.
+A new risk only waits for the shorter `urgent_min_interval_s`, and a risk
+that returns within `min_interval_s` of its last appearance is treated
+as an ordinary trigger, so a flapping risk cannot bypass the interval.
+"""
+
+import os
+import time
+from bisect import bisect_right
+from typing import Callable, Dict, List, Optional, Sequence
+
+import yaml
+
+from decision_cache import KEY_FIELDS
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PLATFORM_YAML = os.path.join(BASE_DIR, "controller", "platform.yaml")
+
+
+def _load_platform(path: str = PLATFORM_YAML) -> Dict:
+    with open(path, "r") as f:
+        return yaml.safe_load(f)
+
+
+_PLATFORM = _load_platform()
+# Labelling thresholds of the SFT targets, shared with the data generator
+THRESHOLDS = dict(_PLATFORM["sft_thresholds"])
+
+# Hint 6 (+-3% negligible), hint 4 (>10% above reference)
+QOS_EDGES = (-0.03, 0.03, 0.10)
+QOS_LABELS = ("violated", "at reference", "satisfied", "over-provisioned")
+# Safety below sft_thresholds.soc_low (hint 5), high above battery.soc.high (hint 1)
+SOC_EDGES = (THRESHOLDS["soc_low"] * 100.0, float(_PLATFORM["battery"]["soc"]["high"]))
+SOC_LABELS = ("safety", "normal", "high")
+
+
+class HysteresisBand:
+    """Band index of a scalar that only moves once the value clears an edge by `margin`."""
+
+    def __init__(self, edges: Sequence[float], margin: float):
+        self.edges = tuple(edges)
+        self.margin = margin
+        self.level: Optional[int] = None
+        # An edge is entered at edge + margin and exited below edge - margin
+        self._enter = tuple(e + margin for e in self.edges)
+        self._exit = tuple(e - margin for e in self.edges)
+
+    def update(self, value: float) -> bool:
+        """Feed a sample; True if the band changed. A jump across several edges lands in the final band at once."""
+        if self.level is None:
+            self.level = bisect_right(self.edges, value)
+            return False
+        up = bisect_right(self._enter, value)
+        if up > self.level:
+            self.level = up
+            return True
+        down = bisect_right(self._exit, value)
+        if down < self.level:
+            self.level = down
+            return True
+        return False
+
+
+class TriggerEngine:
+
+    def __init__(self,
+                 min_interval_s: float = 5.0,
+                 label_hold_ticks: int = 2,
+                 risk_hold_ticks: int = 1,
+                 risk_clear_ticks: int = 3,
+                 urgent_min_interval_s: float = 1.0,
+                 qos_hysteresis: float = 0.01,
+                 soc_hysteresis: float = 2.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.min_interval_s = min_interval_s
+        self.label_hold_ticks = label_hold_ticks
+        self.risk_hold_ticks = risk_hold_ticks
+        self.risk_clear_ticks = risk_clear_ticks
+        self.urgent_min_interval_s = urgent_min_interval_s
+        self.clock = clock
+
+        self.qos_band = HysteresisBand(QOS_EDGES, qos_hysteresis)
+        self.soc_band = HysteresisBand(SOC_EDGES, soc_hysteresis)
+
+        self._labels: Optional[Dict] = None
+        self._candidate: Dict = {}
+        self._risks: set = set()
+        self._risk_seen: Dict[str, int] = {}
+        self._risk_gone: Dict[str, int] = {}
+        self._risk_set_at: Dict[str, float] = {}
+        self._urgent: List[str] = []
+        self._pending: List[str] = ["initial state"]
+        self._last_fire: Optional[float] = None
+
+        self.ticks = 0
+        self.fired = 0
+        self.reasons: Dict[str, int] = {}
+
+    # --------------------------------------------------------
+    # Detectors
+    # --------------------------------------------------------
+    def _label_changes(self, converted: Dict) -> List[str]:
+        labels = {field: converted[section][field]["label"] for section, field in KEY_FIELDS}
+        if self._labels is None:
+            self._labels = labels
+            return []
+
+        changes = []
+        for field, label in labels.items():
+            if label == self._labels[field]:
+                self._candidate.pop(field, None)
+                continue
+            seen, count = self._candidate.get(field, (label, 0))
+            count = count + 1 if seen == label else 1
+            if count >= self.label_hold_ticks:
+                changes.append(f"{field}: {self._labels[field]} -> {label}")
+                self._labels[field] = label
+                self._candidate.pop(field, None)
+            else:
+                self._candidate[field] = (label, count)
+        return changes
+
+    def _new_risks(self, converted: Dict) -> List[str]:
+        """Risks that just became active; set and clear each need consecutive ticks."""
+        risks = set(converted["assessment"])
+        new = []
+        for risk in risks - self._risks:
+            count = self._risk_seen.get(risk, 0) + 1
+            if count >= self.risk_hold_ticks:
+                self._risks.add(risk)
+                self._risk_seen.pop(risk, None)
+                new.append(risk)
+            else:
+                self._risk_seen[risk] = count
+        for risk in set(self._risk_seen) - risks:
+            del self._risk_seen[risk]
+
+        for risk in self._risks - risks:
+            count = self._risk_gone.get(risk, 0) + 1
+            if count >= self.risk_clear_ticks:
+                self._risks.discard(risk)
+                self._risk_gone.pop(risk, None)
+            else:
+                self._risk_gone[risk] = count
+        for risk in risks & set(self._risk_gone):
+            del self._risk_gone[risk]
+        return sorted(new)
+
+    # --------------------------------------------------------
+    # Update
+    # --------------------------------------------------------
+    def update(self, converted: Dict, thr: Optional[float] = None, qos_ref: Optional[float] = None) -> List[str]:
+        """
+        Feed one Vec2Lang.convert() result (plus optional throughput and its
+        QoS reference). Returns the reasons to query the model now, or an
+        empty list to keep the current strategy.
+        """
+        self.ticks += 1
+        now = self.clock()
+
+        for risk in self._new_risks(converted):
+            last = self._risk_set_at.get(risk)
+            self._risk_set_at[risk] = now
+            # A risk back within min_interval_s is a repeat, not news
+            repeat = last is not None and now - last < self.min_interval_s
+            reason = f"new risk: {risk}"
+            if reason not in self._urgent and reason not in self._pending:
+                (self._pending if repeat else self._urgent).append(reason)
+        self._pending += self._label_changes(converted)
+
+        soc = converted["robot_state"]["battery_soc"]["ratio"] * 100.0
+        if self.soc_band.update(soc):
+            self._pending.append(f"SOC band: {SOC_LABELS[self.soc_band.level]}")
+
+        if thr is not None and qos_ref:
+            if self.qos_band.update((thr - qos_ref) / qos_ref):
+                self._pending.append(f"QoS margin: {QOS_LABELS[self.qos_band.level]}")
+
+        since = None if self._last_fire is None else now - self._last_fire
+        urgent = self._urgent and (since is None or since >= self.urgent_min_interval_s)
+        due = since is None or since >= self.min_interval_s
+        if not urgent and not (due and self._pending):
+            return []
+
+        reasons = self._urgent + self._pending
+        self._urgent, self._pending = [], []
+        self._last_fire = now
+        self.fired += 1
+        for r in reasons:
+            kind = r.split(":")[0]
+            self.reasons[kind] = self.reasons.get(kind, 0) + 1
+        return reasons
+
+    def stats(self) -> Dict:
+        return {
+            "ticks": self.ticks,
+            "fired": self.fired,
+            "query_rate": self.fired / self.ticks if self.ticks else 0.0,
+            "reasons": dict(self.reasons),
+        }